@@ -4,47 +4,47 @@ Mapeamentos de palavras-chave para campos educacionais
 
 DISCIPLINAS_MAP = {
     "Matemática": [
-        "matemática", "matematica", "math", "cálculo", "calculo",
-        "álgebra", "algebra", "geometria", "aritmética", "aritmetica",
-        "números", "numeros", "equações", "equacoes", "frações", "fracoes"
+        "matemática", "math", "cálculo",
+        "álgebra", "geometria", "aritmética",
+        "números", "equações", "frações"
     ],
     "Língua Portuguesa": [
-        "português", "portugues", "lingua portuguesa", "língua portuguesa",
-        "gramática", "gramatica", "redação", "redacao", "literatura",
-        "interpretação", "interpretacao", "texto", "leitura"
+        "português", "língua portuguesa",
+        "gramática", "redação", "literatura",
+        "interpretação", "texto", "leitura"
     ],
     "Ciências": [
-        "ciências", "ciencias", "biologia", "física", "fisica",
-        "química", "quimica", "natureza", "meio ambiente", "ecologia",
+        "ciências", "biologia", "física",
+        "química", "natureza", "meio ambiente", "ecologia",
         "corpo humano", "animais", "plantas"
     ],
     "História": [
-        "história", "historia", "histórico", "historico",
-        "brasil", "mundo", "guerra", "revolução", "revolucao",
-        "período", "periodo", "era", "século", "seculo",
+        "história", "histórico",
+        "brasil", "mundo", "guerra", "revolução",
+        "período", "era", "século",
         # Adicionar figuras históricas e eventos importantes
-        "vargas", "getúlio", "getulio", "dom pedro", "tiradentes",
-        "república", "republica", "império", "imperio", "colonial",
-        "ditadura", "democracia", "independência", "independencia",
-        "abolição", "abolicao", "escravidão", "escravidao",
-        "revolução industrial", "revolucao industrial", "feudalismo",
+        "vargas", "getúlio", "dom pedro", "tiradentes",
+        "república", "império", "colonial",
+        "ditadura", "democracia", "independência",
+        "abolição", "escravidão",
+        "revolução industrial", "feudalismo",
         "capitalismo", "socialismo", "comunismo", "fascismo", "nazismo"
     ],
     "Geografia": [
-        "geografia", "geográfico", "geografico", "mapa", "mapas",
-        "região", "regiao", "clima", "relevo", "população", "populacao",
-        "território", "territorio", "país", "pais", "continente"
+        "geografia", "geográfico", "mapa", "mapas",
+        "região", "clima", "relevo", "população",
+        "território", "país", "continente"
     ],
     "Inglês": [
-        "inglês", "ingles", "english", "língua inglesa", "lingua inglesa"
+        "inglês", "english", "língua inglesa"
     ],
     "Arte": [
-        "arte", "artes", "música", "musica", "pintura", "escultura",
-        "teatro", "dança", "danca", "artístico", "artistico"
+        "arte", "artes", "música", "pintura", "escultura",
+        "teatro", "dança", "artístico"
     ],
     "Educação Física": [
-        "educação física", "educacao fisica", "esporte", "esportes",
-        "atividade física", "atividade fisica", "ginástica", "ginastica"
+        "educação física", "esporte", "esportes",
+        "atividade física", "ginástica"
     ]
 }
 
@@ -64,50 +64,50 @@ ANOS_MAP = {
 NIVEIS_BLOOM_MAP = {
     "conhecimento": [
         "lembrar", "recordar", "memorizar", "listar", "definir",
-        "identificar", "nomear", "reconhecer", "básico", "basico",
-        "conhecimento", "memorização", "memorizacao", "recordação", "recordacao",
-        "lembrete", "lembrança", "lembranca", "saber", "conhecer"
+        "identificar", "nomear", "reconhecer", "básico",
+        "conhecimento", "memorização", "recordação",
+        "lembrete", "lembrança", "saber", "conhecer"
     ],
     "compreensao": [
         "compreender", "entender", "explicar", "interpretar",
         "resumir", "descrever", "classificar", "comparar",
-        "compreensão", "compreensao", "entendimento", "interpretação", "interpretacao",
-        "explicação", "explicacao", "descrição", "descricao", "parafrasear"
+        "compreensão", "entendimento", "interpretação",
+        "explicação", "descrição", "parafrasear"
     ],
     "aplicacao": [
         "aplicar", "usar", "executar", "implementar", "resolver",
-        "demonstrar", "praticar", "calcular", "aplicação", "aplicacao",
-        "uso", "execução", "execucao", "implementação", "implementacao",
-        "resolução", "resolucao", "prática", "pratica", "cálculo", "calculo"
+        "demonstrar", "praticar", "calcular", "aplicação",
+        "uso", "execução", "implementação",
+        "resolução", "prática", "cálculo"
     ],
     "analise": [
         "analisar", "examinar", "investigar", "comparar",
         "diferenciar", "organizar", "desconstruir", "relacionar",
-        "análise", "analise", "exame", "investigação", "investigacao",
-        "comparação", "comparacao", "diferenciação", "diferenciacao",
-        "organização", "organizacao", "relação", "relacao", "conexão", "conexao"
+        "análise", "exame", "investigação",
+        "comparação", "diferenciação",
+        "organização", "relação", "conexão"
     ],
     "sintese": [
         "criar", "desenvolver", "construir", "planejar",
         "produzir", "inventar", "elaborar", "sintetizar",
-        "síntese", "sintese", "criação", "criacao", "desenvolvimento",
-        "construção", "construcao", "planejamento", "produção", "producao",
-        "invenção", "invencao", "elaboração", "elaboracao", "design", "projetar"
+        "síntese", "criação", "desenvolvimento",
+        "construção", "planejamento", "produção",
+        "invenção", "elaboração", "design", "projetar"
     ],
     "avaliacao": [
         "avaliar", "julgar", "criticar", "justificar",
         "argumentar", "defender", "recomendar", "decidir",
-        "avaliação", "avaliacao", "julgamento", "crítica", "critica",
-        "justificativa", "argumentação", "argumentacao", "defesa",
-        "recomendação", "recomendacao", "decisão", "decisao", "opinar", "opinião", "opiniao"
+        "avaliação", "julgamento", "crítica",
+        "justificativa", "argumentação", "defesa",
+        "recomendação", "decisão", "opinar", "opinião"
     ]
 }
 
 TIPOS_QUESTAO_MAP = {
     "multipla_escolha": [
-        "múltipla escolha", "multipla escolha", "alternativas",
-        "opções", "opcoes", "a, b, c", "marcar", "assinalar",
-        "escolha múltipla", "escolha multipla", "teste", "quiz",
+        "múltipla escolha", "alternativas",
+        "opções", "a, b, c", "marcar", "assinalar",
+        "escolha múltipla", "teste", "quiz",
         "marque", "assinale", "selecione", "escolha a alternativa"
     ],
     "dissertativa_curta": [
@@ -116,7 +116,7 @@ TIPOS_QUESTAO_MAP = {
         "responda brevemente", "responda em poucas palavras"
     ],
     "dissertativa_longa": [
-        "dissertativa longa", "dissertativa", "redação", "redacao",
+        "dissertativa longa", "dissertativa", "redação",
         "texto longo", "desenvolver", "argumentar", "longa",
         "escreva um texto", "desenvolva", "argumente", "discorra",
         "elabore um texto", "produza um texto"
@@ -127,91 +127,90 @@ TIPOS_QUESTAO_MAP = {
         "verdadeiro e falso", "certo e errado"
     ],
     "associacao": [
-        "associação", "associacao", "correspondência", "correspondencia",
+        "associação", "correspondência",
         "relacionar", "ligar", "conectar", "combinar",
         "relacione", "ligue", "conecte", "combine", "associe",
-        "correlação", "correlacao", "matching"
+        "correlação", "matching"
     ]
 }
 
 TIPOS_TEXTO_BASE_MAP = {
     "documento_historico": [
-        "documento histórico", "documento historico", "documento",
-        "fonte histórica", "fonte historica", "trecho histórico",
-        "fonte primária", "fonte primaria", "documento original",
-        "registro histórico", "registro historico"
+        "documento histórico", "documento",
+        "fonte histórica", "trecho histórico",
+        "fonte primária", "documento original",
+        "registro histórico"
     ],
     "texto_literario": [
-        "texto literário", "texto literario", "literatura",
-        "fragmento literário", "poesia", "prosa", "literário", "literario",
-        "trecho literário", "trecho literario", "obra literária", "obra literaria",
-        "conto", "romance", "crônica", "cronica"
+        "texto literário", "literatura",
+        "fragmento literário", "poesia", "prosa", "literário",
+        "trecho literário", "obra literária",
+        "conto", "romance", "crônica"
     ],
     "artigo_jornal": [
-        "artigo", "jornal", "notícia", "noticia", "reportagem",
-        "matéria", "materia", "jornalístico", "jornalistico",
-        "artigo de jornal", "texto jornalístico", "texto jornalistico",
+        "artigo", "jornal", "notícia", "reportagem",
+        "matéria", "jornalístico",
+        "artigo de jornal", "texto jornalístico",
         "manchete", "editorial"
     ],
     "charge": [
         "charge", "cartum", "cartoon", "tirinha", "quadrinho",
-        "história em quadrinhos", "historia em quadrinhos", "hq",
-        "caricatura", "desenho satírico", "desenho satirico"
+        "história em quadrinhos", "hq",
+        "caricatura", "desenho satírico"
     ],
     "grafico_barras": [
-        "gráfico de barras", "grafico de barras", "gráfico em barras",
-        "barras", "gráfico vertical", "grafico vertical",
-        "gráfico de colunas", "grafico de colunas"
+        "gráfico de barras", "gráfico em barras",
+        "barras", "gráfico vertical",
+        "gráfico de colunas"
     ],
     "grafico_linhas": [
-        "gráfico de linhas", "grafico de linhas", "gráfico linear",
-        "linhas", "evolução", "evolucao", "grafico linear",
-        "gráfico temporal", "grafico temporal", "série temporal", "serie temporal"
+        "gráfico de linhas", "gráfico linear",
+        "linhas", "evolução",
+        "gráfico temporal", "série temporal"
     ],
     "tabela": [
         "tabela", "dados tabulados", "planilha", "dados em tabela",
         "quadro", "matriz de dados"
     ],
     "imagem": [
-        "imagem", "foto", "fotografia", "figura", "ilustração", "ilustracao",
-        "fotografia", "picture", "visual", "representação visual", "representacao visual"
+        "imagem", "foto", "fotografia", "figura", "ilustração",
+        "picture", "visual", "representação visual"
     ],
     "mapa": [
-        "mapa", "cartográfico", "cartografico", "geográfico", "geografico",
-        "mapa geográfico", "mapa geografico", "carta geográfica", "carta geografica",
-        "planisfério", "planisferio", "globo"
+        "mapa", "cartográfico", "geográfico",
+        "mapa geográfico", "carta geográfica",
+        "planisfério", "globo"
     ],
     "infografico": [
-        "infográfico", "infografico", "infografia",
-        "gráfico informativo", "grafico informativo", "visualização de dados",
-        "visualizacao de dados"
+        "infográfico", "infografia",
+        "gráfico informativo", "visualização de dados"
     ],
     "poema": [
-        "poema", "poesia", "verso", "letra de música", "letra de musica",
-        "poético", "poetico", "estrofe", "rima", "soneto"
+        "poema", "poesia", "verso", "letra de música",
+        "poético", "estrofe", "rima", "soneto"
     ]
 }
 
 PERFIS_ALUNO_MAP = {
     "bom_dominio": [
-        "bom domínio", "bom dominio", "boa leitura", "avançado em leitura",
-        "lê bem", "le bem", "domina bem", "boa compreensão", "boa compreensao",
-        "leitura fluente", "bom leitor", "boa interpretação", "boa interpretacao"
+        "bom domínio", "boa leitura", "avançado em leitura",
+        "lê bem", "domina bem", "boa compreensão",
+        "leitura fluente", "bom leitor", "boa interpretação"
     ],
     "dificuldade_conexao": [
         "dificuldade em conectar", "dificuldade de conexão",
-        "dificuldade de conexao", "básico mas com dificuldade",
+        "básico mas com dificuldade",
         "dificuldade para relacionar", "dificuldade de interpretação",
-        "dificuldade de interpretacao", "dificuldade em relacionar"
+        "dificuldade em relacionar"
     ],
     "conhecimento_basico": [
-        "conhecimento básico", "conhecimento basico", "básico", "basico",
-        "iniciante", "fundamental", "nível básico", "nivel basico",
-        "introdutório", "introdutorio", "elementar", "inicial"
+        "conhecimento básico", "básico",
+        "iniciante", "fundamental", "nível básico",
+        "introdutório", "elementar", "inicial"
     ],
     "conhecimento_avancado": [
-        "conhecimento avançado", "conhecimento avancado", "avançado",
-        "avancado", "profundo", "expert", "nível avançado", "nivel avancado",
-        "aprofundado", "especializado", "superior", "alto nível", "alto nivel"
+        "conhecimento avançado", "avançado",
+        "profundo", "expert", "nível avançado",
+        "aprofundado", "especializado", "superior", "alto nível"
     ]
 }
@@ -0,0 +1,335 @@
+"""
+Fila de jobs de extração em lote (upload JSONL -> resultados JSONL)
+
+Cada job fica em JOBS_DIR/<id>/ (input.jsonl e results.jsonl) e o estado em
+JOBS_DIR/jobs.db (SQLite). Os workers processam o input em blocos de
+JOBS_CHUNK_SIZE linhas; depois de cada bloco os resultados são gravados e o
+checkpoint (linhas feitas + tamanho do results.jsonl) é salvo. Um worker
+reiniciado trunca o results.jsonl no último checkpoint e continua dali.
+
+Vários processos (workers do uvicorn, pods) podem usar o mesmo JOBS_DIR: um job
+só roda depois de reivindicado com um UPDATE atômico que grava o dono e um lease
+(JOBS_LEASE segundos), renovado enquanto o job anda. Jobs "running" só são
+retomados por outro worker quando o lease expira (dono caiu ou travou).
+
+Para não competir com o /api/extract, o worker espera antes de cada registro
+enquanto houver requisições interativas em andamento.
+"""
+import json
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional
+
+import orjson
+
+from nlp_processor import NLPProcessor
+
+JOBS_DIR = os.getenv("JOBS_DIR", "data/jobs")
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "1"))
+JOBS_CHUNK_SIZE = int(os.getenv("JOBS_CHUNK_SIZE", "100"))
+# Espera máxima (s) por uma brecha no tráfego interativo antes de processar um bloco mesmo assim
+JOBS_MAX_YIELD = float(os.getenv("JOBS_MAX_YIELD", "5"))
+# Validade (s) da reivindicação de um job; renovada a cada registro quando passa da metade
+JOBS_LEASE = float(os.getenv("JOBS_LEASE", "60"))
+
+INPUT_FILE = "input.jsonl"
+RESULTS_FILE = "results.jsonl"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    result_bytes INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    owner TEXT,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+# Colunas adicionadas depois da primeira versão do schema (bancos antigos)
+MIGRATIONS = {"owner": "TEXT", "lease_until": "REAL"}
+
+
+class LeaseLost(Exception):
+    """Outro worker reivindicou o job (o lease deste expirou)"""
+
+
+class JobStore:
+    """Estado dos jobs em SQLite + arquivos por job"""
+
+    def __init__(self, base_dir: str = JOBS_DIR):
+        if not os.path.isabs(base_dir):
+            base_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), base_dir)
+        self.base_dir = base_dir
+        os.makedirs(base_dir, exist_ok=True)
+        self.db_path = os.path.join(base_dir, "jobs.db")
+        with self._connect() as conn:
+            conn.execute(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for name, kind in MIGRATIONS.items():
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def job_dir(self, job_id: str) -> str:
+        return os.path.join(self.base_dir, job_id)
+
+    def path(self, job_id: str, name: str) -> str:
+        return os.path.join(self.job_dir(job_id), name)
+
+    def create(self, total: int) -> str:
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.job_dir(job_id), exist_ok=True)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, total, created_at, updated_at) VALUES (?, 'uploading', ?, ?, ?)",
+                (job_id, total, now, now)
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def pending(self) -> List[str]:
+        """Jobs enfileirados ou interrompidos no meio (lease expirado), para retomar"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' OR "
+                "(status = 'running' AND (lease_until IS NULL OR lease_until < ?)) ORDER BY created_at",
+                (time.time(),)
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    def claim(self, job_id: str, owner: str, lease: float = JOBS_LEASE) -> bool:
+        """
+        Reivindica o job atomicamente: só um worker consegue, e só se o job está
+        na fila ou o lease do dono anterior expirou
+
+        Returns:
+            True se este worker passou a ser o dono
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, lease_until = ?, updated_at = ? "
+                "WHERE id = ? AND (status = 'queued' OR "
+                "(status = 'running' AND (lease_until IS NULL OR lease_until < ?)))",
+                (owner, now + lease, now, job_id, now)
+            )
+        return cursor.rowcount == 1
+
+    def renew(self, job_id: str, owner: str, lease: float = JOBS_LEASE, **fields):
+        """
+        Renova o lease (e grava fields, ex: checkpoint) se o job ainda é deste dono
+
+        Raises:
+            LeaseLost: outro worker reivindicou o job
+        """
+        now = time.time()
+        fields.update(lease_until=now + lease, updated_at=now)
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            cursor = conn.execute(f"UPDATE jobs SET {columns} WHERE id = ? AND owner = ?",
+                                  (*fields.values(), job_id, owner))
+        if cursor.rowcount != 1:
+            raise LeaseLost(job_id)
+
+    def release(self, job_id: str, owner: str, **fields) -> bool:
+        """Grava o estado final (done/failed) e solta o job, se ainda é deste dono"""
+        fields.update(owner=None, lease_until=None, updated_at=time.time())
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            cursor = conn.execute(f"UPDATE jobs SET {columns} WHERE id = ? AND owner = ?",
+                                  (*fields.values(), job_id, owner))
+        return cursor.rowcount == 1
+
+
+class JobQueue:
+    """Pool de workers em threads que processa os jobs em blocos com checkpoint"""
+
+    def __init__(self, processor: NLPProcessor, store: Optional[JobStore] = None,
+                 workers: int = JOBS_WORKERS, chunk_size: int = JOBS_CHUNK_SIZE,
+                 lease: float = JOBS_LEASE):
+        self.processor = processor
+        self.store = store or JobStore()
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.lease = lease
+        # Identifica este processo nas reivindicações (cada thread acrescenta o nome)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        """Inicia os workers e reenfileira jobs na fila ou com lease expirado"""
+        if self._threads:
+            return
+        self._enqueue_pending()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    async def submit(self, chunks) -> str:
+        """
+        Grava o upload (iterável assíncrono de bytes, ex: request.stream()) e enfileira
+
+        Returns:
+            id do job
+        """
+        job_id = self.store.create(total=0)
+        total = 0
+        pending = b""
+        with open(self.store.path(job_id, INPUT_FILE), "wb") as f:
+            async for chunk in chunks:
+                f.write(chunk)
+                pending += chunk
+                *lines, pending = pending.split(b"\n")
+                total += sum(1 for line in lines if line.strip())
+        if pending.strip():
+            total += 1
+        self.store.update(job_id, status="queued", total=total)
+        self._queue.put(job_id)
+        return job_id
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        total = job["total"] or 0
+        return {
+            "job_id": job["id"],
+            "status": job["status"],
+            "total": total,
+            "done": job["done"],
+            "failed": job["failed"],
+            "progress": round(job["done"] / total, 4) if total else (1.0 if job["status"] == "done" else 0.0),
+            "error": job["error"],
+            "created_at": job["created_at"],
+            "updated_at": job["updated_at"]
+        }
+
+    def iter_results(self, job_id: str, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """Conteúdo já checkpointado do results.jsonl (parcial se o job ainda roda)"""
+        job = self.store.get(job_id)
+        remaining = job["result_bytes"] if job else 0
+        path = self.store.path(job_id, RESULTS_FILE)
+        if not remaining or not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            while remaining > 0:
+                data = f.read(min(chunk_size, remaining))
+                if not data:
+                    break
+                remaining -= len(data)
+                yield data
+
+    def _enqueue_pending(self):
+        for job_id in self.store.pending():
+            print(f"📦 Retomando job {job_id}")
+            self._queue.put(job_id)
+
+    def _work(self):
+        owner = f"{self.owner}:{threading.current_thread().name}"
+        while True:
+            try:
+                job_id = self._queue.get(timeout=self.lease)
+            except queue.Empty:
+                # Fila ociosa: procura jobs de outros processos que caíram (lease expirado)
+                self._enqueue_pending()
+                continue
+            try:
+                if self.store.claim(job_id, owner, self.lease):
+                    self._run(job_id, owner)
+            except LeaseLost:
+                print(f"⚠️  Job {job_id}: lease expirou e outro worker assumiu")
+            except Exception as e:
+                print(f"❌ Job {job_id} falhou: {e}")
+                self.store.release(job_id, owner, status="failed", error=str(e))
+            finally:
+                self._queue.task_done()
+
+    def _classify(self, line_number: int, line: str) -> Dict[str, Any]:
+        """Uma linha do input -> uma linha de resultado (erros ficam na própria linha)"""
+        try:
+            record = json.loads(line)
+            if isinstance(record, str):
+                record = {"text": record}
+            text = record.get("text") or ""
+            if len(text.strip()) < 3:
+                raise ValueError("Texto muito curto")
+            # Referência local: um reload no meio do job vale a partir do próximo registro
+            result = self.processor.pipeline.classify(text, record.get("context"))
+            return {"line": line_number, "id": record.get("id"), **result}
+        except Exception as e:
+            return {"line": line_number, "error": str(e)}
+
+    def _run(self, job_id: str, owner: str):
+        """Processa um job já reivindicado por owner (LeaseLost se outro worker assumir)"""
+        job = self.store.get(job_id)
+        if not self.processor.is_loaded():
+            raise RuntimeError("Modelo NLP não carregado")
+
+        done, failed = job["done"], job["failed"]
+        renew_at = time.monotonic() + self.lease / 2
+
+        results_path = self.store.path(job_id, RESULTS_FILE)
+        # Descarta o que foi escrito depois do último checkpoint
+        with open(results_path, "ab") as out:
+            out.truncate(job["result_bytes"])
+
+        with open(self.store.path(job_id, INPUT_FILE), "r", encoding="utf-8") as f, \
+                open(results_path, "ab") as out:
+            lines = (line for line in f if line.strip())
+            for _ in range(done):
+                next(lines, None)
+
+            while True:
+                chunk = [line for _, line in zip(range(self.chunk_size), lines)]
+                if not chunk:
+                    break
+
+                rows = []
+                for offset, line in enumerate(chunk):
+                    if time.monotonic() > renew_at:
+                        self.store.renew(job_id, owner, self.lease)
+                        renew_at = time.monotonic() + self.lease / 2
+                    self.processor.wait_for_idle(JOBS_MAX_YIELD)
+                    row = self._classify(done + offset + 1, line)
+                    failed += "error" in row
+                    rows.append(orjson.dumps(row, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS))
+                # Confirma o lease antes de escrever: um job assumido por outro não é tocado
+                self.store.renew(job_id, owner, self.lease)
+                out.write(b"\n".join(rows) + b"\n")
+                out.flush()
+                os.fsync(out.fileno())
+
+                done += len(chunk)
+                self.store.renew(job_id, owner, self.lease, done=done, failed=failed, result_bytes=out.tell())
+                renew_at = time.monotonic() + self.lease / 2
+
+        if not self.store.release(job_id, owner, status="done"):
+            raise LeaseLost(job_id)
+        print(f"✅ Job {job_id}: {done} registros ({failed} com erro)")
@@ -1,11 +1,16 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Header, Response, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional, Dict, List, Any
 import uvicorn
 import os
+import orjson
 from dotenv import load_dotenv
 from nlp_processor import NLPProcessor
+from jobs import JobQueue
+from matchers.profiling import ProfilerBusy, StackSampler, profile_path
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -31,18 +36,95 @@ app.add_middleware(
 # Inicializar processador NLP
 nlp_processor = NLPProcessor()
 
+# Hot reload de dados/tabelas: por arquivo (polling) e/ou endpoint admin
+if os.getenv("HOT_RELOAD_WATCH", "false").lower() in ("1", "true", "yes"):
+    nlp_processor.start_watcher(float(os.getenv("HOT_RELOAD_INTERVAL", "5")))
+
+# Amostrador periódico de pilhas (flame graph) em PROFILE_DIR
+if os.getenv("PROFILE_SAMPLER", "false").lower() in ("1", "true", "yes"):
+    StackSampler(
+        interval=float(os.getenv("PROFILE_SAMPLER_INTERVAL", "0.05")),
+        flush_interval=float(os.getenv("PROFILE_SAMPLER_FLUSH", "60"))
+    ).start()
+
+# Aquecimento em background: GET /ready só passa depois dele
+nlp_processor.start_warmup()
+
+# Jobs em lote: workers em background, retomam jobs interrompidos
+job_queue = JobQueue(nlp_processor)
+if nlp_processor.is_loaded():
+    job_queue.start()
+
+
+# Cache-Control das respostas do catálogo (estáticas até o próximo reload)
+CATALOG_MAX_AGE = int(os.getenv("CATALOG_MAX_AGE", "3600"))
+
+
+def require_admin(token: Optional[str]):
+    """Valida o token de administração (endpoints desabilitados sem ADMIN_TOKEN)"""
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=403, detail="Endpoints de administração desabilitados")
+    if token != admin_token:
+        raise HTTPException(status_code=401, detail="Token de administração inválido")
+
 
 class TextInput(BaseModel):
     text: str
     context: Optional[Dict[str, Any]] = None
+    # Omite original_text e detalhes de depuração (mensagens das sugestões, estatísticas da sessão)
+    compact: bool = False
+
+
+class RefineInput(BaseModel):
+    text: str
+    # Resultado anterior do /api/extract (ou do refine anterior)
+    previous: Dict[str, Any]
+    # Campos confirmados/alterados agora (valor vazio limpa o campo)
+    changed: Dict[str, Any]
+    context: Optional[Dict[str, Any]] = None
+    compact: bool = False
+
+
+class Candidate(BaseModel):
+    value: Any
+    confidence: float
+
+
+class Suggestion(BaseModel):
+    field: str
+    values: List[Any]
+    candidates: Optional[List[Candidate]] = None
+    message: Optional[str] = None
 
 
 class ExtractionResponse(BaseModel):
     extracted: Dict[str, Any]
     confidence: Dict[str, float]
-    suggestions: List[Dict[str, Any]]
+    suggestions: List[Suggestion]
     missing_fields: List[str]
-    original_text: str
+    original_text: Optional[str] = None
+    profile: Optional[Dict[str, Any]] = None
+
+
+def build_payload(result: Dict[str, Any], text: str, compact: bool = False) -> Dict[str, Any]:
+    """
+    Monta a resposta de extração como dict simples (serializado direto com orjson,
+    sem instanciar ExtractionResponse - o modelo fica só para a documentação)
+    """
+    suggestions = result["suggestions"]
+    if compact:
+        suggestions = [{k: v for k, v in s.items() if k != "message"} for s in suggestions]
+    
+    payload = {
+        "extracted": result["extracted"],
+        "confidence": result["confidence"],
+        "suggestions": suggestions,
+        "missing_fields": result["missing_fields"]
+    }
+    if not compact:
+        payload["original_text"] = text
+    return payload
 
 
 @app.get("/")
@@ -58,12 +140,32 @@ async def root():
 async def health_check():
     return {
         "status": "healthy",
-        "nlp_model_loaded": nlp_processor.is_loaded()
+        "nlp_model_loaded": nlp_processor.is_loaded(),
+        "cache": nlp_processor.cache_stats(),
+        "coalescing": nlp_processor.coalescing_stats(),
+        "slow_requests": nlp_processor.slow_log.snapshot() if nlp_processor.slow_log else None,
+        "warmup": nlp_processor.warmup.snapshot()
     }
 
 
-@app.post("/api/extract", response_model=ExtractionResponse)
-async def extract_information(input_data: TextInput):
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 até o modelo carregar e o aquecimento terminar"""
+    payload = {
+        "ready": nlp_processor.is_ready(),
+        "nlp_model_loaded": nlp_processor.is_loaded(),
+        "warmup": nlp_processor.warmup.snapshot()
+    }
+    return ORJSONResponse(payload, status_code=200 if payload["ready"] else 503)
+
+
+@app.post("/api/extract", response_model=ExtractionResponse, response_class=ORJSONResponse)
+async def extract_information(
+    input_data: TextInput,
+    profile: bool = False,
+    x_profile: Optional[str] = Header(None),
+    x_admin_token: Optional[str] = Header(None)
+):
     """
     Extrai informações educacionais de texto livre.
     
@@ -76,6 +178,14 @@ async def extract_information(input_data: TextInput):
     - tipoQuestao: Formato da questão
     - tipoTextoBase: Tipo de texto de apoio
     - perfilAluno: Perfil do estudante
+    
+    Com "compact": true a resposta não repete original_text nem as mensagens das sugestões.
+    
+    Com ?profile=true ou o header X-Profile (e X-Admin-Token), a chamada roda sob
+    cProfile e a resposta traz "profile": custo por método do BNCCMatcher, número
+    de chamadas ao spaCy e o id do .prof gravado (GET /admin/profiles/{id}).
+    Um profile por vez no processo (409 se já há outro); ele inclui o trabalho
+    das outras threads no mesmo intervalo.
     """
     try:
         if not input_data.text or len(input_data.text.strip()) < 3:
@@ -84,15 +194,27 @@ async def extract_information(input_data: TextInput):
                 detail="Texto muito curto. Por favor, forneça mais informações."
             )
         
-        result = nlp_processor.process(input_data.text, input_data.context)
+        if profile or x_profile:
+            require_admin(x_admin_token)
+            result, summary = await run_in_threadpool(nlp_processor.profile, input_data.text, input_data.context)
+            payload = build_payload(result, input_data.text, input_data.compact)
+            payload["profile"] = summary
+            return ORJSONResponse(payload)
         
-        return ExtractionResponse(
-            extracted=result["extracted"],
-            confidence=result["confidence"],
-            suggestions=result["suggestions"],
-            missing_fields=result["missing_fields"],
-            original_text=input_data.text
-        )
+        # Em thread: requisições simultâneas com o mesmo texto são coalescidas em process()
+        result = await run_in_threadpool(nlp_processor.process, input_data.text, input_data.context)
+        
+        return ORJSONResponse(build_payload(result, input_data.text, input_data.compact))
+    
+    except HTTPException:
+        raise
+    
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    except ValueError as e:
+        # Ex: currículo desconhecido em context["curriculo"]
+        raise HTTPException(status_code=400, detail=str(e))
     
     except Exception as e:
         raise HTTPException(
@@ -101,6 +223,226 @@ async def extract_information(input_data: TextInput):
         )
 
 
+@app.post("/api/extract/refine", response_model=ExtractionResponse, response_class=ORJSONResponse)
+async def refine_extraction(input_data: RefineInput):
+    """
+    Reextração incremental: parte de "previous" e recalcula só os campos depois
+    do campo alterado na cadeia disciplina -> ano -> unidadeTematica ->
+    objetoConhecimento -> habilidade, reaproveitando o que já foi calculado
+    para o mesmo texto.
+    """
+    try:
+        if not input_data.text or len(input_data.text.strip()) < 3:
+            raise HTTPException(
+                status_code=400,
+                detail="Texto muito curto. Por favor, forneça mais informações."
+            )
+        
+        result = await run_in_threadpool(
+            nlp_processor.refine, input_data.text, input_data.previous, input_data.changed, input_data.context
+        )
+        return ORJSONResponse(build_payload(result, input_data.text, input_data.compact))
+    
+    except HTTPException:
+        raise
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao refinar extração: {str(e)}"
+        )
+
+
+def catalog_response(entry, if_none_match: Optional[str], accept_encoding: Optional[str]) -> Response:
+    """Resposta pronta do catálogo: 304 se o ETag da versão negociada bate, senão o corpo pré-comprimido"""
+    body, encoding = entry.negotiate(accept_encoding)
+    headers = {
+        "ETag": entry.etag_for(encoding),
+        "Cache-Control": f"public, max-age={CATALOG_MAX_AGE}",
+        "Vary": "Accept-Encoding"
+    }
+    if entry.matches(if_none_match, encoding):
+        return Response(status_code=304, headers=headers)
+    
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def get_catalog(curriculo: Optional[str]):
+    if not nlp_processor.is_loaded():
+        raise HTTPException(status_code=503, detail="Modelo NLP não carregado")
+    try:
+        return nlp_processor.pipeline.get_catalog(curriculo)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/catalog")
+async def catalog_disciplinas(
+    curriculo: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None)
+):
+    """Disciplinas do currículo (primeiro select)"""
+    entry = get_catalog(curriculo).disciplinas()
+    return catalog_response(entry, if_none_match, accept_encoding)
+
+
+@app.get("/api/catalog/{disciplina}")
+async def catalog_anos(
+    disciplina: str,
+    curriculo: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None)
+):
+    """Anos disponíveis para a disciplina"""
+    try:
+        entry = get_catalog(curriculo).anos(disciplina)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Disciplina não encontrada: '{disciplina}'")
+    return catalog_response(entry, if_none_match, accept_encoding)
+
+
+@app.get("/api/catalog/{disciplina}/{ano}")
+async def catalog_arvore(
+    disciplina: str,
+    ano: str,
+    curriculo: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None)
+):
+    """Unidades, objetos e habilidades de disciplina + ano (demais selects)"""
+    try:
+        entry = get_catalog(curriculo).arvore(disciplina, ano)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Ano '{ano}' não encontrado para '{disciplina}'")
+    return catalog_response(entry, if_none_match, accept_encoding)
+
+
+@app.post("/api/jobs", status_code=202)
+async def create_job(request: Request):
+    """
+    Cria um job de extração em lote. O corpo é JSONL, uma linha por registro:
+    {"id": "...", "text": "...", "context": {...}} (id e context opcionais).
+    """
+    if not nlp_processor.is_loaded():
+        raise HTTPException(status_code=503, detail="Modelo NLP não carregado")
+    job_id = await job_queue.submit(request.stream())
+    return job_queue.status(job_id)
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Progresso do job (status, total, done, failed, progress)"""
+    status = job_queue.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return status
+
+
+@app.get("/api/jobs/{job_id}/results")
+async def get_job_results(job_id: str):
+    """Resultados em JSONL (uma linha por registro, na ordem do input); parciais enquanto o job roda"""
+    if job_queue.status(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return StreamingResponse(job_queue.iter_results(job_id), media_type="application/x-ndjson")
+
+
+@app.get("/admin/profiles/{profile_id}")
+async def admin_profile(profile_id: str, x_admin_token: Optional[str] = Header(None)):
+    """Arquivo .prof gravado por uma requisição com profile (abrir com pstats/snakeviz)"""
+    require_admin(x_admin_token)
+    path = profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile não encontrado")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+
+
+@app.post("/admin/reload", status_code=202)
+async def admin_reload(x_admin_token: Optional[str] = Header(None)):
+    """
+    Recarrega BNCC e tabelas de mapeamento em background, sem recarregar o
+    modelo spaCy. A pipeline nova substitui a antiga quando estiver pronta.
+    """
+    require_admin(x_admin_token)
+    if not nlp_processor.is_loaded():
+        raise HTTPException(status_code=503, detail="Modelo NLP não carregado")
+    
+    started = nlp_processor.reload_in_background()
+    return {"started": started, "in_progress": True}
+
+
+@app.get("/admin/reload")
+async def admin_reload_status(x_admin_token: Optional[str] = Header(None)):
+    """Estado do último reload: duração da construção e tamanho dos índices"""
+    require_admin(x_admin_token)
+    return {
+        "in_progress": nlp_processor.is_reloading(),
+        "last_reload": nlp_processor.last_reload
+    }
+
+
+@app.websocket("/ws/extract")
+async def extract_incremental(websocket: WebSocket):
+    """
+    Extração incremental enquanto o professor digita.
+    
+    Cada mensagem é {"text": "...", "context": {...}, "compact": false}. A sessão guarda o último
+    Doc e os resultados de cada estágio, e só reexecuta os estágios cujas
+    entradas mudaram (ex: trocar o verbo de Bloom não refaz a busca na BNCC).
+    Depois de um reload a sessão é recriada com a pipeline nova.
+    """
+    await websocket.accept()
+    session = nlp_processor.create_session()
+    
+    try:
+        while True:
+            try:
+                data = orjson.loads(await websocket.receive_text())
+            except orjson.JSONDecodeError:
+                data = None
+            if not isinstance(data, dict):
+                await websocket.send_json({"error": "Mensagem deve ser um objeto JSON"})
+                continue
+            text = data.get("text") or ""
+            
+            if not isinstance(text, str) or len(text.strip()) < 3:
+                await websocket.send_json({
+                    "error": "Texto muito curto. Por favor, forneça mais informações."
+                })
+                continue
+            
+            # Pipeline síncrona: roda no threadpool para não bloquear o event loop
+            try:
+                if nlp_processor.is_loaded():
+                    session, result = await run_in_threadpool(nlp_processor.update_session, session,
+                                                              text, data.get("context"))
+                    stats = dict(session.stats)
+                else:
+                    result = await run_in_threadpool(nlp_processor.process, text, data.get("context"))
+                    stats = {}
+            except Exception as e:
+                await websocket.send_json({"error": f"Erro ao processar texto: {str(e)}"})
+                continue
+            
+            compact = bool(data.get("compact"))
+            payload = build_payload(result, text, compact)
+            if not compact:
+                payload["session"] = stats
+            await websocket.send_text(
+                orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode()
+            )
+    except WebSocketDisconnect:
+        pass
+
+
 if __name__ == "__main__":
     # Configurações via env
     host = os.getenv("API_HOST", "0.0.0.0")
@@ -0,0 +1,133 @@
+"""
+Índice de vizinhos aproximados (ANN) para vetores da BNCC
+
+IVF (inverted file): os vetores são agrupados por k-means esférico e a busca
+compara a consulta apenas com os vetores dos `n_probe` grupos mais próximos.
+`n_probe` controla o equilíbrio recall/velocidade: n_probe == n_lists é busca exata.
+
+O k-means é treinado numa amostra (`train_per_list` vetores por grupo) e as
+atribuições são calculadas em lotes de `batch_size` linhas, então a memória do
+treino não cresce com N x n_lists.
+"""
+from typing import Hashable, List, Optional, Sequence, Tuple
+import numpy as np
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Normaliza linhas para norma 1 (similaridade de cosseno vira produto interno)"""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, batch_size: int) -> np.ndarray:
+    """Centróide mais próximo de cada vetor, calculado em lotes"""
+    assign = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), batch_size):
+        assign[start:start + batch_size] = np.argmax(vectors[start:start + batch_size] @ centroids.T, axis=1)
+    return assign
+
+
+class IVFIndex:
+    """Índice IVF com centróides k-means em NumPy puro"""
+
+    def __init__(self, n_lists: Optional[int] = None, n_probe: int = 8,
+                 n_iter: int = 15, seed: int = 0, train_per_list: int = 64,
+                 batch_size: int = 4096):
+        """
+        Args:
+            n_lists: número de grupos (padrão: ~4 * sqrt(N))
+            n_probe: grupos visitados por consulta (maior = mais recall, mais lento)
+            n_iter: iterações do k-means
+            seed: semente para inicialização reprodutível
+            train_per_list: tamanho da amostra de treino por grupo (N pequeno usa todos)
+            batch_size: linhas por lote nas atribuições aos centróides
+        """
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.seed = seed
+        self.train_per_list = train_per_list
+        self.batch_size = batch_size
+        self.ids: List[Hashable] = []
+        self.vectors: Optional[np.ndarray] = None
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: List[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def build(self, vectors: np.ndarray, ids: Sequence[Hashable]) -> "IVFIndex":
+        """Treina os centróides e distribui os vetores nas listas invertidas"""
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        self.ids = list(ids)
+        self.vectors = vectors
+        n = len(vectors)
+        if n == 0:
+            self.centroids = np.zeros((0, vectors.shape[1] if vectors.ndim == 2 else 0), dtype=np.float32)
+            self.lists = []
+            return self
+
+        n_lists = self.n_lists or max(1, int(4 * np.sqrt(n)))
+        n_lists = min(n_lists, n)
+
+        rng = np.random.default_rng(self.seed)
+        centroids = vectors[rng.choice(n, size=n_lists, replace=False)].copy()
+
+        train_size = n_lists * self.train_per_list
+        sample = vectors if n <= train_size else vectors[np.sort(rng.choice(n, size=train_size, replace=False))]
+
+        for _ in range(self.n_iter):
+            assign = _assign(sample, centroids, self.batch_size)
+            counts = np.bincount(assign, minlength=n_lists)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+            # Grupo vazio: reinicia num vetor aleatório
+            for c in np.flatnonzero(~filled):
+                centroids[c] = sample[rng.integers(len(sample))]
+            centroids = _normalize(centroids)
+
+        assign = _assign(vectors, centroids, self.batch_size)
+        counts = np.bincount(assign, minlength=n_lists)
+        self.centroids = centroids
+        self.lists = np.split(np.argsort(assign, kind="stable"), np.cumsum(counts)[:-1])
+        return self
+
+    def search(self, query: np.ndarray, k: int = 10,
+               n_probe: Optional[int] = None) -> List[Tuple[Hashable, float]]:
+        """
+        Retorna os k ids mais similares (cosseno) à consulta
+
+        Returns:
+            lista de (id, similaridade) em ordem decrescente
+        """
+        if not self.ids:
+            return []
+
+        query = _normalize(np.asarray(query, dtype=np.float32))
+        n_probe = min(n_probe or self.n_probe, len(self.lists))
+
+        probe = np.argsort(-(self.centroids @ query))[:n_probe]
+        rows = np.concatenate([self.lists[c] for c in probe])
+        if len(rows) == 0:
+            return []
+
+        scores = self.vectors[rows] @ query
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[rows[i]], float(scores[i])) for i in top]
+
+    def exact_search(self, query: np.ndarray, k: int = 10) -> List[Tuple[Hashable, float]]:
+        """Busca exata (varredura linear) - referência para medir recall"""
+        if not self.ids:
+            return []
+
+        query = _normalize(np.asarray(query, dtype=np.float32))
+        scores = self.vectors @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[i], float(scores[i])) for i in top]
@@ -0,0 +1,109 @@
+"""
+Tabela de respostas prontas para os nomes do próprio currículo
+
+Boa parte do tráfego é só o nome de uma unidade temática ou objeto de
+conhecimento copiado de um select ("Frações", "O Brasil da Era Vargas").
+A tabela guarda, para cada nome normalizado (e para as variações dele com
+sinônimos), o resultado que a pipeline produz para esse texto - mesmo formato
+e mesmas confianças - e responde por lookup antes de a pipeline rodar.
+
+É construída em background depois que a pipeline sobe; enquanto não termina,
+os nomes ainda não calculados seguem pelo caminho normal.
+"""
+import copy
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from matchers.base_matcher import normalize_text
+from matchers.synonyms import expand_query
+
+_EDGE_PUNCT_RE = re.compile(r'^[\W_]+|[\W_]+$')
+
+
+def answer_key(text: str) -> str:
+    """Forma normalizada usada no lookup (sem acento, minúscula, espaços e pontuação das pontas)"""
+    return _EDGE_PUNCT_RE.sub("", " ".join(normalize_text(text).split()))
+
+
+class AnswerTable:
+    """nome normalizado -> resultado da pipeline para aquele nome"""
+
+    def __init__(self):
+        self._answers: Dict[str, Dict[str, Any]] = {}
+        self.ready = False
+        self.build_seconds: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._answers)
+
+    def lookup(self, text: str) -> Optional[Dict[str, Any]]:
+        """Cópia do resultado pronto ou None"""
+        answer = self._answers.get(answer_key(text))
+        return copy.deepcopy(answer) if answer is not None else None
+
+    @staticmethod
+    def iter_names(data) -> Iterator[str]:
+        """Unidades e objetos do currículo, sem repetição"""
+        seen = set()
+        for anos in data.values():
+            for unidades in anos.values():
+                for unidade, objetos in unidades.items():
+                    for name in [unidade, *objetos.keys()]:
+                        if name not in seen:
+                            seen.add(name)
+                            yield name
+
+    def build(self, classify: Callable[[str], Dict[str, Any]], data, synonyms_map: Dict,
+              pause: Optional[Callable[[], None]] = None, max_length: Optional[int] = None):
+        """
+        Calcula as respostas
+
+        Args:
+            classify: função texto -> resultado (a classify da pipeline)
+            data: currículo {disciplina: {ano: {unidade: {objeto: [...]}}}}
+            synonyms_map: sinônimos usados para gerar as variações de cada nome
+            pause: chamada antes de cada nome (ex: ceder a vez ao tráfego interativo)
+            max_length: nomes e variações mais longos são pulados (a consulta
+                recusa esses textos antes de chegar à tabela)
+        """
+        start = time.perf_counter()
+        # Sinônimos soltos ("vargas", "trabalhista") não são nomes do currículo
+        bare_synonyms = {syn for values in synonyms_map.values() for syn in values}
+        variations = {}
+
+        for name in self.iter_names(data):
+            if max_length is not None and len(name) > max_length:
+                continue
+            self._compute(classify, name, answer_key(name), pause)
+            for variation in expand_query(name, synonyms_map)[1:]:
+                if variation not in bare_synonyms and (max_length is None or len(variation) <= max_length):
+                    variations.setdefault(answer_key(variation), variation)
+
+        # Cada variação tem o resultado da pipeline para o próprio texto (não o do
+        # nome de origem) e nunca substitui o nome exato de outro item
+        for key, variation in variations.items():
+            if key not in self._answers:
+                self._compute(classify, variation, key, pause)
+
+        self.ready = True
+        self.build_seconds = round(time.perf_counter() - start, 2)
+        print(f"📒 Tabela de respostas prontas: {len(self._answers)} nomes em {self.build_seconds}s")
+
+    def _compute(self, classify: Callable[[str], Dict[str, Any]], text: str, key: str,
+                 pause: Optional[Callable[[], None]] = None):
+        if pause is not None:
+            pause()
+        try:
+            self._answers[key] = classify(text)
+        except Exception as e:
+            print(f"⚠️  Resposta pronta não calculada para '{text}': {e}")
+
+    def build_in_background(self, *args, **kwargs) -> threading.Thread:
+        thread = threading.Thread(target=self.build, args=args, kwargs=kwargs, daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self) -> Dict[str, Any]:
+        return {"nomes": len(self._answers), "pronta": self.ready, "segundos": self.build_seconds}
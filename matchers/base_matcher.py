@@ -1,18 +1,35 @@
 """
 Base matcher class for all educational field matchers
 """
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 from spacy.matcher import PhraseMatcher
 from spacy.tokens import Doc
 import unicodedata
 
 
+class _AccentTable(dict):
+    """
+    Tabela para str.translate: caractere -> caractere sem acento. Cada caractere
+    é decomposto (unicodedata) só na primeira vez que aparece; depois vem do cache.
+    """
+    
+    def __missing__(self, codepoint: int):
+        base = ''.join(
+            c for c in unicodedata.normalize('NFD', chr(codepoint))
+            if unicodedata.category(c) != 'Mn'
+        )
+        # None remove o caractere (diacrítico combinante solto)
+        value = base or None
+        self[codepoint] = value
+        return value
+
+
+_ACCENT_TABLE = _AccentTable()
+
+
 def remove_accents(text: str) -> str:
     """Remove acentos de um texto"""
-    return ''.join(
-        c for c in unicodedata.normalize('NFD', text)
-        if unicodedata.category(c) != 'Mn'
-    )
+    return text.translate(_ACCENT_TABLE)
 
 
 def normalize_text(text: str) -> str:
@@ -20,6 +37,16 @@ def normalize_text(text: str) -> str:
     return remove_accents(text.lower())
 
 
+def fold_doc(doc: Doc) -> Doc:
+    """
+    Grava a forma sem acento e em minúsculas em token.norm_, para que matchers
+    com attr="NORM" casem "matematica", "matemática" e "matemàtica" igualmente
+    """
+    for token in doc:
+        token.norm_ = normalize_text(token.text)
+    return doc
+
+
 class BaseMatcher:
     """Classe base para matchers educacionais"""
     
@@ -31,43 +58,60 @@ class BaseMatcher:
         """
         self.nlp = nlp
         self.patterns = patterns
-        self.matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+        # NORM = forma sem acento (ver fold_doc): uma entrada por palavra-chave
+        self.matcher = PhraseMatcher(nlp.vocab, attr="NORM")
         self._build_matcher()
     
     def _build_matcher(self):
-        """Constrói o PhraseMatcher com os padrões"""
+        """Constrói o PhraseMatcher com os padrões (variações de acento colapsadas)"""
         for category, keywords in self.patterns.items():
+            folded = dict.fromkeys(normalize_text(kw) for kw in keywords)
             # Criar docs para cada keyword
-            patterns = [self.nlp.make_doc(kw) for kw in keywords]
+            patterns = [fold_doc(self.nlp.make_doc(kw)) for kw in folded]
             self.matcher.add(category, patterns)
     
-    def match(self, text: str) -> Optional[Tuple[str, float]]:
+    def _to_doc(self, text: Union[str, Doc]) -> Doc:
+        """Aceita texto ou Doc já processado (evita parse duplicado)"""
+        doc = text if isinstance(text, Doc) else self.nlp(text)
+        return fold_doc(doc)
+    
+    def match(self, text: Union[str, Doc]) -> Optional[Tuple[str, float]]:
         """
         Encontra a melhor correspondência no texto
         
+        Args:
+            text: texto ou Doc já processado pela pipeline
+        
         Returns:
             Tuple (categoria, confiança) ou None
         """
-        doc = self.nlp(text)
-        matches = self.matcher(doc)
+        ranked = self.rank(text, top_k=1)
+        return ranked[0] if ranked else None
+    
+    def rank(self, text: Union[str, Doc], top_k: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Categorias encontradas, da melhor para a pior (maior span primeiro), uma por categoria
         
-        if not matches:
-            return None
+        Args:
+            text: texto ou Doc já processado pela pipeline
+            top_k: limite de categorias retornadas (None = todas)
         
-        # Encontrar o melhor match (maior span)
-        best_match = None
-        best_length = 0
+        Returns:
+            Lista de (categoria, confiança)
+        """
+        doc = self._to_doc(text)
+        matches = self.matcher(doc)
         
-        for match_id, start, end in matches:
+        # Maior span de cada categoria (empate: o que aparece primeiro)
+        best_spans = {}
+        for position, (match_id, start, end) in enumerate(matches):
             span = doc[start:end]
-            span_length = len(span.text)
-            
-            if span_length > best_length:
-                best_length = span_length
-                category = self.nlp.vocab.strings[match_id]
-                best_match = (category, self._calculate_confidence(span))
+            category = self.nlp.vocab.strings[match_id]
+            if category not in best_spans or len(span.text) > len(best_spans[category][1].text):
+                best_spans[category] = (position, span)
         
-        return best_match
+        ranked = sorted(best_spans.items(), key=lambda item: (-len(item[1][1].text), item[1][0]))
+        return [(category, self._calculate_confidence(span)) for category, (_, span) in ranked[:top_k]]
     
     def _calculate_confidence(self, span) -> float:
         """Calcula confiança baseada no tamanho do match"""
@@ -76,9 +120,9 @@ class BaseMatcher:
         length_bonus = min(0.20, len(span.text) / 100)
         return min(0.98, base_confidence + length_bonus)
     
-    def match_all(self, text: str) -> List[Tuple[str, float]]:
+    def match_all(self, text: Union[str, Doc]) -> List[Tuple[str, float]]:
         """Retorna todos os matches encontrados"""
-        doc = self.nlp(text)
+        doc = self._to_doc(text)
         matches = self.matcher(doc)
         
         results = []
@@ -5,47 +5,192 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from matchers.base_matcher import BaseMatcher
+from typing import Dict, List, Optional, Set, Tuple, Union
+from spacy.tokens import Doc
+from matchers.base_matcher import BaseMatcher, normalize_text
 
 BLOOM_PATTERNS = {
     "conhecimento": [
         "lembrar", "recordar", "memorizar", "listar", "definir",
         "identificar", "nomear", "reconhecer", "conhecimento",
-        "memorização", "memorizacao", "saber", "conhecer",
+        "memorização", "saber", "conhecer",
         "relembrar", "citar", "enumerar", "rotular"
     ],
     "compreensao": [
         "compreender", "entender", "explicar", "interpretar",
         "resumir", "descrever", "classificar", "comparar",
-        "compreensão", "compreensao", "entendimento", "interpretação",
-        "interpretacao", "parafrasear", "ilustrar", "exemplificar"
+        "compreensão", "entendimento", "interpretação",
+        "parafrasear", "ilustrar", "exemplificar"
     ],
     "aplicacao": [
         "aplicar", "usar", "executar", "implementar", "resolver",
-        "demonstrar", "praticar", "calcular", "aplicação", "aplicacao",
+        "demonstrar", "praticar", "calcular", "aplicação",
         "utilizar", "empregar", "operar", "solucionar"
     ],
     "analise": [
         "analisar", "examinar", "investigar", "comparar",
         "diferenciar", "organizar", "desconstruir", "relacionar",
-        "análise", "analise", "distinguir", "categorizar",
+        "análise", "distinguir", "categorizar",
         "contrastar", "separar", "dividir"
     ],
     "sintese": [
         "criar", "desenvolver", "construir", "planejar",
         "produzir", "inventar", "elaborar", "sintetizar",
-        "síntese", "sintese", "design", "projetar",
+        "síntese", "design", "projetar",
         "formular", "compor", "gerar", "combinar"
     ],
     "avaliacao": [
         "avaliar", "julgar", "criticar", "justificar",
         "argumentar", "defender", "recomendar", "decidir",
-        "avaliação", "avaliacao", "opinar", "validar",
+        "avaliação", "opinar", "validar",
         "verificar", "testar", "medir", "estimar"
     ]
 }
 
 
+# Formas irregulares: infinitivo -> (formas de comando, outras formas), sem acento
+IRREGULAR_FORMS = {
+    "compor": (["componha", "componham"], ["compoe", "compoem", "compos", "compuseram", "compondo"]),
+    "saber": (["saiba", "saibam"], ["sabem", "soube", "souberam", "sabendo"]),
+    "medir": (["meca", "mecam"], ["medem", "mediram", "medindo"]),
+}
+
+# Formas geradas que são mais usadas como substantivo ("teste", "dívida")
+AMBIGUOUS_FORMS = {"teste", "divida"}
+
+# Sufixos por conjugação: (comando - imperativo/subjuntivo, demais formas).
+# 3ª pessoa do singular do presente, 1ª do singular e particípios ficam de fora
+# porque coincidem com substantivos comuns ("lista", "uso", "medida").
+SUFFIXES = {
+    "ar": (["e", "em"], ["am", "amos", "emos", "ou", "aram", "ando", "ava", "avam", "arem", "ara", "arao", "ei"]),
+    "er": (["a", "am"], ["em", "emos", "eu", "eram", "endo", "ia", "iam", "erem", "era", "erao"]),
+    "ir": (["a", "am"], ["em", "imos", "iu", "iram", "indo", "ia", "iam", "irem", "ira", "irao"]),
+}
+
+
+def _join_stem(stem: str, suffix: str) -> str:
+    """Junta radical e sufixo com as mudanças ortográficas regulares (sem acentos)"""
+    if suffix[0] == "e":
+        if stem.endswith("c"):
+            return stem[:-1] + "qu" + suffix   # explicar -> explique
+        if stem.endswith("g"):
+            return stem + "u" + suffix         # julgar -> julgue
+    elif suffix[0] in "ao":
+        if stem.endswith("gu"):
+            return stem[:-1] + suffix          # distinguir -> distinga
+        if stem.endswith("g"):
+            return stem[:-1] + "j" + suffix    # eleger -> eleja
+    return stem + suffix
+
+
+def conjugate(infinitive: str) -> Tuple[List[str], List[str]]:
+    """
+    Formas conjugadas (sem acento) de um verbo regular
+    
+    Returns:
+        (formas de comando, demais formas)
+    """
+    infinitive = normalize_text(infinitive)
+    if infinitive in IRREGULAR_FORMS:
+        return IRREGULAR_FORMS[infinitive]
+    
+    ending = infinitive[-2:]
+    if ending not in SUFFIXES:
+        return [], []
+    
+    stem = infinitive[:-2]
+    command_suffixes, other_suffixes = SUFFIXES[ending]
+    command = [_join_stem(stem, s) for s in command_suffixes]
+    if ending == "ar" and stem.endswith("e"):
+        command = [stem + "ie", stem + "iem"]  # nomear -> nomeie
+    other = [_join_stem(stem, s) for s in other_suffixes]
+    return command, other
+
+
 class BloomMatcher(BaseMatcher):
-    def __init__(self, nlp):
-        super().__init__(nlp, BLOOM_PATTERNS)
+    """
+    Detecta o nível de Bloom por palavras-chave e por verbos em qualquer conjugação.
+    
+    Verbos são reconhecidos em uma única passada pelos tokens do Doc da requisição:
+    pela tabela de formas conjugadas gerada a partir dos infinitivos de
+    BLOOM_PATTERNS e, se o modelo tem lematizador, pelo id do lema.
+    
+    Quando o texto tem vários candidatos, vence:
+      1. verbo em forma de comando ("analise", "comparem", "justifique")
+      2. palavra-chave literal (infinitivo ou substantivo: "analisar", "síntese")
+      3. verbo em outra conjugação ("compararam", "analisando")
+    e, dentro do mesmo grupo, o nível mais alto (ordem das chaves de
+    BLOOM_PATTERNS: conhecimento < ... < avaliacao), depois o match mais longo,
+    depois o que aparece primeiro.
+    """
+    
+    def __init__(self, nlp, patterns=None):
+        super().__init__(nlp, patterns if patterns is not None else BLOOM_PATTERNS)
+        self.levels = {category: level for level, category in enumerate(self.patterns)}
+        self._build_verb_tables()
+    
+    def _build_verb_tables(self):
+        """Tabelas forma conjugada -> categorias e id do lema -> categorias (uma vez)"""
+        self.verb_forms: Dict[str, Tuple[Set[str], bool]] = {}
+        self.lemma_ids: Dict[int, Set[str]] = {}
+        
+        for category, keywords in self.patterns.items():
+            for keyword in keywords:
+                if " " in keyword or normalize_text(keyword)[-2:] not in ("ar", "er", "ir", "or"):
+                    continue
+                lemma_id = self.nlp.vocab.strings.add(keyword)
+                self.lemma_ids.setdefault(lemma_id, set()).add(category)
+                
+                command, other = conjugate(keyword)
+                for forms, is_command in ((command, True), (other, False)):
+                    for form in forms:
+                        if form in AMBIGUOUS_FORMS:
+                            continue
+                        categories, previous_command = self.verb_forms.get(form, (set(), is_command))
+                        categories.add(category)
+                        self.verb_forms[form] = (categories, previous_command or is_command)
+    
+    def _candidates(self, doc: Doc) -> List[Tuple]:
+        """Candidatos como tuplas ordenáveis (grupo, nível, tamanho, -posição, categoria, span)"""
+        candidates = []
+        
+        for match_id, start, end in self.matcher(doc):
+            span = doc[start:end]
+            category = self.nlp.vocab.strings[match_id]
+            candidates.append((1, self.levels.get(category, 0), len(span.text), -start, category, span))
+        
+        has_lemmas = doc.has_annotation("LEMMA")
+        for token in doc:
+            found = self.verb_forms.get(token.norm_)
+            if found:
+                categories, is_command = found
+            elif has_lemmas and token.pos_ in ("VERB", "AUX") and token.lemma in self.lemma_ids:
+                categories = self.lemma_ids[token.lemma]
+                is_command = any(mood in ("Imp", "Sub") for mood in token.morph.get("Mood"))
+            else:
+                continue
+            
+            span = doc[token.i:token.i + 1]
+            group = 2 if is_command else 0
+            for category in categories:
+                candidates.append((group, self.levels.get(category, 0), len(span.text), -token.i, category, span))
+        
+        candidates.sort(key=lambda c: c[:4], reverse=True)
+        return candidates
+    
+    def rank(self, text: Union[str, Doc], top_k: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Níveis encontrados, do mais para o menos provável (um por categoria)"""
+        results = []
+        seen = set()
+        for candidate in self._candidates(self._to_doc(text)):
+            category = candidate[4]
+            if category not in seen:
+                seen.add(category)
+                results.append((category, self._calculate_confidence(candidate[5])))
+                if top_k is not None and len(results) >= top_k:
+                    break
+        return results
+    
+    def match_all(self, text: Union[str, Doc]) -> List[Tuple[str, float]]:
+        """Todos os níveis encontrados, na ordem de rank()"""
+        return self.rank(text)
@@ -1,42 +1,83 @@
 """
 Matcher para dados da BNCC (Unidades Temáticas, Objetos de Conhecimento, Habilidades)
 """
-import json
 import os
+import threading
+from collections.abc import Mapping
 from typing import Dict, List, Optional, Tuple
 from spacy.matcher import PhraseMatcher
 from .synonyms import expand_query, normalize_term, get_key_terms
+from .ann_index import IVFIndex
+from .curriculum import CurriculumData, DEFAULT_CURRICULUM_PATH
+from .compact_vectors import CompactVectors
+from .cache import Cache, make_key
+from .modes import get_mode
 import numpy as np
 
+# Índice ANN: só é usado quando o número de candidatos de uma busca passa do limite
+ANN_CANDIDATE_THRESHOLD = int(os.getenv("BNCC_ANN_THRESHOLD", "5000"))
+ANN_N_PROBE = int(os.getenv("BNCC_ANN_NPROBE", "8"))
+ANN_TOP_K = int(os.getenv("BNCC_ANN_TOP_K", "200"))
+
 
 class BNCCMatcher:
     """Matcher para extrair informações da BNCC"""
     
-    def __init__(self, nlp):
+    def __init__(self, nlp, data: Optional[Mapping] = None, synonyms_map: Optional[Dict] = None,
+                 vectors: Optional[CompactVectors] = None, cache: Optional[Cache] = None):
+        """
+        Args:
+            nlp: modelo spaCy carregado
+            data: dados do currículo (ex: CurriculumData); padrão é a BNCC em data/bncc-data.json
+            synonyms_map: tabela de sinônimos; padrão é SYNONYMS_MAP
+            vectors: tabela compacta de vetores (modo "vectors"); se None usa os vetores do modelo
+            cache: memoização de expansões de sinônimos e vetores de texto
+        """
         self.nlp = nlp
-        self.bncc_data = self._load_bncc_data()
+        self.synonyms_map = synonyms_map
+        self.vectors = vectors
+        self.cache = cache
+        self.bncc_data = data if data is not None else self._load_bncc_data()
         self.unidades_matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
         self.objetos_matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
-        self._build_matchers()
-        # Cache para busca reversa (objeto -> contexto)
-        self._build_reverse_index()
+        # Índices globais (matchers + busca reversa) só são construídos na primeira
+        # busca que precisa de todas as disciplinas, para não carregar shards à toa
+        self._global_indexed = False
+        # Requisições rodam em threads: só uma constrói os índices globais
+        self._index_lock = threading.Lock()
+        # Índices ANN por disciplina (None = global), construídos sob demanda
+        self._ann_indexes = {}
+        self._ann_lock = threading.Lock()
     
-    def _load_bncc_data(self) -> Dict:
-        """Carrega dados da BNCC do JSON"""
-        try:
-            # Path relativo ao diretório do módulo
-            BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            bncc_path = os.path.join(BASE_DIR, 'data', 'bncc-data.json')
-            
-            if os.path.exists(bncc_path):
-                with open(bncc_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            else:
-                print(f"AVISO: Arquivo bncc-data.json não encontrado em {bncc_path}")
-                return {}
-        except Exception as e:
-            print(f"Erro ao carregar BNCC: {e}")
-            return {}
+    def _load_bncc_data(self) -> Mapping:
+        """Carrega dados da BNCC (padrão do registro de currículos)"""
+        return CurriculumData(DEFAULT_CURRICULUM_PATH)
+    
+    def _ensure_global_indexes(self):
+        """Constrói matchers e índice reverso sobre todas as disciplinas (uma vez)"""
+        if self._global_indexed:
+            return
+        with self._index_lock:
+            if not self._global_indexed:
+                self._build_matchers()
+                # Cache para busca reversa (objeto -> contexto)
+                self._build_reverse_index()
+                self._global_indexed = True
+    
+    @property
+    def reverse_index(self) -> Dict:
+        self._ensure_global_indexes()
+        return self._reverse_index
+    
+    @property
+    def entries(self) -> List[Tuple]:
+        self._ensure_global_indexes()
+        return self._entries
+    
+    @property
+    def objeto_terms(self) -> set:
+        self._ensure_global_indexes()
+        return self._objeto_terms
     
     def _build_matchers(self):
         """Constrói matchers para unidades e objetos"""
@@ -65,42 +106,223 @@ class BNCCMatcher:
     
     def _build_reverse_index(self):
         """Constrói índice reverso: objeto -> {disciplina, ano, unidade, habilidades}"""
-        self.reverse_index = {}
+        self._reverse_index = {}
+        # Lista plana de (disciplina, ano, unidade, objeto)
+        self._entries = []
+        # Vocabulário de termos-chave dos objetos (usado na assinatura de consultas)
+        self._objeto_terms = set()
+        # Índice invertido termo-chave -> posições dos objetos (ordem do reverse_index)
+        self._term_objetos: Dict[str, List[int]] = {}
         
         for disciplina, anos in self.bncc_data.items():
             for ano, unidades in anos.items():
                 for unidade, objetos in unidades.items():
                     for objeto, habilidades in objetos.items():
-                        self.reverse_index[objeto] = {
+                        self._reverse_index[objeto] = {
                             'disciplina': disciplina,
                             'ano': ano,
                             'unidade': unidade,
                             'habilidades': habilidades
                         }
+                        self._entries.append((disciplina, ano, unidade, objeto))
+                        self._objeto_terms.update(get_key_terms(objeto))
+        
+        self._objetos = list(self._reverse_index)
+        for position, objeto in enumerate(self._objetos):
+            for term in get_key_terms(objeto):
+                self._term_objetos.setdefault(term, []).append(position)
     
-    def search_global(self, text: str) -> Optional[Dict]:
+    def query_signature(self, text: str) -> Tuple:
+        """
+        Assinatura da consulta do ponto de vista da BNCC
+        
+        Para cada variação de expand_query, mantém apenas os termos-chave que
+        existem em algum objeto de conhecimento. Palavras fora desse vocabulário
+        (verbos de Bloom, tipo de questão etc.) não alteram a assinatura, então
+        dois textos com a mesma assinatura produzem o mesmo score por termos-chave.
+        A busca semântica depende do texto inteiro e não é coberta pela assinatura.
+        """
+        objeto_terms = self.objeto_terms
+        return tuple(
+            frozenset(t for t in get_key_terms(variation) if t in objeto_terms)
+            for variation in self._expand(text)
+        )
+    
+    def iter_texts(self):
+        """Todos os textos do currículo (unidades, objetos e habilidades)"""
+        for anos in self.bncc_data.values():
+            for unidades in anos.values():
+                for unidade, objetos in unidades.items():
+                    yield unidade
+                    for objeto, habilidades in objetos.items():
+                        yield objeto
+                        yield from habilidades
+    
+    def _has_vectors(self) -> bool:
+        """Há word vectors disponíveis (tabela compacta ou do modelo)"""
+        if self.vectors is not None:
+            return len(self.vectors) > 0
+        return len(self.nlp.vocab.vectors) > 0
+    
+    def _expand(self, text: str, max_variations: Optional[int] = None) -> List[str]:
+        """expand_query com os sinônimos deste matcher (memoizado no cache, se houver)"""
+        if self.cache is None:
+            return expand_query(text, self.synonyms_map, max_variations)
+        return self.cache.get_or_compute(make_key("expand", text, max_variations),
+                                         lambda: expand_query(text, self.synonyms_map, max_variations))
+    
+    def _text_vector(self, text: str) -> np.ndarray:
+        """Vetor médio do texto (só tokenização, sem rodar a pipeline do spaCy)"""
+        if self.cache is not None:
+            return self.cache.get_or_compute(make_key("vector", text), lambda: self._compute_vector(text))
+        return self._compute_vector(text)
+    
+    def _doc_features(self, text: str) -> Dict:
+        """
+        O que _semantic_similarity usa de um texto passado pela pipeline do spaCy
+        (vetor médio, tokens, lemas), memoizado no cache como _text_vector
+        """
+        if self.cache is not None:
+            return self.cache.get_or_compute(make_key("doc_features", text), lambda: self._compute_doc_features(text))
+        return self._compute_doc_features(text)
+    
+    def _compute_doc_features(self, text: str) -> Dict:
+        doc = self.nlp(text)
+        return {
+            "has_vector": doc.has_vector,
+            "vector": doc.vector.astype(np.float32).tolist(),
+            "orths": [token.orth_ for token in doc],
+            "lemmas": sorted(set(token.lemma_.lower() for token in doc
+                                 if not token.is_stop and not token.is_punct and len(token.text) > 2)),
+            # Termos importantes (substantivos próprios, palavras longas)
+            "important": sorted(set(token.lemma_.lower() for token in doc
+                                    if (token.pos_ == "PROPN" or len(token.text) > 6) and not token.is_stop))
+        }
+    
+    def _compute_vector(self, text: str) -> np.ndarray:
+        doc = self.nlp.make_doc(text)
+        if self.vectors is not None:
+            return self.vectors.doc_vector(token.text for token in doc)
+        return doc.vector
+    
+    def _iter_entries(self, disciplina: Optional[str] = None):
+        """(disciplina, ano, unidade, objeto) de uma disciplina (só carrega o shard dela) ou de todas"""
+        if not disciplina:
+            return iter(self.entries)
+        return (
+            (disciplina, ano, unidade, objeto)
+            for ano, unidades in self.bncc_data.get(disciplina, {}).items()
+            for unidade, objetos in unidades.items()
+            for objeto in objetos.keys()
+        )
+    
+    def _get_ann_index(self, disciplina: Optional[str] = None) -> Optional[Tuple[IVFIndex, List[Tuple]]]:
+        """
+        Índice ANN sobre vetores de objetos e habilidades (construído na primeira
+        consulta, por uma thread só), junto com a lista de entradas que seus ids
+        referenciam. Retorna None se o modelo não tem word vectors.
+        """
+        if not self._has_vectors():
+            return None
+        
+        if disciplina in self._ann_indexes:
+            return self._ann_indexes[disciplina]
+        with self._ann_lock:
+            if disciplina not in self._ann_indexes:
+                self._ann_indexes[disciplina] = self._build_ann_index(disciplina)
+        return self._ann_indexes[disciplina]
+    
+    def _build_ann_index(self, disciplina: Optional[str]) -> Optional[Tuple[IVFIndex, List[Tuple]]]:
+        entries = list(self._iter_entries(disciplina))
+        vectors, ids = [], []
+        for i, (disc, ano, unidade, objeto) in enumerate(entries):
+            # Cada habilidade vira uma linha extra apontando para o mesmo objeto
+            for texto in [objeto] + list(self.bncc_data[disc][ano][unidade][objeto]):
+                vectors.append(self._text_vector(texto))
+                ids.append(i)
+        
+        if not vectors:
+            return None
+        index = IVFIndex(n_probe=ANN_N_PROBE).build(np.array(vectors), ids)
+        print(f"   🗂️  Índice ANN construído ({disciplina or 'global'}): {len(index)} vetores, {len(index.lists)} listas")
+        return index, entries
+    
+    def _ann_candidates(self, text_variations: List[str], disciplina: Optional[str] = None) -> Optional[List[Tuple]]:
+        """
+        Entradas (disciplina, ano, unidade, objeto) vizinhas das variações da consulta
+        segundo o índice ANN, na ordem original dos dados. None se não há índice.
+        """
+        ann = self._get_ann_index(disciplina)
+        if ann is None:
+            return None
+        index, entries = ann
+        
+        hits = set()
+        for text_var in text_variations:
+            vector = self._text_vector(text_var)
+            if not vector.any():
+                continue
+            hits.update(i for i, _ in index.search(vector, k=ANN_TOP_K))
+        
+        return [entries[i] for i in sorted(hits)]
+    
+    def prepare_like(self, other: "BNCCMatcher"):
+        """Carrega os mesmos shards e constrói os mesmos índices que outro matcher já usa"""
+        loaded = getattr(other.bncc_data, 'loaded', None)
+        for disciplina in (loaded() if loaded else other.bncc_data.keys()):
+            self.bncc_data.get(disciplina)
+        if other._global_indexed:
+            self._ensure_global_indexes()
+        for disciplina in list(other._ann_indexes):
+            self._get_ann_index(disciplina)
+    
+    def index_stats(self) -> Dict:
+        """Tamanho dos índices em memória"""
+        loaded = getattr(self.bncc_data, 'loaded', None)
+        return {
+            "disciplinas_carregadas": loaded() if loaded else list(self.bncc_data.keys()),
+            "objetos_indexados": len(self._reverse_index) if self._global_indexed else 0,
+            "entradas_indexadas": len(self._entries) if self._global_indexed else 0,
+            "termos_indexados": len(self._objeto_terms) if self._global_indexed else 0,
+            "indices_ann": {
+                (disciplina or "global"): len(ann[0]) for disciplina, ann in self._ann_indexes.items() if ann
+            }
+        }
+    
+    def search_global(self, text: str, mode: Optional[Dict] = None) -> Optional[Dict]:
         """
         Busca GLOBAL na BNCC - procura em todas disciplinas/anos
         Retorna TUDO: disciplina, ano, unidade, objeto, habilidade
         """
+        mode = mode or get_mode()
         print(f"\n🌍 BUSCA GLOBAL na BNCC para: '{text}'")
         
         # Expandir com sinônimos
-        text_variations = expand_query(text)
+        text_variations = self._expand(text, mode.get("max_variations"))
         print(f"   📝 Variações ({len(text_variations)}): {text_variations[:3]}...")
         
         best_matches = []  # Lista dos top 3 matches
         
-        # Buscar em TODOS os objetos de conhecimento
-        for objeto, context in self.reverse_index.items():
+        # O score é só por termos-chave: objetos sem nenhum termo em comum com as
+        # variações ficam com 0, então basta percorrer os do índice invertido (na
+        # ordem original, a mesma da varredura completa). Sem ANN aqui: um
+        # prefiltro por vetores descartaria matches lexicais exatos
+        key_terms_vars = [get_key_terms(text_var, include_weights=True) for text_var in text_variations]
+        positions = set()
+        for key_terms_var in key_terms_vars:
+            for term in key_terms_var:
+                positions.update(self._term_objetos.get(term, ()))
+        candidatos = [(self._objetos[i], self.reverse_index[self._objetos[i]]) for i in sorted(positions)]
+        print(f"   🔎 {len(candidatos)} de {len(self.reverse_index)} objetos com termos em comum")
+        
+        for objeto, context in candidatos:
             max_similarity = 0
             best_variation = None
+            key_terms_obj = get_key_terms(objeto, include_weights=True)
             
             # Testar cada variação
-            for idx, text_var in enumerate(text_variations):
+            for idx, (text_var, key_terms_var) in enumerate(zip(text_variations, key_terms_vars)):
                 # Usar termos-chave ponderados ao invés de similaridade simples
-                key_terms_var = get_key_terms(text_var, include_weights=True)
-                key_terms_obj = get_key_terms(objeto, include_weights=True)
                 
                 # Termos em comum
                 common_terms = set(key_terms_var.keys()) & set(key_terms_obj.keys())
@@ -154,10 +376,21 @@ class BNCCMatcher:
             print(f"         Objeto: '{match['objeto'][:60]}...'")
             print(f"         Via: '{match['variation']}'")
         
-        if best_matches and best_matches[0]['score'] > 0.20:  # Threshold
+        if best_matches and best_matches[0]['score'] > mode["global_threshold"]:
             best = best_matches[0]
             print(f"\n   ✅ MATCH GLOBAL SELECIONADO!")
             
+            # Alternativas coerentes com o vencedor (mesma disciplina e ano), já ordenadas
+            candidates = {'unidadeTematica': {}, 'objetoConhecimento': {}}
+            for match in best_matches:
+                if match['score'] <= mode["global_threshold"]:
+                    break
+                if (match['context']['disciplina'], match['context']['ano']) != (best['context']['disciplina'], best['context']['ano']):
+                    continue
+                confidence = min(0.85, 0.55 + match['score'] * 0.30)
+                candidates['unidadeTematica'].setdefault(match['context']['unidade'], confidence)
+                candidates['objetoConhecimento'].setdefault(match['objeto'], confidence)
+            
             # Retornar tudo
             return {
                 'disciplina': best['context']['disciplina'],
@@ -171,7 +404,8 @@ class BNCCMatcher:
                     'unidadeTematica': min(0.85, 0.55 + best['score'] * 0.30),
                     'objetoConhecimento': min(0.85, 0.55 + best['score'] * 0.30),
                     'habilidade': 0.75 if best['context']['habilidades'] else 0.0
-                }
+                },
+                'candidates': {field: list(values.items()) for field, values in candidates.items()}
             }
         else:
             print(f"   ❌ Nenhum match global suficiente")
@@ -184,14 +418,27 @@ class BNCCMatcher:
         Retorna valor entre 0 e 1
         """
         try:
-            doc1 = self.nlp(text1)
-            doc2 = self.nlp(text2)
+            # Modo "vectors": cosseno direto na tabela compacta
+            if self.vectors is not None:
+                v1 = self._text_vector(text1)
+                v2 = self._text_vector(text2)
+                norm = float(np.linalg.norm(v1) * np.linalg.norm(v2))
+                # Sem vetor para algum dos textos: nada a comparar (o tokenizador
+                # vazio não tem lemas, então o fallback por lemas daria 1.0 sempre)
+                if norm == 0:
+                    return 0.0
+                return max(0.0, float(v1 @ v2) / norm)
+            
+            # Cada texto passa pelo spaCy uma vez só (a variação da consulta
+            # é comparada com todos os objetos)
+            doc1 = self._doc_features(text1)
+            doc2 = self._doc_features(text2)
             
             # Verificar se o modelo tem vetores
-            if not doc1.has_vector or not doc2.has_vector:
+            if not doc1["has_vector"] or not doc2["has_vector"]:
                 # Fallback: usar overlap de lemas (mais inteligente que palavras brutas)
-                lemmas1 = set(token.lemma_.lower() for token in doc1 if not token.is_stop and not token.is_punct and len(token.text) > 2)
-                lemmas2 = set(token.lemma_.lower() for token in doc2 if not token.is_stop and not token.is_punct and len(token.text) > 2)
+                lemmas1 = set(doc1["lemmas"])
+                lemmas2 = set(doc2["lemmas"])
                 
                 if not lemmas1 or not lemmas2:
                     return 0.0
@@ -201,34 +448,99 @@ class BNCCMatcher:
                 base_score = overlap / max(len(lemmas1), len(lemmas2))
                 
                 # BONUS: Se encontrou nomes próprios ou termos importantes em comum
-                # Extrair termos importantes (substantivos próprios, nomes)
-                important1 = set(token.lemma_.lower() for token in doc1 if (token.pos_ == "PROPN" or len(token.text) > 6) and not token.is_stop)
-                important2 = set(token.lemma_.lower() for token in doc2 if (token.pos_ == "PROPN" or len(token.text) > 6) and not token.is_stop)
-                
-                important_overlap = len(important1 & important2)
+                important_overlap = len(set(doc1["important"]) & set(doc2["important"]))
                 if important_overlap > 0:
                     # Dar bonus significativo para termos importantes
                     base_score *= (1.0 + important_overlap * 0.5)
                 
                 return min(1.0, base_score)
             
-            # Usar similaridade do spaCy (baseada em word vectors)
-            similarity = doc1.similarity(doc2)
-            return max(0.0, similarity)  # Garantir que não seja negativo
+            # Similaridade do spaCy (Doc.similarity): mesmos tokens = 1.0, senão
+            # cosseno dos vetores médios
+            if doc1["orths"] == doc2["orths"]:
+                return 1.0
+            v1 = np.asarray(doc1["vector"], dtype=np.float32)
+            v2 = np.asarray(doc2["vector"], dtype=np.float32)
+            norm = float(np.sqrt((v1 ** 2).sum()) * np.sqrt((v2 ** 2).sum()))
+            if norm == 0:
+                return 0.0
+            return max(0.0, float(v1 @ v2) / norm)  # Garantir que não seja negativo
         except Exception as e:
             print(f"      ⚠️  Erro na similaridade: {e}")
             return 0.0
     
-    def match_unidade_tematica(self, text: str, disciplina: str = None, ano: str = None) -> Optional[Tuple[str, float]]:
+    @staticmethod
+    def _objeto_score(key_terms_var_weighted: Dict, objeto: str, idx: int) -> float:
+        """Score por termos-chave ponderados entre uma variação do texto e um objeto"""
+        key_terms_objeto_weighted = get_key_terms(objeto, include_weights=True)
+        
+        # Palavras-chave em comum
+        key_terms_comuns = set(key_terms_var_weighted.keys()) & set(key_terms_objeto_weighted.keys())
+        if not key_terms_comuns:
+            return 0.0
+        
+        # Score baseado em termos-chave PONDERADOS
+        # Somar os pesos dos termos em comum
+        peso_comuns = sum(key_terms_var_weighted.get(t, 1.0) for t in key_terms_comuns)
+        peso_total_objeto = sum(key_terms_objeto_weighted.values())
+        
+        score = peso_comuns / max(peso_total_objeto, 1.0)
+        
+        # Contar quantos termos de alto valor foram encontrados
+        high_value_matches = sum(1 for t in key_terms_comuns if key_terms_var_weighted.get(t, 1.0) >= 2.0)
+        
+        # Bonus progressivo para termos de alto valor
+        if high_value_matches >= 3:
+            score *= 2.0  # 3+ termos importantes
+        elif high_value_matches >= 2:
+            score *= 1.7  # 2 termos importantes
+        elif high_value_matches >= 1:
+            score *= 1.4  # 1 termo importante
+        
+        # Bonus se encontrou muitos termos no total
+        if len(key_terms_comuns) >= 3:
+            score *= 1.3
+        elif len(key_terms_comuns) >= 2:
+            score *= 1.2
+        
+        # Bonus extra se o match veio de uma variação com sinônimo (não o texto original)
+        if idx > 0:  # Não é o texto original
+            score *= 1.3
+        
+        return score
+    
+    @staticmethod
+    def _keep_best(best: Dict, value: str, score: float, position: int):
+        """Guarda o maior score de cada valor e a posição (ordem dos dados) em que ele apareceu"""
+        if score > best.get(value, (0.0, 0))[0]:
+            best[value] = (score, position)
+    
+    @staticmethod
+    def _ranked(best: Dict, threshold: float, to_confidence, top_k: Optional[int] = None) -> List[Tuple[str, float]]:
         """
-        Encontra unidade temática no texto
-        Busca primeiro nos objetos de conhecimento com sinônimos
+        (valor, confiança) acima do limite, do maior para o menor score; empate
+        fica com o que apareceu primeiro nos dados (o mesmo vencedor de antes)
+        """
+        ranked = sorted(
+            ((value, score, position) for value, (score, position) in best.items() if score > threshold),
+            key=lambda item: (-item[1], item[2])
+        )
+        return [(value, to_confidence(score)) for value, score, _ in ranked[:top_k]]
+    
+    def rank_unidade_tematica(self, text: str, disciplina: str = None, ano: str = None,
+                              mode: Optional[Dict] = None, top_k: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Unidades temáticas candidatas, da mais para a menos provável (score da
+        unidade = melhor score dos seus objetos). Busca primeiro nos objetos de
+        conhecimento com sinônimos; se nenhuma passa do limite, por similaridade
+        semântica. Só entram candidatas acima do limite de aceitação.
         """
         if not disciplina or not ano:
-            return None
+            return []
+        mode = mode or get_mode()
         
         # Expandir consulta com sinônimos
-        text_variations = expand_query(text)
+        text_variations = self._expand(text, mode.get("max_variations"))
         print(f"   📝 Variações do texto ({len(text_variations)}): {text_variations[:3]}...")
         
         # Extrair termos-chave do texto
@@ -237,110 +549,73 @@ class BNCCMatcher:
         
         try:
             unidades_data = self.bncc_data.get(disciplina, {}).get(ano, {})
+            variations_weighted = [get_key_terms(text_var, include_weights=True) for text_var in text_variations]
             
-            best_match = None
-            best_score = 0
-            best_objeto = None
-            
+            best = {}
+            position = 0
             for unidade, objetos in unidades_data.items():
                 for objeto in objetos.keys():
-                    max_score_for_objeto = 0
-                    
                     # Testar cada variação do texto
-                    for idx, text_var in enumerate(text_variations):
-                        # Extrair termos-chave COM PESOS
-                        key_terms_var_weighted = get_key_terms(text_var, include_weights=True)
-                        key_terms_objeto_weighted = get_key_terms(objeto, include_weights=True)
-                        
-                        # Palavras-chave em comum
-                        key_terms_comuns = set(key_terms_var_weighted.keys()) & set(key_terms_objeto_weighted.keys())
-                        
-                        if key_terms_comuns:
-                            # Score baseado em termos-chave PONDERADOS
-                            # Somar os pesos dos termos em comum
-                            peso_comuns = sum(key_terms_var_weighted.get(t, 1.0) for t in key_terms_comuns)
-                            peso_total_objeto = sum(key_terms_objeto_weighted.values())
-                            
-                            score = peso_comuns / max(peso_total_objeto, 1.0)
-                            
-                            # Contar quantos termos de alto valor foram encontrados
-                            high_value_matches = sum(1 for t in key_terms_comuns if key_terms_var_weighted.get(t, 1.0) >= 2.0)
-                            
-                            # Bonus progressivo para termos de alto valor
-                            if high_value_matches >= 3:
-                                score *= 2.0  # 3+ termos importantes
-                            elif high_value_matches >= 2:
-                                score *= 1.7  # 2 termos importantes
-                            elif high_value_matches >= 1:
-                                score *= 1.4  # 1 termo importante
-                            
-                            # Bonus se encontrou muitos termos no total
-                            if len(key_terms_comuns) >= 3:
-                                score *= 1.3
-                            elif len(key_terms_comuns) >= 2:
-                                score *= 1.2
-                            
-                            # Bonus extra se o match veio de uma variação com sinônimo (não o texto original)
-                            if idx > 0:  # Não é o texto original
-                                score *= 1.3
-                            
-                            max_score_for_objeto = max(max_score_for_objeto, score)
-                    
-                    if max_score_for_objeto > best_score:
-                        best_score = max_score_for_objeto
-                        best_match = unidade
-                        best_objeto = objeto
-                        key_terms_objeto_weighted = get_key_terms(objeto, include_weights=True)
-                        high_value = {k: v for k, v in key_terms_objeto_weighted.items() if v > 1.0}
-                        print(f"   🎯 Candidato: '{objeto[:60]}...'")
-                        print(f"      Score: {max_score_for_objeto:.3f} | Termos importantes: {high_value if high_value else 'nenhum'}")
+                    score = max((self._objeto_score(weighted, objeto, idx)
+                                 for idx, weighted in enumerate(variations_weighted)), default=0.0)
+                    self._keep_best(best, unidade, score, position)
+                    position += 1
             
-            if best_match and best_score > 0.15:  # Threshold mais baixo para permitir matches parciais
-                confidence = min(0.85, 0.55 + best_score * 0.30)
-                print(f"   ✅ MATCH! Unidade: '{best_match[:60]}...'")
-                print(f"      Via objeto: '{best_objeto[:60]}...' (score: {best_score:.3f}, conf: {confidence:.2f})")
-                return (best_match, confidence)
+            # Threshold mais baixo para permitir matches parciais
+            ranked = self._ranked(best, 0.15, lambda s: min(0.85, 0.55 + s * 0.30), top_k)
+            best_score = max((score for score, _ in best.values()), default=0.0)
+            if ranked:
+                print(f"   ✅ MATCH! Unidade: '{ranked[0][0][:60]}...' (score: {best_score:.3f}, conf: {ranked[0][1]:.2f})")
+                if len(ranked) > 1:
+                    print(f"      Alternativas: {[u[:40] for u, _ in ranked[1:]]}")
+                return ranked
+            elif not mode["semantic_fallback"]:
+                print(f"   ❌ Score por termos-chave insuficiente: {best_score:.3f} (modo {mode['name']}: sem busca semântica)")
             else:
                 print(f"   ❌ Score por termos-chave insuficiente: {best_score:.3f}")
                 print(f"   🔄 Tentando busca semântica...")
                 
                 # FALLBACK: Busca semântica usando embeddings
-                best_semantic_match = None
-                best_semantic_score = 0
-                best_semantic_objeto = None
-                
+                best_semantic = {}
+                position = 0
                 for unidade, objetos in unidades_data.items():
                     for objeto in objetos.keys():
                         # Calcular similaridade semântica com cada variação
-                        max_similarity = 0
-                        for text_var in text_variations:
-                            similarity = self._semantic_similarity(text_var, objeto)
-                            max_similarity = max(max_similarity, similarity)
-                        
-                        if max_similarity > best_semantic_score:
-                            best_semantic_score = max_similarity
-                            best_semantic_match = unidade
-                            best_semantic_objeto = objeto
+                        similarity = max((self._semantic_similarity(text_var, objeto)
+                                          for text_var in text_variations), default=0.0)
+                        self._keep_best(best_semantic, unidade, similarity, position)
+                        position += 1
                 
-                if best_semantic_match and best_semantic_score > 0.35:  # Threshold para similaridade semântica
-                    confidence = min(0.80, 0.50 + best_semantic_score * 0.30)
-                    print(f"   ✅ MATCH SEMÂNTICO! Unidade: '{best_semantic_match[:60]}...'")
-                    print(f"      Via objeto: '{best_semantic_objeto[:60]}...' (similaridade: {best_semantic_score:.3f}, conf: {confidence:.2f})")
-                    return (best_semantic_match, confidence)
-                else:
-                    print(f"   ❌ Similaridade semântica insuficiente: {best_semantic_score:.3f} (mínimo: 0.35)")
+                # Threshold para similaridade semântica
+                ranked = self._ranked(best_semantic, 0.35, lambda s: min(0.80, 0.50 + s * 0.30), top_k)
+                if ranked:
+                    print(f"   ✅ MATCH SEMÂNTICO! Unidade: '{ranked[0][0][:60]}...' (conf: {ranked[0][1]:.2f})")
+                    return ranked
+                best_semantic_score = max((score for score, _ in best_semantic.values()), default=0.0)
+                print(f"   ❌ Similaridade semântica insuficiente: {best_semantic_score:.3f} (mínimo: 0.35)")
         except Exception as e:
             print(f"   ❌ Erro: {e}")
         
-        return None
+        return []
     
-    def match_objeto_conhecimento(self, text: str, disciplina: str = None, ano: str = None, unidade: str = None) -> Optional[Tuple[str, float]]:
-        """Encontra objeto de conhecimento no texto com sinônimos"""
+    def match_unidade_tematica(self, text: str, disciplina: str = None, ano: str = None,
+                               mode: Optional[Dict] = None) -> Optional[Tuple[str, float]]:
+        """
+        Encontra unidade temática no texto
+        Busca primeiro nos objetos de conhecimento com sinônimos
+        """
+        ranked = self.rank_unidade_tematica(text, disciplina, ano, mode, top_k=1)
+        return ranked[0] if ranked else None
+    
+    def rank_objeto_conhecimento(self, text: str, disciplina: str = None, ano: str = None, unidade: str = None,
+                                 mode: Optional[Dict] = None, top_k: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Objetos de conhecimento candidatos, do mais para o menos provável (mesmo critério do vencedor)"""
         if not disciplina or not ano:
-            return None
+            return []
+        mode = mode or get_mode()
         
         # Expandir consulta com sinônimos
-        text_variations = expand_query(text)
+        text_variations = self._expand(text, mode.get("max_variations"))
         print(f"   📝 Buscando objeto com {len(text_variations)} variações...")
         
         # Extrair termos-chave do texto
@@ -357,132 +632,87 @@ class BNCCMatcher:
                 unidades_data = self.bncc_data.get(disciplina, {}).get(ano, {})
                 objetos = [obj for unidade_objs in unidades_data.values() for obj in unidade_objs.keys()]
                 print(f"   🔍 Buscando em todas as unidades ({len(objetos)} objetos)")
+            variations_weighted = [get_key_terms(text_var, include_weights=True) for text_var in text_variations]
             
-            best_match = None
-            best_score = 0
-            
-            for objeto in objetos:
-                max_score_for_objeto = 0
-                
+            best = {}
+            for position, objeto in enumerate(objetos):
                 # Testar cada variação
-                for idx, text_var in enumerate(text_variations):
-                    # Extrair termos-chave COM PESOS
-                    key_terms_var_weighted = get_key_terms(text_var, include_weights=True)
-                    key_terms_objeto_weighted = get_key_terms(objeto, include_weights=True)
-                    
-                    # Termos em comum
-                    key_terms_comuns = set(key_terms_var_weighted.keys()) & set(key_terms_objeto_weighted.keys())
-                    
-                    if key_terms_comuns:
-                        # Score baseado em termos-chave PONDERADOS
-                        peso_comuns = sum(key_terms_var_weighted.get(t, 1.0) for t in key_terms_comuns)
-                        peso_total_objeto = sum(key_terms_objeto_weighted.values())
-                        
-                        score = peso_comuns / max(peso_total_objeto, 1.0)
-                        
-                        # Contar quantos termos de alto valor foram encontrados
-                        high_value_matches = sum(1 for t in key_terms_comuns if key_terms_var_weighted.get(t, 1.0) >= 2.0)
-                        
-                        # Bonus progressivo para termos de alto valor
-                        if high_value_matches >= 3:
-                            score *= 2.0  # 3+ termos importantes
-                        elif high_value_matches >= 2:
-                            score *= 1.7  # 2 termos importantes
-                        elif high_value_matches >= 1:
-                            score *= 1.4  # 1 termo importante
-                        
-                        # Bonus se encontrou muitos termos no total
-                        if len(key_terms_comuns) >= 3:
-                            score *= 1.3
-                        elif len(key_terms_comuns) >= 2:
-                            score *= 1.2
-                        
-                        # Bonus extra se o match veio de uma variação com sinônimo
-                        if idx > 0:  # Não é o texto original
-                            score *= 1.3
-                        
-                        max_score_for_objeto = max(max_score_for_objeto, score)
-                
-                if max_score_for_objeto > best_score:
-                    best_score = max_score_for_objeto
-                    best_match = objeto
-                    key_terms_objeto_weighted = get_key_terms(objeto, include_weights=True)
-                    high_value = {k: v for k, v in key_terms_objeto_weighted.items() if v > 1.0}
-                    print(f"   🎯 Candidato: '{objeto[:60]}...'")
-                    print(f"      Score: {max_score_for_objeto:.3f} | Termos importantes: {high_value if high_value else 'nenhum'}")
+                score = max((self._objeto_score(weighted, objeto, idx)
+                             for idx, weighted in enumerate(variations_weighted)), default=0.0)
+                self._keep_best(best, objeto, score, position)
             
-            if best_match and best_score > 0.15:  # Threshold mais baixo para permitir matches parciais
-                confidence = min(0.85, 0.55 + best_score * 0.30)
-                print(f"   ✅ MATCH! Objeto: '{best_match[:60]}...'")
-                print(f"      Score: {best_score:.3f}, Confiança: {confidence:.2f}")
-                return (best_match, confidence)
+            # Threshold mais baixo para permitir matches parciais
+            ranked = self._ranked(best, 0.15, lambda s: min(0.85, 0.55 + s * 0.30), top_k)
+            best_score = max((score for score, _ in best.values()), default=0.0)
+            if ranked:
+                print(f"   ✅ MATCH! Objeto: '{ranked[0][0][:60]}...'")
+                print(f"      Score: {best_score:.3f}, Confiança: {ranked[0][1]:.2f}")
+                return ranked
+            elif not mode["semantic_fallback"]:
+                print(f"   ❌ Score por termos-chave insuficiente: {best_score:.3f} (modo {mode['name']}: sem busca semântica)")
             else:
                 print(f"   ❌ Score por termos-chave insuficiente: {best_score:.3f}")
                 print(f"   🔄 Tentando busca semântica...")
                 
                 # FALLBACK: Busca semântica usando embeddings
-                best_semantic_match = None
-                best_semantic_score = 0
-                
-                for objeto in objetos:
+                best_semantic = {}
+                for position, objeto in enumerate(objetos):
                     # Calcular similaridade semântica com cada variação
-                    max_similarity = 0
-                    for text_var in text_variations:
-                        similarity = self._semantic_similarity(text_var, objeto)
-                        max_similarity = max(max_similarity, similarity)
-                    
-                    if max_similarity > best_semantic_score:
-                        best_semantic_score = max_similarity
-                        best_semantic_match = objeto
+                    similarity = max((self._semantic_similarity(text_var, objeto)
+                                      for text_var in text_variations), default=0.0)
+                    self._keep_best(best_semantic, objeto, similarity, position)
                 
-                if best_semantic_match and best_semantic_score > 0.35:  # Threshold para similaridade semântica
-                    confidence = min(0.80, 0.50 + best_semantic_score * 0.30)
-                    print(f"   ✅ MATCH SEMÂNTICO! Objeto: '{best_semantic_match[:60]}...'")
-                    print(f"      Similaridade: {best_semantic_score:.3f}, Confiança: {confidence:.2f}")
-                    return (best_semantic_match, confidence)
-                else:
-                    print(f"   ❌ Similaridade semântica insuficiente: {best_semantic_score:.3f} (mínimo: 0.35)")
+                # Threshold para similaridade semântica
+                ranked = self._ranked(best_semantic, 0.35, lambda s: min(0.80, 0.50 + s * 0.30), top_k)
+                if ranked:
+                    print(f"   ✅ MATCH SEMÂNTICO! Objeto: '{ranked[0][0][:60]}...' (conf: {ranked[0][1]:.2f})")
+                    return ranked
+                best_semantic_score = max((score for score, _ in best_semantic.values()), default=0.0)
+                print(f"   ❌ Similaridade semântica insuficiente: {best_semantic_score:.3f} (mínimo: 0.35)")
         except Exception as e:
             print(f"   ❌ Erro: {e}")
         
-        return None
+        return []
     
-    def match_habilidade(self, text: str, disciplina: str = None, ano: str = None, unidade: str = None, objeto: str = None) -> Optional[Tuple[str, float]]:
-        """Encontra habilidade baseada no contexto"""
+    def match_objeto_conhecimento(self, text: str, disciplina: str = None, ano: str = None, unidade: str = None,
+                                  mode: Optional[Dict] = None) -> Optional[Tuple[str, float]]:
+        """Encontra objeto de conhecimento no texto com sinônimos"""
+        ranked = self.rank_objeto_conhecimento(text, disciplina, ano, unidade, mode, top_k=1)
+        return ranked[0] if ranked else None
+    
+    def rank_habilidade(self, text: str, disciplina: str = None, ano: str = None, unidade: str = None,
+                        objeto: str = None, top_k: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Habilidades do objeto, da mais para a menos provável: as que têm palavras
+        em comum com o texto primeiro (mais palavras antes), depois as demais
+        """
         if not all([disciplina, ano, unidade, objeto]):
-            return None
+            return []
         
         try:
             habilidades = self.bncc_data.get(disciplina, {}).get(ano, {}).get(unidade, {}).get(objeto, [])
             
-            if habilidades:
-                # Se tem múltiplas habilidades, tentar fazer match com o texto
-                if len(habilidades) > 1:
-                    text_lower = text.lower()
-                    best_match = None
-                    best_score = 0
-                    
-                    for hab in habilidades:
-                        hab_lower = hab.lower()
-                        palavras_texto = set(text_lower.split())
-                        palavras_hab = set(hab_lower.split())
-                        palavras_comuns = palavras_texto & palavras_hab
-                        
-                        if palavras_comuns:
-                            score = len(palavras_comuns)
-                            if score > best_score:
-                                best_score = score
-                                best_match = hab
-                    
-                    if best_match:
-                        return (best_match, 0.75)
-                
-                # Pegar a primeira habilidade como padrão
-                return (habilidades[0], 0.70)
+            best = {}
+            # Se tem múltiplas habilidades, tentar fazer match com o texto
+            if len(habilidades) > 1:
+                palavras_texto = set(text.lower().split())
+                for position, hab in enumerate(habilidades):
+                    palavras_comuns = palavras_texto & set(hab.lower().split())
+                    self._keep_best(best, hab, len(palavras_comuns), position)
+            
+            ranked = self._ranked(best, 0, lambda s: 0.75)
+            # Sem palavras em comum: as demais na ordem dos dados (a primeira é o padrão)
+            ranked.extend((hab, 0.70) for hab in habilidades if hab not in best)
+            return ranked[:top_k]
         except Exception as e:
             print(f"   Erro ao buscar habilidade: {e}")
         
-        return None
+        return []
+    
+    def match_habilidade(self, text: str, disciplina: str = None, ano: str = None, unidade: str = None, objeto: str = None) -> Optional[Tuple[str, float]]:
+        """Encontra habilidade baseada no contexto"""
+        ranked = self.rank_habilidade(text, disciplina, ano, unidade, objeto, top_k=1)
+        return ranked[0] if ranked else None
     
     def _fuzzy_match_unidade(self, text: str, disciplina: str = None, ano: str = None) -> Optional[Tuple[str, float]]:
         """Busca fuzzy por unidade temática"""
@@ -541,54 +771,63 @@ class BNCCMatcher:
         except:
             return False
     
-    def match_unidade_any_year(self, text: str, disciplina: str) -> Optional[Tuple[str, float]]:
-        """Busca unidade temática em qualquer ano da disciplina usando busca semântica"""
+    def rank_unidade_any_year(self, text: str, disciplina: str, mode: Optional[Dict] = None,
+                              top_k: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Unidades temáticas candidatas em qualquer ano da disciplina (busca semântica)"""
         if not disciplina:
-            return None
+            return []
+        mode = mode or get_mode()
+        if not mode["semantic_fallback"]:
+            print(f"   ⏩ Modo {mode['name']}: busca semântica em todos os anos desligada")
+            return []
         
         print(f"   🔍 Buscando em TODOS os anos de {disciplina}...")
         
         # Expandir com sinônimos
-        text_variations = expand_query(text)
+        text_variations = self._expand(text, mode.get("max_variations"))
         print(f"   📝 Variações: {text_variations[:3]}...")
         
-        best_match_unidade = None
-        best_match_ano = None
-        best_score = 0
-        best_objeto = None
-        
         try:
             anos = self.bncc_data.get(disciplina, {})
+            candidatos = [
+                (ano, unidade, objeto)
+                for ano, unidades in anos.items()
+                for unidade, objetos in unidades.items()
+                for objeto in objetos.keys()
+            ]
+            
+            # Base grande: restringir aos vizinhos do índice ANN
+            if len(candidatos) > mode.get("ann_threshold", ANN_CANDIDATE_THRESHOLD):
+                ann = self._ann_candidates(text_variations, disciplina)
+                if ann is not None:
+                    print(f"   🗂️  ANN: {len(ann)} de {len(candidatos)} objetos")
+                    candidatos = [(ano, unidade, objeto) for _, ano, unidade, objeto in ann]
             
             # FASE 1: Busca semântica (mais eficaz para textos curtos)
             print(f"   🔄 Usando busca semântica...")
-            for ano, unidades in anos.items():
-                for unidade, objetos in unidades.items():
-                    for objeto in objetos.keys():
-                        # Calcular similaridade semântica com cada variação
-                        max_similarity = 0
-                        for text_var in text_variations:
-                            similarity = self._semantic_similarity(text_var, objeto)
-                            max_similarity = max(max_similarity, similarity)
-                        
-                        if max_similarity > best_score:
-                            best_score = max_similarity
-                            best_match_unidade = unidade
-                            best_match_ano = ano
-                            best_objeto = objeto
+            best = {}
+            for position, (ano, unidade, objeto) in enumerate(candidatos):
+                # Calcular similaridade semântica com cada variação
+                similarity = max((self._semantic_similarity(text_var, objeto)
+                                  for text_var in text_variations), default=0.0)
+                self._keep_best(best, unidade, similarity, position)
             
-            if best_match_unidade and best_score > 0.30:  # Threshold mais baixo para any_year
-                confidence = min(0.80, 0.50 + best_score * 0.30)
-                print(f"   ✅ MATCH SEMÂNTICO! Unidade: '{best_match_unidade[:60]}...'")
-                print(f"      Ano: {best_match_ano}, Via objeto: '{best_objeto[:60]}...'")
-                print(f"      Similaridade: {best_score:.3f}, Confiança: {confidence:.2f}")
-                return (best_match_unidade, confidence)
-            else:
-                print(f"   ❌ Similaridade insuficiente: {best_score:.3f} (mínimo: 0.30)")
+            ranked = self._ranked(best, mode["any_year_threshold"], lambda s: min(0.80, 0.50 + s * 0.30), top_k)
+            if ranked:
+                print(f"   ✅ MATCH SEMÂNTICO! Unidade: '{ranked[0][0][:60]}...' (conf: {ranked[0][1]:.2f})")
+                return ranked
+            best_score = max((score for score, _ in best.values()), default=0.0)
+            print(f"   ❌ Similaridade insuficiente: {best_score:.3f} (mínimo: {mode['any_year_threshold']:.2f})")
         except Exception as e:
             print(f"   ❌ Erro: {e}")
         
-        return None
+        return []
+    
+    def match_unidade_any_year(self, text: str, disciplina: str,
+                               mode: Optional[Dict] = None) -> Optional[Tuple[str, float]]:
+        """Busca unidade temática em qualquer ano da disciplina usando busca semântica"""
+        ranked = self.rank_unidade_any_year(text, disciplina, mode, top_k=1)
+        return ranked[0] if ranked else None
     
     def get_ano_from_unidade(self, disciplina: str, unidade: str) -> Optional[str]:
         """Retorna o ano escolar de uma unidade temática"""
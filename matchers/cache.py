@@ -0,0 +1,262 @@
+"""
+Cache plugável de resultados de extração, vetores de consulta e expansões de sinônimos
+
+Backends:
+    MemoryCache   LRU em processo com TTL (padrão)
+    RedisCache    qualquer servidor que fale o protocolo Redis (Redis, KeyDB,
+                  Dragonfly...), compartilhado entre os pods; requer `pip install redis`
+
+Os valores são gravados em binário compacto (ver encode_value) e o
+get_or_compute protege contra stampede: no miss, só quem consegue o lock
+(SET NX com TTL) calcula; os demais esperam o valor aparecer no cache.
+
+Configuração:
+    CACHE_BACKEND=memory|redis|none       resultados de /api/extract
+    QUERY_CACHE_BACKEND=memory|redis|none vetores e expansões de consulta
+    CACHE_URL=redis://localhost:6379/0
+    CACHE_TTL=3600
+"""
+import hashlib
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import numpy as np
+import orjson
+
+try:
+    import redis
+except ImportError:  # opcional: só necessário com CACHE_BACKEND=redis
+    redis = None
+
+# Prefixos do formato binário
+_JSON = b"j"
+_ZJSON = b"z"
+_VECTOR = b"v"
+# JSON maior que isso é comprimido com zlib
+_COMPRESS_MIN = 1024
+
+CACHE_TTL = float(os.getenv("CACHE_TTL", "3600"))
+
+
+def encode_value(value: Any) -> bytes:
+    """
+    Codifica um valor em bytes: vetores numpy como float32 crus, o resto como
+    JSON (orjson), comprimido com zlib quando passa de 1 KB
+    """
+    if isinstance(value, np.ndarray):
+        return _VECTOR + value.astype(np.float32).tobytes()
+    data = orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    if len(data) >= _COMPRESS_MIN:
+        return _ZJSON + zlib.compress(data, 6)
+    return _JSON + data
+
+
+def decode_value(data: bytes) -> Any:
+    """Inverso de encode_value"""
+    kind, payload = data[:1], data[1:]
+    if kind == _VECTOR:
+        return np.frombuffer(payload, dtype=np.float32)
+    if kind == _ZJSON:
+        payload = zlib.decompress(payload)
+    return orjson.loads(payload)
+
+
+def make_key(*parts: Any) -> str:
+    """Chave curta e estável a partir de partes arbitrárias (serializadas com orjson)"""
+    raw = orjson.dumps(parts, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+class CacheBackend:
+    """Interface dos backends: bytes in, bytes out"""
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        """Grava só se a chave não existe (usado como lock); True se gravou"""
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """LRU em processo com TTL por item"""
+
+    def __init__(self, max_items: int = 10000):
+        self.max_items = max_items
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _alive(self, key: str) -> Optional[tuple]:
+        item = self._items.get(key)
+        if item is not None and item[1] is not None and item[1] < time.monotonic():
+            del self._items[key]
+            return None
+        return item
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._alive(key)
+            if item is None:
+                return None
+            self._items.move_to_end(key)
+            return item[0]
+
+    def _store(self, key: str, value: bytes, ttl: Optional[float]):
+        self._items[key] = (value, time.monotonic() + ttl if ttl else None)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        with self._lock:
+            if self._alive(key) is not None:
+                return False
+            self._store(key, value, ttl)
+            return True
+
+    def delete(self, key: str):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class RedisCache(CacheBackend):
+    """Backend compartilhado via protocolo Redis"""
+
+    def __init__(self, url: Optional[str] = None, client=None):
+        """
+        Args:
+            url: redis://host:porta/db (padrão: CACHE_URL)
+            client: cliente já criado (ex: fakeredis.FakeRedis()) em vez da URL
+        """
+        if client is None:
+            if redis is None:
+                raise ImportError("CACHE_BACKEND=redis requer o pacote redis (pip install redis)")
+            client = redis.Redis.from_url(url or os.getenv("CACHE_URL", "redis://localhost:6379/0"))
+        self.client = client
+
+    @staticmethod
+    def _ms(ttl: Optional[float]) -> Optional[int]:
+        return max(1, int(ttl * 1000)) if ttl else None
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        self.client.set(key, value, px=self._ms(ttl))
+
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        return bool(self.client.set(key, value, px=self._ms(ttl), nx=True))
+
+    def delete(self, key: str):
+        self.client.delete(key)
+
+
+def create_backend(kind: Optional[str] = None) -> Optional[CacheBackend]:
+    """Backend pelo nome ("memory", "redis", "none"); None desliga o cache"""
+    kind = (kind or "memory").lower()
+    if kind in ("none", "off", ""):
+        return None
+    if kind == "redis":
+        return RedisCache()
+    if kind == "memory":
+        return MemoryCache(int(os.getenv("CACHE_MAX_ITEMS", "10000")))
+    raise ValueError(f"Backend de cache desconhecido: '{kind}'")
+
+
+class Cache:
+    """Namespace + TTL + codificação + proteção contra stampede sobre um backend"""
+
+    def __init__(self, backend: CacheBackend, namespace: str, ttl: Optional[float] = None,
+                 lock_ttl: float = 10.0, wait_interval: float = 0.05):
+        """
+        Args:
+            backend: onde os bytes ficam
+            namespace: prefixo das chaves (inclui a versão dos dados)
+            ttl: validade dos valores em segundos (None = sem expiração)
+            lock_ttl: tempo máximo que um cálculo segura o lock
+            wait_interval: intervalo de polling de quem espera o lock
+        """
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.wait_interval = wait_interval
+        self.stats = {"hits": 0, "misses": 0, "waits": 0, "errors": 0}
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: str) -> Any:
+        """Valor em cache ou None (erros do backend contam como miss)"""
+        try:
+            data = self.backend.get(self._key(key))
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"⚠️  Cache indisponível ({self.namespace}): {e}")
+            return None
+        return decode_value(data) if data is not None else None
+
+    def set(self, key: str, value: Any):
+        try:
+            self.backend.set(self._key(key), encode_value(value), self.ttl)
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"⚠️  Cache indisponível ({self.namespace}): {e}")
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        """
+        Valor do cache ou calculado uma única vez no cluster
+
+        No miss, tenta pegar o lock da chave: quem consegue calcula e grava;
+        quem não consegue espera o valor aparecer (até lock_ttl) e só então
+        calcula por conta própria.
+        """
+        value = self.get(key)
+        if value is not None:
+            self.stats["hits"] += 1
+            return value
+        self.stats["misses"] += 1
+
+        lock_key = self._key(key) + ":lock"
+        try:
+            owner = self.backend.add(lock_key, b"1", self.lock_ttl)
+        except Exception:
+            owner = True  # backend fora do ar: calcula sem coordenação
+
+        if not owner:
+            self.stats["waits"] += 1
+            deadline = time.monotonic() + self.lock_ttl
+            while time.monotonic() < deadline:
+                time.sleep(self.wait_interval)
+                value = self.get(key)
+                if value is not None:
+                    return value
+
+        try:
+            value = compute()
+            if value is not None:
+                self.set(key, value)
+            return value
+        finally:
+            if owner:
+                try:
+                    self.backend.delete(lock_key)
+                except Exception:
+                    pass
@@ -0,0 +1,159 @@
+"""
+Catálogo da hierarquia do currículo para os selects em cascata do frontend
+(disciplina -> ano -> unidade -> objeto -> habilidade)
+
+Todas as fatias são serializadas e comprimidas (gzip e, se o pacote brotli
+estiver instalado, br) quando o catálogo é criado - no aquecimento da subida ou
+na primeira consulta -, cada versão com o seu ETag forte (o hash do JSON com
+sufixo -gz/-br). As respostas são estáticas até o próximo reload dos dados,
+então podem ficar no CDN; o NLP não participa.
+"""
+import gzip
+import hashlib
+import json
+import threading
+from collections.abc import Mapping
+from typing import Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # opcional: sem brotli só servimos gzip
+    brotli = None
+
+
+# Sufixo do ETag de cada content-coding (validadores fortes diferem por codificação)
+ETAG_SUFFIXES = {None: "", "gzip": "-gz", "br": "-br"}
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> Dict[str, float]:
+    """Codificações do Accept-Encoding com o peso q (q=0 = recusada)"""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        coding, *params = [item.strip() for item in part.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value.strip())
+                except ValueError:
+                    q = 0.0
+        accepted[coding.lower()] = q
+    return accepted
+
+
+class CatalogEntry:
+    """JSON pré-serializado de uma fatia, com as versões comprimidas e um ETag por versão"""
+
+    def __init__(self, payload):
+        self.body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.encoded: Dict[str, bytes] = {
+            "gzip": gzip.compress(self.body, compresslevel=9, mtime=0)
+        }
+        if brotli is not None:
+            self.encoded["br"] = brotli.compress(self.body, quality=11)
+
+    @property
+    def etag(self) -> str:
+        """ETag da versão sem compressão"""
+        return self.etag_for(None)
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        return f'"{self.digest}{ETAG_SUFFIXES[encoding]}"'
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """
+        Escolhe a melhor versão aceita pelo cliente (br > gzip > sem compressão);
+        q=0 recusa a codificação e "*" vale para as que não foram citadas
+
+        Returns:
+            (corpo, content-encoding ou None)
+        """
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in ("br", "gzip"):
+            if encoding in self.encoded and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+                return self.encoded[encoding], encoding
+        return self.body, None
+
+    def matches(self, if_none_match: Optional[str], encoding: Optional[str] = None) -> bool:
+        """If-None-Match bate com o ETag da versão escolhida (aceita lista e W/)"""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return self.etag_for(encoding) in tags
+
+
+class CurriculumCatalog:
+    """Fatias do catálogo de um currículo, montadas e comprimidas na criação"""
+
+    def __init__(self, data: Mapping):
+        """
+        Args:
+            data: currículo {disciplina: {ano: {unidade: {objeto: [habilidades]}}}}
+        """
+        self.data = data
+        self._entries: Dict[Tuple, CatalogEntry] = {}
+        self._lock = threading.Lock()
+        self._build_all()
+
+    def _build_all(self):
+        """Serializa e comprime todas as fatias (carrega todos os shards do currículo)"""
+        self.disciplinas()
+        for disciplina in self.data:
+            self.anos(disciplina)
+            for ano in self.data[disciplina]:
+                self.arvore(disciplina, ano)
+
+    def _get(self, key: Tuple, build) -> CatalogEntry:
+        entry = self._entries.get(key)
+        if entry is None:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None:
+                    entry = CatalogEntry(build())
+                    self._entries[key] = entry
+        return entry
+
+    def disciplinas(self) -> CatalogEntry:
+        """Lista de disciplinas"""
+        return self._get(("disciplinas",), lambda: {"disciplinas": list(self.data)})
+
+    def anos(self, disciplina: str) -> CatalogEntry:
+        """Anos de uma disciplina"""
+        if disciplina not in self.data:
+            raise KeyError(disciplina)
+        return self._get(("anos", disciplina), lambda: {
+            "disciplina": disciplina,
+            "anos": list(self.data[disciplina])
+        })
+
+    def arvore(self, disciplina: str, ano: str) -> CatalogEntry:
+        """
+        Tudo que existe abaixo de disciplina + ano: as listas de
+        get_all_for_context e a árvore unidade -> objeto -> habilidades
+        """
+        if disciplina not in self.data or ano not in self.data[disciplina]:
+            raise KeyError((disciplina, ano))
+
+        def build():
+            unidades = self.data[disciplina][ano]
+            return {
+                "disciplina": disciplina,
+                "ano": ano,
+                "unidades": list(unidades.keys()),
+                "objetos": [obj for objetos in unidades.values() for obj in objetos.keys()],
+                "total_habilidades": sum(len(habs) for objetos in unidades.values() for habs in objetos.values()),
+                "arvore": unidades
+            }
+        return self._get(("arvore", disciplina, ano), build)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "fatias": len(self._entries),
+            "bytes": sum(len(e.body) for e in self._entries.values())
+        }
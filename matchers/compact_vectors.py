@@ -0,0 +1,113 @@
+"""
+Tabela compacta de word vectors (modo "vectors")
+
+Só a similaridade semântica precisa do modelo grande, e dele só usa os vetores.
+Esta tabela guarda apenas os vetores do vocabulário da BNCC, dos sinônimos e das
+tabelas de mapeamento, mais as N palavras mais frequentes do modelo, em uma
+matriz float16 lida por memory-map e um dicionário palavra -> linha.
+
+Formato do diretório:
+    vectors.npy   matriz (linhas x dimensões) float16
+    vocab.json    lista de palavras; a posição é a linha na matriz
+"""
+import json
+import os
+from typing import Dict, Iterable, Optional, Set
+
+import numpy as np
+
+VECTORS_FILE = "vectors.npy"
+VOCAB_FILE = "vocab.json"
+
+
+class CompactVectors:
+    """Vetores float16 em memory-map com lookup por hash"""
+
+    def __init__(self, data: np.ndarray, words: Iterable[str]):
+        self.data = data
+        self.index: Dict[str, int] = {word: row for row, word in enumerate(words)}
+        self.dim = data.shape[1] if data.ndim == 2 else 0
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @classmethod
+    def load(cls, path: str) -> "CompactVectors":
+        """Abre a tabela sem copiar a matriz para a memória"""
+        data = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+        with open(os.path.join(path, VOCAB_FILE), "r", encoding="utf-8") as f:
+            words = json.load(f)
+        return cls(data, words)
+
+    def get(self, word: str) -> Optional[np.ndarray]:
+        """Vetor da palavra (forma exata, depois minúscula) ou None"""
+        row = self.index.get(word)
+        if row is None:
+            row = self.index.get(word.lower())
+        if row is None:
+            return None
+        return self.data[row]
+
+    def doc_vector(self, tokens: Iterable[str]) -> np.ndarray:
+        """
+        Média dos vetores dos tokens, como Doc.vector do spaCy (tokens sem
+        vetor contam como zero)
+        """
+        total = np.zeros(self.dim, dtype=np.float32)
+        count = 0
+        for token in tokens:
+            count += 1
+            vector = self.get(token)
+            if vector is not None:
+                total += vector
+        return total / count if count else total
+
+
+def collect_vocabulary(nlp, texts: Iterable[str]) -> Set[str]:
+    """Formas (original e minúscula) de todos os tokens dos textos"""
+    words = set()
+    for text in texts:
+        for token in nlp.make_doc(text):
+            words.add(token.text)
+            words.add(token.lower_)
+    return words
+
+
+def build_compact_vectors(nlp, texts: Iterable[str], path: str, top_n: int = 20000) -> int:
+    """
+    Extrai do modelo os vetores do vocabulário dos textos mais as top_n palavras
+    mais frequentes e grava em `path`.
+
+    A ordem das linhas na tabela de vetores do spaCy segue a frequência do corpus
+    de treino, então as primeiras linhas são usadas como ranking de frequência.
+
+    Returns:
+        número de palavras gravadas
+    """
+    vectors = nlp.vocab.vectors
+    if not len(vectors):
+        raise ValueError("O modelo não tem word vectors")
+
+    wanted = collect_vocabulary(nlp, texts)
+
+    words, rows = [], []
+    seen = set()
+    by_row = sorted(vectors.key2row.items(), key=lambda item: item[1])
+    for rank, (key, row) in enumerate(by_row):
+        if key not in nlp.vocab.strings:
+            continue
+        word = nlp.vocab.strings[key]
+        if word in seen:
+            continue
+        if rank < top_n or word in wanted:
+            seen.add(word)
+            words.append(word)
+            rows.append(row)
+
+    data = np.asarray(vectors.data)[rows].astype(np.float16)
+
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, VECTORS_FILE), data)
+    with open(os.path.join(path, VOCAB_FILE), "w", encoding="utf-8") as f:
+        json.dump(words, f, ensure_ascii=False)
+    return len(words)
@@ -0,0 +1,174 @@
+"""
+Registro de currículos (BNCC, currículos estaduais, objetivos da escola...)
+
+Todos os currículos têm o mesmo formato hierárquico:
+    {disciplina: {ano: {unidade: {objeto: [habilidades]}}}}
+
+Um currículo pode ser um único JSON ou um diretório com um arquivo por
+disciplina (shards) e um index.json {disciplina: arquivo}. No formato em
+diretório, cada disciplina só é lida do disco quando é acessada.
+"""
+import json
+import os
+from collections.abc import Mapping
+from typing import Dict, Iterable, List, Optional
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CURRICULUM = "bncc"
+DEFAULT_CURRICULUM_PATH = os.path.join(BASE_DIR, 'data', 'bncc-data.json')
+
+
+def _resolve_path(path: str) -> str:
+    """Caminhos relativos são relativos à raiz do projeto"""
+    return path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
+
+
+class CurriculumData(Mapping):
+    """Dados de um currículo carregados por disciplina sob demanda"""
+
+    def __init__(self, path: str, disciplinas: Optional[Iterable[str]] = None):
+        """
+        Args:
+            path: arquivo JSON único ou diretório de shards
+            disciplinas: se informado, apenas essas disciplinas ficam visíveis
+        """
+        self.path = _resolve_path(path)
+        self.allowed = set(disciplinas) if disciplinas else None
+        self._shards: Dict[str, Dict] = {}
+        self._files: Optional[Dict[str, str]] = None
+        self._names: Optional[List[str]] = None
+
+    def _is_sharded(self) -> bool:
+        return os.path.isdir(self.path)
+
+    def _load_names(self) -> List[str]:
+        """Lista as disciplinas disponíveis sem carregar os dados (quando possível)"""
+        if self._names is not None:
+            return self._names
+
+        if self._is_sharded():
+            index_path = os.path.join(self.path, 'index.json')
+            if os.path.exists(index_path):
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    self._files = json.load(f)
+            else:
+                self._files = {
+                    os.path.splitext(name)[0]: name
+                    for name in sorted(os.listdir(self.path)) if name.endswith('.json')
+                }
+            names = list(self._files.keys())
+        else:
+            # Arquivo único: não há como listar sem ler tudo
+            self._load_file()
+            names = list(self._shards.keys())
+
+        if self.allowed is not None:
+            names = [n for n in names if n in self.allowed]
+        self._names = names
+        return names
+
+    def _load_file(self):
+        """Carrega um currículo em arquivo único"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self._shards = {
+                    disciplina: anos for disciplina, anos in data.items()
+                    if self.allowed is None or disciplina in self.allowed
+                }
+            else:
+                print(f"AVISO: Currículo não encontrado em {self.path}")
+        except Exception as e:
+            print(f"Erro ao carregar currículo {self.path}: {e}")
+
+    def _load_shard(self, disciplina: str) -> Dict:
+        """Lê o arquivo de uma disciplina"""
+        shard_path = os.path.join(self.path, self._files[disciplina])
+        try:
+            with open(shard_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Erro ao carregar {shard_path}: {e}")
+            return {}
+
+    def __getitem__(self, disciplina: str) -> Dict:
+        if disciplina not in self:
+            raise KeyError(disciplina)
+        if disciplina not in self._shards:
+            self._shards[disciplina] = self._load_shard(disciplina)
+        return self._shards[disciplina]
+
+    def __contains__(self, disciplina) -> bool:
+        return disciplina in self._load_names()
+
+    def __iter__(self):
+        return iter(self._load_names())
+
+    def __len__(self) -> int:
+        return len(self._load_names())
+
+    def loaded(self) -> List[str]:
+        """Disciplinas já carregadas em memória"""
+        return list(self._shards.keys())
+
+
+class CurriculumRegistry:
+    """Mapeia nomes de currículo para suas fontes de dados"""
+
+    def __init__(self, sources: Optional[Dict[str, str]] = None,
+                 default: str = DEFAULT_CURRICULUM,
+                 disciplinas: Optional[Iterable[str]] = None):
+        """
+        Args:
+            sources: {nome: caminho do JSON ou diretório de shards}
+            default: currículo usado quando a requisição não escolhe um
+            disciplinas: restringe as disciplinas servidas por este worker
+        """
+        self.sources = dict(sources or {DEFAULT_CURRICULUM: DEFAULT_CURRICULUM_PATH})
+        self.default = default
+        self.disciplinas = list(disciplinas) if disciplinas else None
+        self._data: Dict[str, CurriculumData] = {}
+
+    @classmethod
+    def from_env(cls) -> "CurriculumRegistry":
+        """
+        Lê a configuração do ambiente:
+            CURRICULA="bncc=data/bncc-data.json,sp=data/curricula/sp"
+            CURRICULUM_DEFAULT=bncc
+            CURRICULUM_DISCIPLINAS="Matemática"
+        """
+        sources = {}
+        for item in os.getenv("CURRICULA", "").split(","):
+            if "=" in item:
+                name, path = item.split("=", 1)
+                sources[name.strip()] = path.strip()
+
+        disciplinas = [d.strip() for d in os.getenv("CURRICULUM_DISCIPLINAS", "").split(",") if d.strip()]
+        return cls(
+            sources or None,
+            default=os.getenv("CURRICULUM_DEFAULT", DEFAULT_CURRICULUM),
+            disciplinas=disciplinas
+        )
+
+    def register(self, name: str, path: str):
+        """Adiciona (ou substitui) um currículo"""
+        self.sources[name] = path
+        self._data.pop(name, None)
+
+    def names(self) -> List[str]:
+        return list(self.sources.keys())
+
+    def resolve(self, name: Optional[str] = None) -> str:
+        """Nome efetivo do currículo; erro se não estiver registrado"""
+        name = name or self.default
+        if name not in self.sources:
+            raise ValueError(f"Currículo desconhecido: '{name}'. Disponíveis: {', '.join(self.names())}")
+        return name
+
+    def get(self, name: Optional[str] = None) -> CurriculumData:
+        """Dados (lazy) de um currículo"""
+        name = self.resolve(name)
+        if name not in self._data:
+            self._data[name] = CurriculumData(self.sources[name], self.disciplinas)
+        return self._data[name]
@@ -9,53 +9,53 @@ from matchers.base_matcher import BaseMatcher
 
 DISCIPLINAS_PATTERNS = {
     "Matemática": [
-        "matemática", "matematica", "math", "cálculo", "calculo",
-        "álgebra", "algebra", "geometria", "aritmética", "aritmetica",
-        "números", "numeros", "equações", "equacoes", "frações", "fracoes",
-        "trigonometria", "estatística", "estatistica", "probabilidade"
+        "matemática", "math", "cálculo",
+        "álgebra", "geometria", "aritmética",
+        "números", "equações", "frações",
+        "trigonometria", "estatística", "probabilidade"
     ],
     "Língua Portuguesa": [
-        "português", "portugues", "lingua portuguesa", "língua portuguesa",
-        "gramática", "gramatica", "redação", "redacao", "literatura",
-        "interpretação", "interpretacao", "texto", "leitura", "escrita",
-        "ortografia", "sintaxe", "morfologia", "semântica", "semantica"
+        "português", "língua portuguesa",
+        "gramática", "redação", "literatura",
+        "interpretação", "texto", "leitura", "escrita",
+        "ortografia", "sintaxe", "morfologia", "semântica"
     ],
     "Ciências": [
-        "ciências", "ciencias", "biologia", "física", "fisica",
-        "química", "quimica", "natureza", "meio ambiente", "ecologia",
-        "corpo humano", "animais", "plantas", "células", "celulas",
-        "energia", "matéria", "materia"
+        "ciências", "biologia", "física",
+        "química", "natureza", "meio ambiente", "ecologia",
+        "corpo humano", "animais", "plantas", "células",
+        "energia", "matéria"
     ],
     "História": [
-        "história", "historia", "histórico", "historico",
-        "brasil", "mundo", "guerra", "revolução", "revolucao",
-        "período", "periodo", "era", "século", "seculo",
-        "civilização", "civilizacao", "império", "imperio",
-        "república", "republica", "ditadura", "democracia"
+        "história", "histórico",
+        "brasil", "mundo", "guerra", "revolução",
+        "período", "era", "século",
+        "civilização", "império",
+        "república", "ditadura", "democracia"
     ],
     "Geografia": [
-        "geografia", "geográfico", "geografico", "mapa", "mapas",
-        "região", "regiao", "clima", "relevo", "população", "populacao",
-        "território", "territorio", "país", "pais", "continente",
-        "urbanização", "urbanizacao", "globalização", "globalizacao"
+        "geografia", "geográfico", "mapa", "mapas",
+        "região", "clima", "relevo", "população",
+        "território", "país", "continente",
+        "urbanização", "globalização"
     ],
     "Inglês": [
-        "inglês", "ingles", "english", "língua inglesa", "lingua inglesa",
+        "inglês", "english", "língua inglesa",
         "vocabulary", "grammar", "reading", "writing"
     ],
     "Arte": [
-        "arte", "artes", "música", "musica", "pintura", "escultura",
-        "teatro", "dança", "danca", "artístico", "artistico",
-        "desenho", "cultura", "estética", "estetica"
+        "arte", "artes", "música", "pintura", "escultura",
+        "teatro", "dança", "artístico",
+        "desenho", "cultura", "estética"
     ],
     "Educação Física": [
-        "educação física", "educacao fisica", "esporte", "esportes",
-        "atividade física", "atividade fisica", "ginástica", "ginastica",
-        "jogos", "atletismo", "saúde", "saude"
+        "educação física", "esporte", "esportes",
+        "atividade física", "ginástica",
+        "jogos", "atletismo", "saúde"
     ]
 }
 
 
 class DisciplinasMatcher(BaseMatcher):
-    def __init__(self, nlp):
-        super().__init__(nlp, DISCIPLINAS_PATTERNS)
+    def __init__(self, nlp, patterns=None):
+        super().__init__(nlp, patterns if patterns is not None else DISCIPLINAS_PATTERNS)
@@ -0,0 +1,163 @@
+"""
+Correção ortográfica barata via índice de trigramas + distância de edição limitada
+
+Professores erram bastante ("matemátca", "fraçoes", "getulio varga"). Em vez de
+deixar esses textos caírem na busca semântica, cada palavra desconhecida é
+comparada com o vocabulário dos matchers (palavras-chave das disciplinas,
+chaves de sinônimos, termos-chave da BNCC): os trigramas selecionam poucos
+candidatos e a distância de Levenshtein (com limite) escolhe o mais próximo.
+Tudo é comparado sem acentos. Sem léxico (modelo sem word vectors) só a
+acentuação é corrigida.
+"""
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from matchers.base_matcher import normalize_text
+
+WORD_RE = re.compile(r'\w+')
+
+
+def trigrams(word: str) -> Set[str]:
+    """Trigramas com marcadores de início/fim ("##a", "#ab", ..., "yz#")"""
+    padded = f"##{word}#"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bounded_levenshtein(a: str, b: str, max_distance: int) -> int:
+    """Distância de edição; para assim que passa de max_distance (retorna max_distance + 1)"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j, char_b in enumerate(b, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            )
+            row_min = min(row_min, current[j])
+        if row_min > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+def max_distance_for(word: str) -> int:
+    """Erros tolerados conforme o tamanho da palavra"""
+    if len(word) < 5:
+        return 0
+    if len(word) < 8:
+        return 1
+    return 2
+
+
+class TrigramIndex:
+    """Índice trigrama -> termos, com busca por distância de edição limitada"""
+
+    def __init__(self, terms: Iterable[str]):
+        # forma sem acento -> forma original (preferindo a acentuada)
+        self.terms: Dict[str, str] = {}
+        for term in sorted(set(terms)):
+            folded = normalize_text(term)
+            if self.terms.get(folded, folded) == folded:
+                self.terms[folded] = term
+
+        self._postings: Dict[str, List[str]] = defaultdict(list)
+        for folded in self.terms:
+            for gram in trigrams(folded):
+                self._postings[gram].append(folded)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def __contains__(self, word: str) -> bool:
+        return normalize_text(word) in self.terms
+
+    def lookup(self, word: str, max_distance: Optional[int] = None) -> Optional[Tuple[str, int]]:
+        """
+        Termo mais próximo da palavra
+
+        Returns:
+            (termo original, distância) ou None se nenhum está dentro do limite
+        """
+        folded = normalize_text(word)
+        if folded in self.terms:
+            return (self.terms[folded], 0)
+
+        if max_distance is None:
+            max_distance = max_distance_for(folded)
+        if max_distance <= 0:
+            return None
+
+        grams = trigrams(folded)
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for candidate in self._postings.get(gram, ()):
+                shared[candidate] += 1
+
+        # Cada edição destrói no máximo 3 trigramas
+        min_shared = max(1, len(grams) - 3 * max_distance)
+        candidates = sorted(
+            (c for c, n in shared.items() if n >= min_shared),
+            key=lambda c: (-shared[c], abs(len(c) - len(folded)))
+        )
+
+        best = None
+        for candidate in candidates:
+            distance = bounded_levenshtein(folded, candidate, max_distance)
+            if distance <= max_distance and (best is None or distance < best[1]):
+                best = (self.terms[candidate], distance)
+                if distance == 1:
+                    break
+        return best
+
+
+class SpellingCorrector:
+    """Substitui palavras desconhecidas pelo termo mais próximo do vocabulário dos matchers"""
+
+    def __init__(self, targets: Iterable[str], known: Iterable[str] = (), is_word=None):
+        """
+        Args:
+            targets: vocabulário dos matchers (destinos possíveis da correção)
+            known: palavras corretas que nunca são corrigidas (ex: texto da BNCC)
+            is_word: função que diz se uma palavra existe (ex: tem word vector). Sem
+                ela não há como distinguir erro de palavra fora do vocabulário
+                ("mitologia" viraria "biologia"), então só a acentuação é corrigida
+        """
+        targets = {t.lower() for t in targets}
+        self.index = TrigramIndex(targets)
+        self.known = targets | {w.lower() for w in known}
+        self.is_word = is_word
+
+    def correct(self, text: str) -> Tuple[str, Dict[str, str]]:
+        """
+        Returns:
+            (texto corrigido, {palavra original: correção})
+        """
+        corrections = {}
+
+        def replace(match):
+            word = match.group(0)
+            lower = word.lower()
+            if any(c.isdigit() for c in word) or lower in self.known:
+                return word
+
+            # Distância 0 = só acentuação diferente ("fraçoes" -> "frações")
+            found = self.index.lookup(lower)
+            if not found:
+                return word
+            # Edição de verdade só com um léxico confirmando que a palavra não existe
+            if found[1] > 0 and (self.is_word is None or self.is_word(lower)):
+                return word
+
+            corrected = found[0]
+            if word[0].isupper():
+                corrected = corrected[0].upper() + corrected[1:]
+            corrections[word] = corrected
+            return corrected
+
+        return WORD_RE.sub(replace, text), corrections
@@ -0,0 +1,65 @@
+"""
+Modos de execução da pipeline (velocidade x abrangência)
+
+- fast: só os caminhos por termos-chave e índices; sem fallbacks por vetores
+  (similaridade semântica, busca de unidade em todos os anos) nem tópicos livres,
+  e o texto é parseado sem o parser e o NER do spaCy (só os tópicos livres os usam)
+- balanced: comportamento padrão (termos-chave + fallbacks semânticos, índice ANN
+  na busca semântica acima de BNCC_ANN_THRESHOLD candidatos)
+- exhaustive: tudo ligado, sem ANN (varredura exata) e com mais variações de
+  sinônimos e mais texto por consulta
+
+O modo vem de context["modo"] (por requisição) ou de PIPELINE_MODE. Os alvos de
+latência (p95, ms) são conferidos por scripts/evaluate.py --modes --check-targets.
+"""
+import os
+from typing import Any, Dict, Optional
+
+DEFAULT_MODE = os.getenv("PIPELINE_MODE", "balanced")
+
+# Limites ausentes (max_variations, ann_threshold, text_budget) ficam com os
+# padrões configurados nos módulos: MAX_QUERY_VARIATIONS, BNCC_ANN_THRESHOLD, TEXT_BUDGET
+PIPELINE_MODES: Dict[str, Dict[str, Any]] = {
+    "fast": {
+        "semantic_fallback": False,
+        "free_topics": False,
+        "max_variations": 4,
+        "ann_threshold": 500,
+        "text_budget": 300,
+        "target_p95_ms": 50,
+    },
+    "balanced": {
+        "semantic_fallback": True,
+        "free_topics": True,
+        "target_p95_ms": 150,
+    },
+    "exhaustive": {
+        "semantic_fallback": True,
+        "free_topics": True,
+        "max_variations": 32,
+        "ann_threshold": float("inf"),
+        "text_budget": 2000,
+        "target_p95_ms": 1000,
+    },
+}
+
+# Limiares de aceitação (calibração, iguais em todos os modos)
+THRESHOLDS = {
+    "global_threshold": 0.20,
+    "any_year_threshold": 0.30,
+}
+
+
+def get_mode(name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Configuração do modo (com "name"); None = PIPELINE_MODE
+
+    Raises:
+        ValueError: modo desconhecido ou que não é texto (ex: "modo": 1 no contexto)
+    """
+    if name is not None and not isinstance(name, str):
+        raise ValueError(f"Modo deve ser texto, recebido: {name!r}")
+    name = (name or DEFAULT_MODE).strip().lower()
+    if name not in PIPELINE_MODES:
+        raise ValueError(f"Modo desconhecido: {name}. Disponíveis: {', '.join(PIPELINE_MODES)}")
+    return {"name": name, **THRESHOLDS, **PIPELINE_MODES[name]}
@@ -1,10 +1,12 @@
 """
 Pipeline principal de classificação NLP
 """
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+import itertools
 import re
 import sys
 import os
+import time
 
 # Adicionar diretório pai ao path para imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -12,24 +14,200 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from matchers.disciplinas_matcher import DisciplinasMatcher
 from matchers.bloom_matcher import BloomMatcher
 from matchers.bncc_matcher import BNCCMatcher
-from educational_mappings import (
-    ANOS_MAP, TIPOS_QUESTAO_MAP, TIPOS_TEXTO_BASE_MAP, PERFIS_ALUNO_MAP
-)
+from matchers.session import ExtractionSession
+from matchers.curriculum import CurriculumRegistry
+from matchers.tables import load_tables
+from matchers.compact_vectors import CompactVectors
+from matchers.fuzzy import SpellingCorrector, WORD_RE
+from matchers.catalog import CurriculumCatalog
+from matchers.cache import Cache, CACHE_TTL, create_backend, make_key
+from matchers.synonyms import MAX_QUERY_VARIATIONS, get_key_terms
+from matchers.answer_table import AnswerTable
+from matchers.base_matcher import normalize_text, fold_doc
+from matchers.slowlog import record_stage
+from matchers.modes import get_mode
+from spacy.matcher import PhraseMatcher
+from spacy.tokens import Doc
+
+
+# Chaves de context que controlam a execução em vez de informar campos
+CONTROL_KEYS = {"curriculo", "modo"}
+
+# Textos maiores que MAX_TEXT_LENGTH são recusados; acima de TEXT_BUDGET só as
+# frases mais informativas seguem para os estágios caros (BNCC, sinônimos)
+MAX_TEXT_LENGTH = int(os.getenv("MAX_TEXT_LENGTH", "20000"))
+TEXT_BUDGET = int(os.getenv("TEXT_BUDGET", "600"))
+
+SENTENCE_RE = re.compile(r'(?<=[.!?;:])\s+|\n+')
+ANO_HINT_RE = re.compile(r'\d+\s*[º°oa]?\s*(ano|serie|série)', re.IGNORECASE)
+
+# Textos maiores que isso nunca são nomes do currículo (não consultam a tabela de respostas)
+ANSWER_MAX_LENGTH = 200
+
+# Termos que NÃO são tópicos livres (tipos de questão, texto base, níveis de Bloom);
+# casados por token, sem acento, no Doc compartilhado
+TOPIC_BLACKLIST = [
+    'documento histórico', 'documentos históricos', 'texto literário', 'textos literários',
+    'artigo de jornal', 'artigo jornal', 'charge', 'charges', 'gráfico', 'gráficos',
+    'tabela', 'tabelas', 'imagem', 'imagens', 'mapa', 'mapas',
+    'múltipla escolha', 'dissertativa', 'dissertativas', 'verdadeiro ou falso', 'verdadeiro falso',
+    'análise', 'síntese', 'aplicação', 'conhecimento', 'conhecimentos', 'compreensão', 'avaliação'
+]
+ANO_TOPIC_RE = re.compile(r'^\d+[º°]?\s*ano')
+MAX_FREE_TOPICS = 5
+
+# Cadeia de dependência dos campos: mudar um campo invalida os seguintes
+BNCC_CHAIN = ["disciplina", "ano", "unidadeTematica", "objetoConhecimento", "habilidade"]
+
+# Quantos candidatos por campo são devolvidos em suggestions (vencedor incluído)
+SUGGESTIONS_TOP_K = int(os.getenv("SUGGESTIONS_TOP_K", "3"))
+
+# Componentes do spaCy usados só pelos tópicos livres (entidades e sintagmas
+# nominais); modos sem tópicos livres parseiam sem eles
+FREE_TOPIC_PIPES = ("parser", "ner")
 
 
 class NLPPipeline:
     """Pipeline de processamento NLP para extração educacional"""
     
-    def __init__(self, nlp):
+    def __init__(self, nlp, tables: Optional[Dict[str, Any]] = None,
+                 vectors: Optional[CompactVectors] = None):
+        """
+        Args:
+            nlp: modelo spaCy carregado (ou spacy.blank("pt") no modo "vectors")
+            tables: tabelas de mapeamento (ver matchers.tables); padrão são os módulos importados
+            vectors: tabela compacta de vetores usada na similaridade semântica
+        """
         self.nlp = nlp
-        self.disciplinas_matcher = DisciplinasMatcher(nlp)
-        self.bloom_matcher = BloomMatcher(nlp)
-        self.bncc_matcher = BNCCMatcher(nlp)
+        self.vectors = vectors
+        self.tables = tables if tables is not None else load_tables()
+        self.disciplinas_matcher = DisciplinasMatcher(nlp, self.tables["DISCIPLINAS_PATTERNS"])
+        self.bloom_matcher = BloomMatcher(nlp, self.tables["BLOOM_PATTERNS"])
+        self.topic_blacklist = PhraseMatcher(nlp.vocab, attr="NORM")
+        self.topic_blacklist.add("BLACKLIST", [fold_doc(nlp.make_doc(term)) for term in TOPIC_BLACKLIST])
+        # Currículos disponíveis (BNCC por padrão); um BNCCMatcher por currículo, criado sob demanda
+        self.curricula = CurriculumRegistry.from_env()
+        self._bncc_matchers = {}
+        self._spelling_correctors = {}
+        self._folded_tables = {}
+        self._catalogs = {}
+        self.query_cache = self._create_query_cache()
+        # Respostas prontas para nomes de unidades/objetos do currículo padrão
+        self.answer_table = AnswerTable()
+        self.bncc_matcher = self.get_bncc_matcher()
+    
+    def get_bncc_matcher(self, curriculo: Optional[str] = None) -> BNCCMatcher:
+        """Matcher do currículo pedido (padrão do registro se None)"""
+        name = self.curricula.resolve(curriculo)
+        if name not in self._bncc_matchers:
+            self._bncc_matchers[name] = BNCCMatcher(
+                self.nlp, self.curricula.get(name), self.tables["SYNONYMS_MAP"], self.vectors,
+                self.query_cache
+            )
+        return self._bncc_matchers[name]
     
-    def classify(self, text: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def _create_query_cache(self) -> Optional[Cache]:
+        """
+        Cache de expansões e vetores (QUERY_CACHE_BACKEND). O namespace muda
+        quando mudam os sinônimos, o limite de variações ou o modelo/vetores.
+        """
+        backend = create_backend(os.getenv("QUERY_CACHE_BACKEND", "memory"))
+        if backend is None:
+            return None
+        vector_rows = len(self.vectors) if self.vectors is not None else len(self.nlp.vocab.vectors)
+        version = make_key(self.tables["SYNONYMS_MAP"], MAX_QUERY_VARIATIONS,
+                           self.nlp.meta.get("name"), self.nlp.meta.get("version"), vector_rows)
+        return Cache(backend, f"consulta:{version}", ttl=CACHE_TTL)
+    
+    def build_answer_table(self, pause=None):
+        """Calcula em background a tabela de respostas prontas do currículo padrão"""
+        bncc_matcher = self.get_bncc_matcher()
+        return self.answer_table.build_in_background(
+            lambda name: self.classify(name), bncc_matcher.bncc_data, self.tables["SYNONYMS_MAP"], pause,
+            max_length=ANSWER_MAX_LENGTH
+        )
+    
+    def lookup_answer(self, text: str, context: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Resposta pronta quando o texto é só o nome de uma unidade/objeto do
+        currículo padrão e não há campos no contexto (senão o resultado mudaria)
+        """
+        if len(text) > ANSWER_MAX_LENGTH:
+            return None
+        if context:
+            if any(value for key, value in context.items() if key not in CONTROL_KEYS):
+                return None
+            if self.curricula.resolve(context.get("curriculo")) != self.curricula.resolve():
+                return None
+            # A tabela foi calculada no modo padrão
+            if get_mode(context.get("modo"))["name"] != get_mode()["name"]:
+                return None
+        return self.answer_table.lookup(text)
+    
+    def get_catalog(self, curriculo: Optional[str] = None) -> CurriculumCatalog:
+        """Catálogo pré-serializado do currículo (compartilha os dados com o matcher)"""
+        name = self.curricula.resolve(curriculo)
+        if name not in self._catalogs:
+            self._catalogs[name] = CurriculumCatalog(self.get_bncc_matcher(name).bncc_data)
+        return self._catalogs[name]
+    
+    def prepare_like(self, other: "NLPPipeline"):
+        """Pré-constrói os índices que outra pipeline já usava (antes de substituí-la)"""
+        for name, matcher in other._bncc_matchers.items():
+            if name in self.curricula.sources:
+                self.get_bncc_matcher(name).prepare_like(matcher)
+    
+    def index_stats(self) -> Dict[str, Any]:
+        """Tamanho das tabelas e índices em memória"""
+        return {
+            "disciplinas_padroes": sum(len(v) for v in self.disciplinas_matcher.patterns.values()),
+            "bloom_padroes": sum(len(v) for v in self.bloom_matcher.patterns.values()),
+            "sinonimos": len(self.tables["SYNONYMS_MAP"]),
+            "curriculos": {name: m.index_stats() for name, m in self._bncc_matchers.items()},
+            "catalogos": {name: c.stats() for name, c in self._catalogs.items()},
+            "cache_consultas": dict(self.query_cache.stats) if self.query_cache else None,
+            "respostas_prontas": self.answer_table.stats()
+        }
+    
+    def classify_batch(self, items: Iterable[Tuple[str, Optional[Dict[str, Any]]]],
+                       batch_size: int = 64) -> Iterator[Dict[str, Any]]:
+        """
+        Classifica vários textos em sequência, parseando em lote com nlp.pipe
+        
+        Args:
+            items: pares (texto, context)
+            batch_size: tamanho do lote do nlp.pipe
+        
+        Returns:
+            um resultado por item, na mesma ordem (ou {"error": mensagem} se o item falhou)
+        """
+        items, to_parse = itertools.tee(items)
+        # Textos que vão ser reduzidos pelo pré-filtro são parseados depois, já curtos
+        docs = self.nlp.pipe(
+            (text if len(text) <= TEXT_BUDGET else "" for text, _ in to_parse),
+            batch_size=batch_size
+        )
+        for (text, context), doc in zip(items, docs):
+            try:
+                yield self.classify(text, context, doc=doc)
+            except Exception as e:
+                yield {"error": str(e)}
+    
+    def classify(self, text: str, context: Optional[Dict[str, Any]] = None,
+                 session: Optional[ExtractionSession] = None, doc: Optional[Doc] = None) -> Dict[str, Any]:
         """
         Classifica o texto e extrai todas as informações educacionais
         
+        Args:
+            text: texto livre do professor
+            context: campos já confirmados pelo usuário; as chaves "curriculo"
+                (ex: "bncc") e "modo" (fast, balanced, exhaustive) controlam a
+                execução e não são copiadas para extracted
+            session: sessão incremental; estágios cujas entradas não mudaram
+                desde a última chamada reutilizam o resultado anterior
+            doc: text já processado (ex: por nlp.pipe); ignorado se a
+                correção ortográfica ou o pré-filtro mudarem o texto
+        
         Returns:
             Dict com extracted, confidence, suggestions, missing_fields
         """
@@ -37,7 +215,23 @@ class NLPPipeline:
         print(f"DEBUG: Processando texto: '{text}'")
         print(f"{'='*60}\n")
         
+        curriculo = self.curricula.resolve((context or {}).get("curriculo"))
+        bncc_matcher = self.get_bncc_matcher(curriculo)
+        mode = get_mode((context or {}).get("modo"))
+        
+        text = self._prepare_text(text, curriculo, mode, session)
+
         text_lower = text.lower()
+        # Parse único compartilhado pelos matchers de frase e pelos tópicos livres. Fica
+        # com a caixa original: NER e tagger dependem dela ("Getúlio Vargas"); os
+        # PhraseMatchers casam pela forma sem acento e minúscula (fold_doc)
+        if doc is None or doc.text != text:
+            doc = self._parse(session, text, mode)
+        # Assinatura BNCC: só muda quando muda algum termo que existe na BNCC
+        bncc_key = None
+        if session is not None:
+            bncc_key = self._run_stage(session, "bncc_signature", (curriculo, mode["name"], text_lower),
+                                       lambda: (curriculo, mode["name"], bncc_matcher.query_signature(text)))
         
         extracted = {}
         confidence = {}
@@ -46,21 +240,28 @@ class NLPPipeline:
         # Usar contexto se fornecido
         if context:
             for key, value in context.items():
-                if value:
+                if value and key not in CONTROL_KEYS:
                     extracted[key] = value
                     confidence[key] = 1.0
         
         # 🌍 BUSCA GLOBAL PRIMEIRO - tenta encontrar tudo de uma vez
         # Isso é especialmente útil para textos curtos como "Vargas", "Era Vargas", etc.
-        if len(text.split()) <= 5:  # Textos curtos (até 5 palavras)
+        # Com disciplina e ano já no contexto, a busca por campo (restrita a eles) basta
+        if len(text.split()) <= 5 and not ("disciplina" in extracted and "ano" in extracted):  # Textos curtos (até 5 palavras)
             print(f"\n🎯 Texto curto detectado - tentando busca global na BNCC...")
-            global_result = self.bncc_matcher.search_global(text)
+            global_result = self._run_stage(session, "global", bncc_key,
+                                            lambda: bncc_matcher.search_global(text, mode))
+            if global_result and any(extracted.get(f, global_result[f]) != global_result[f] for f in ('disciplina', 'ano')):
+                print(f"   ⚠️  Busca global contradiz o contexto - ignorada")
+                global_result = None
             if global_result:
-                # Extrair tudo que foi encontrado
+                # Extrair tudo que foi encontrado (sem sobrescrever o contexto)
                 for field in ['disciplina', 'ano', 'unidadeTematica', 'objetoConhecimento', 'habilidade']:
-                    if field in global_result and global_result[field]:
+                    if field in global_result and global_result[field] and field not in extracted:
                         extracted[field] = global_result[field]
                         confidence[field] = global_result['confidence'][field]
+                        self._add_alternatives(suggestions, field,
+                                               global_result['candidates'].get(field, [])[:SUGGESTIONS_TOP_K])
                         print(f"   ✅ {field}: {str(global_result[field])[:60]}... (conf: {global_result['confidence'][field]:.2f})")
                 
                 # Se encontrou tudo na BNCC, pular extração individual
@@ -74,7 +275,10 @@ class NLPPipeline:
         
         # Extrair disciplina com PhraseMatcher
         if "disciplina" not in extracted:
-            disc_result = self.disciplinas_matcher.match(text_lower)
+            disc_ranked = self._run_stage(session, "disciplina", text_lower,
+                                          lambda: self.disciplinas_matcher.rank(doc, SUGGESTIONS_TOP_K))
+            self._add_alternatives(suggestions, "disciplina", disc_ranked)
+            disc_result = disc_ranked[0] if disc_ranked else None
             if disc_result:
                 extracted["disciplina"] = disc_result[0]
                 confidence["disciplina"] = disc_result[1]
@@ -84,7 +288,8 @@ class NLPPipeline:
         
         # Extrair ano escolar (regex) - usar texto original para preservar números
         if "ano" not in extracted:
-            ano_result = self._extract_ano(text)  # Usar texto original, não lowercase
+            ano_result = self._run_stage(session, "ano", text,
+                                         lambda: self._extract_ano(text))  # Usar texto original, não lowercase
             if ano_result:
                 extracted["ano"] = ano_result["value"]
                 confidence["ano"] = ano_result["confidence"]
@@ -94,7 +299,11 @@ class NLPPipeline:
         
         # Extrair nível Bloom com PhraseMatcher
         if "nivelBloom" not in extracted:
-            bloom_result = self.bloom_matcher.match(text_lower)
+            # Lemas e morfologia dependem da caixa: chave é o texto original
+            bloom_ranked = self._run_stage(session, "nivelBloom", text,
+                                           lambda: self.bloom_matcher.rank(doc, SUGGESTIONS_TOP_K))
+            self._add_alternatives(suggestions, "nivelBloom", bloom_ranked)
+            bloom_result = bloom_ranked[0] if bloom_ranked else None
             if bloom_result:
                 extracted["nivelBloom"] = bloom_result[0]
                 confidence["nivelBloom"] = bloom_result[1]
@@ -104,7 +313,10 @@ class NLPPipeline:
         
         # Extrair tipo de questão (keyword matching)
         if "tipoQuestao" not in extracted:
-            tipo_q = self._extract_by_keywords(text_lower, TIPOS_QUESTAO_MAP)
+            tipo_q_ranked = self._rank_by_keywords(text_lower, self.tables["TIPOS_QUESTAO_MAP"], SUGGESTIONS_TOP_K)
+            self._add_alternatives(suggestions, "tipoQuestao",
+                                   [(c["value"], c["confidence"]) for c in tipo_q_ranked])
+            tipo_q = tipo_q_ranked[0] if tipo_q_ranked else None
             if tipo_q:
                 extracted["tipoQuestao"] = tipo_q["value"]
                 confidence["tipoQuestao"] = tipo_q["confidence"]
@@ -114,7 +326,10 @@ class NLPPipeline:
         
         # Extrair tipo de texto base
         if "tipoTextoBase" not in extracted:
-            tipo_t = self._extract_by_keywords(text_lower, TIPOS_TEXTO_BASE_MAP)
+            tipo_t_ranked = self._rank_by_keywords(text_lower, self.tables["TIPOS_TEXTO_BASE_MAP"], SUGGESTIONS_TOP_K)
+            self._add_alternatives(suggestions, "tipoTextoBase",
+                                   [(c["value"], c["confidence"]) for c in tipo_t_ranked])
+            tipo_t = tipo_t_ranked[0] if tipo_t_ranked else None
             if tipo_t:
                 extracted["tipoTextoBase"] = tipo_t["value"]
                 confidence["tipoTextoBase"] = tipo_t["confidence"]
@@ -124,7 +339,10 @@ class NLPPipeline:
         
         # Extrair perfil do aluno
         if "perfilAluno" not in extracted:
-            perfil = self._extract_by_keywords(text_lower, PERFIS_ALUNO_MAP)
+            perfil_ranked = self._rank_by_keywords(text_lower, self.tables["PERFIS_ALUNO_MAP"], SUGGESTIONS_TOP_K)
+            self._add_alternatives(suggestions, "perfilAluno",
+                                   [(c["value"], c["confidence"]) for c in perfil_ranked])
+            perfil = perfil_ranked[0] if perfil_ranked else None
             if perfil:
                 extracted["perfilAluno"] = perfil["value"]
                 confidence["perfilAluno"] = perfil["confidence"]
@@ -132,8 +350,159 @@ class NLPPipeline:
             else:
                 print("❌ Perfil Aluno não encontrado")
         
+        # Unidade, objeto e habilidade da BNCC (ou tópicos livres)
+        self._extract_bncc_fields(text, extracted, confidence, suggestions, bncc_matcher, bncc_key, mode,
+                                  session, doc)
+        
+        # Aplicar defaults inteligentes
+        self._apply_smart_defaults(extracted, confidence, text_lower)
+        
+        print(f"\n{'='*60}")
+        print(f"📊 RESULTADO FINAL:")
+        print(f"{'='*60}")
+        for field, value in extracted.items():
+            conf = confidence.get(field, 0)
+            value_display = value if len(str(value)) < 50 else str(value)[:50] + "..."
+            print(f"  {field}: {value_display} (conf: {conf:.2f})")
+        print(f"\n❌ Campos faltantes: {missing_fields if 'missing_fields' in locals() else 'calculando...'}")
+        print(f"{'='*60}\n")
+        
+        missing_fields = self._missing_fields(extracted, confidence)
+        
+        return {
+            "extracted": extracted,
+            "confidence": confidence,
+            "suggestions": suggestions,
+            "missing_fields": missing_fields
+        }
+    
+    def refine(self, text: str, previous: Dict[str, Any], changed: Dict[str, Any],
+               context: Optional[Dict[str, Any]] = None,
+               session: Optional[ExtractionSession] = None) -> Dict[str, Any]:
+        """
+        Reextração incremental depois que o usuário confirma ou troca um campo
+        
+        Parte do resultado anterior e recalcula só os campos depois do primeiro
+        campo alterado na cadeia disciplina -> ano -> unidadeTematica ->
+        objetoConhecimento -> habilidade (e os defaults que dependem de
+        disciplina/ano). Os demais campos e sugestões são mantidos.
+        
+        Args:
+            text: o mesmo texto da extração anterior
+            previous: resultado anterior (extracted, confidence, suggestions)
+            changed: campos confirmados/alterados agora (confiança 1.0)
+            context: campos confirmados antes e chaves de controle (curriculo, modo)
+            session: sessão com os artefatos do texto (correção, assinatura BNCC,
+                resultados por estágio) de chamadas anteriores
+        
+        Returns:
+            Dict com extracted, confidence, suggestions, missing_fields
+        """
+        context = context or {}
+        print(f"\n🔁 Refinando '{text[:60]}' com {changed}")
+        
+        curriculo = self.curricula.resolve(context.get("curriculo"))
+        bncc_matcher = self.get_bncc_matcher(curriculo)
+        mode = get_mode(context.get("modo"))
+        text = self._prepare_text(text, curriculo, mode, session)
+        text_lower = text.lower()
+        
+        previous_extracted = previous.get("extracted") or {}
+        extracted = dict(previous_extracted)
+        confidence = dict(previous.get("confidence") or {})
+        confirmed = {
+            key: value for key, value in {**context, **changed}.items()
+            if value and key not in CONTROL_KEYS
+        }
+        
+        # Campos a recalcular: tudo depois do primeiro campo alterado na cadeia
+        # (confirmar o valor que já estava só sobe a confiança)
+        modified = {field for field, value in changed.items() if previous_extracted.get(field) != value}
+        positions = [BNCC_CHAIN.index(field) for field in modified if field in BNCC_CHAIN]
+        stale = set(BNCC_CHAIN[min(positions) + 1:]) if positions else set()
+        if {"disciplina", "ano"} & (stale | modified):
+            # Defaults que vieram da disciplina/ano anteriores
+            defaults, default_confidence = {
+                field: previous_extracted[field] for field in ("disciplina", "ano") if field in previous_extracted
+            }, {}
+            self._apply_smart_defaults(defaults, default_confidence, text_lower)
+            stale.update(
+                field for field in ("perfilAluno", "tipoTextoBase")
+                if field in default_confidence and previous_extracted.get(field) == defaults[field]
+                and confidence.get(field) == default_confidence[field]
+            )
+        # Campo limpo pelo usuário: fica vazio (não é reextraído do texto nem preenchido por default)
+        cleared = {field for field, value in changed.items() if not value and field not in CONTROL_KEYS}
+        stale -= set(confirmed) | cleared
+        
+        for field in stale | cleared:
+            extracted.pop(field, None)
+            confidence.pop(field, None)
+        for field, value in confirmed.items():
+            extracted[field] = value
+            confidence[field] = 1.0
+        suggestions = [
+            suggestion for suggestion in previous.get("suggestions") or []
+            if suggestion.get("field") not in stale | cleared | set(confirmed)
+        ]
+        print(f"   ♻️  Recalculando: {sorted(stale) or 'nada'}")
+        
+        if "ano" in stale:
+            ano_result = self._run_stage(session, "ano", text, lambda: self._extract_ano(text))
+            if ano_result:
+                extracted["ano"] = ano_result["value"]
+                confidence["ano"] = ano_result["confidence"]
+        
+        bncc_key = None
+        if session is not None:
+            bncc_key = self._run_stage(session, "bncc_signature", (curriculo, mode["name"], text_lower),
+                                       lambda: (curriculo, mode["name"], bncc_matcher.query_signature(text)))
+        self._extract_bncc_fields(text, extracted, confidence, suggestions, bncc_matcher, bncc_key, mode, session,
+                                  blocked=cleared)
+        self._apply_smart_defaults(extracted, confidence, text_lower)
+        for field in cleared:
+            extracted.pop(field, None)
+            confidence.pop(field, None)
+        
+        return {
+            "extracted": extracted,
+            "confidence": confidence,
+            "suggestions": suggestions,
+            "missing_fields": self._missing_fields(extracted, confidence)
+        }
+    
+    def _prepare_text(self, text: str, curriculo: str, mode: Dict[str, Any],
+                      session: Optional[ExtractionSession] = None) -> str:
+        """Limite de tamanho, seleção das frases informativas e correção ortográfica"""
+        if len(text) > MAX_TEXT_LENGTH:
+            raise ValueError(f"Texto muito longo ({len(text)} caracteres). Máximo: {MAX_TEXT_LENGTH}")
+        budget = mode.get("text_budget", TEXT_BUDGET)
+        if len(text) > budget:
+            # Texto colado (vários parágrafos): manter só as frases com mais termos conhecidos
+            text = self._run_stage(session, "informative", (curriculo, budget, text),
+                                   lambda: self._select_informative(text, curriculo, budget))
+            print(f"✂️  Texto longo reduzido para {len(text)} caracteres")
+        
+        # Correção ortográfica barata (trigramas) antes dos matchers exatos
+        text, corrections = self._run_stage(
+            session, "spelling", (curriculo, text),
+            lambda: self._get_spelling_corrector(curriculo).correct(text))
+        if corrections:
+            print(f"✏️  Correções ortográficas: {corrections}")
+        return text
+    
+    def _extract_bncc_fields(self, text: str, extracted: Dict, confidence: Dict, suggestions: List[Dict],
+                             bncc_matcher: BNCCMatcher, bncc_key, mode: Dict[str, Any],
+                             session: Optional[ExtractionSession] = None, doc: Optional[Doc] = None,
+                             blocked: Iterable[str] = ()):
+        """
+        Preenche unidadeTematica, objetoConhecimento e habilidade que faltam em
+        extracted (cadeia da BNCC); doc é o text já processado, se houver.
+        Campos em blocked (limpos pelo usuário) ficam vazios.
+        """
+        blocked = set(blocked)
         # Extrair Unidade Temática da BNCC (ou tópicos livres)
-        if "unidadeTematica" not in extracted:
+        if "unidadeTematica" not in extracted and "unidadeTematica" not in blocked:
             disciplina = extracted.get("disciplina")
             ano = extracted.get("ano")
             
@@ -143,21 +512,31 @@ class NLPPipeline:
             # Se não tem ano mas tem disciplina, tentar buscar em todos os anos
             if disciplina and not ano:
                 print(f"   ⚙️  Chamando match_unidade_any_year('{text}', '{disciplina}')...")
-                unidade_result = self.bncc_matcher.match_unidade_any_year(text, disciplina)
+                # Só busca semântica: depende do texto inteiro, não da assinatura
+                unidade_ranked = self._run_stage(
+                    session, "unidade_any_year", (bncc_key, text, disciplina),
+                    lambda: bncc_matcher.rank_unidade_any_year(text, disciplina, mode, SUGGESTIONS_TOP_K))
+                self._add_alternatives(suggestions, "unidadeTematica", unidade_ranked)
+                unidade_result = unidade_ranked[0] if unidade_ranked else None
                 print(f"   ⚙️  Resultado: {unidade_result}")
                 if unidade_result:
                     extracted["unidadeTematica"] = unidade_result[0]
                     confidence["unidadeTematica"] = unidade_result[1]
                     # Se encontrou unidade, tentar inferir o ano
-                    ano_inferido = self.bncc_matcher.get_ano_from_unidade(disciplina, unidade_result[0])
-                    if ano_inferido and "ano" not in extracted:
+                    ano_inferido = bncc_matcher.get_ano_from_unidade(disciplina, unidade_result[0])
+                    if ano_inferido and "ano" not in extracted and "ano" not in blocked:
                         extracted["ano"] = ano_inferido
                         confidence["ano"] = 0.75
                         print(f"✅ Ano inferido: {ano_inferido} (confiança: 0.75)")
                     print(f"✅ Unidade Temática (BNCC): {unidade_result[0]} (confiança: {unidade_result[1]:.2f})")
             # Primeiro tentar na BNCC com ano específico
             elif disciplina and ano:
-                unidade_result = self.bncc_matcher.match_unidade_tematica(text, disciplina, ano)
+                unidade_ranked = self._run_bncc_stage(
+                    session, "unidadeTematica", bncc_key, text, (disciplina, ano), mode,
+                    lambda stage_mode: bncc_matcher.rank_unidade_tematica(text, disciplina, ano, stage_mode,
+                                                                          SUGGESTIONS_TOP_K))
+                self._add_alternatives(suggestions, "unidadeTematica", unidade_ranked)
+                unidade_result = unidade_ranked[0] if unidade_ranked else None
                 if unidade_result:
                     extracted["unidadeTematica"] = unidade_result[0]
                     confidence["unidadeTematica"] = unidade_result[1]
@@ -170,7 +549,7 @@ class NLPPipeline:
                 print("⚠️  Unidade Temática: precisa de disciplina primeiro")
         
         # Extrair Objeto de Conhecimento
-        if "objetoConhecimento" not in extracted:
+        if "objetoConhecimento" not in extracted and "objetoConhecimento" not in blocked:
             disciplina = extracted.get("disciplina")
             ano = extracted.get("ano")
             unidade = extracted.get("unidadeTematica")
@@ -179,7 +558,12 @@ class NLPPipeline:
             print(f"   Disciplina: {disciplina}, Ano: {ano}, Unidade: {unidade}")
             
             if disciplina and ano:
-                objeto_result = self.bncc_matcher.match_objeto_conhecimento(text, disciplina, ano, unidade)
+                objeto_ranked = self._run_bncc_stage(
+                    session, "objetoConhecimento", bncc_key, text, (disciplina, ano, unidade), mode,
+                    lambda stage_mode: bncc_matcher.rank_objeto_conhecimento(text, disciplina, ano, unidade,
+                                                                             stage_mode, SUGGESTIONS_TOP_K))
+                self._add_alternatives(suggestions, "objetoConhecimento", objeto_ranked)
+                objeto_result = objeto_ranked[0] if objeto_ranked else None
                 if objeto_result:
                     extracted["objetoConhecimento"] = objeto_result[0]
                     confidence["objetoConhecimento"] = objeto_result[1]
@@ -190,7 +574,7 @@ class NLPPipeline:
                 print("⚠️  Objeto Conhecimento: precisa de disciplina e ano primeiro")
         
         # Extrair Habilidade
-        if "habilidade" not in extracted:
+        if "habilidade" not in extracted and "habilidade" not in blocked:
             disciplina = extracted.get("disciplina")
             ano = extracted.get("ano")
             unidade = extracted.get("unidadeTematica")
@@ -201,7 +585,10 @@ class NLPPipeline:
             print(f"   Unidade: {unidade}, Objeto: {objeto}")
             
             if all([disciplina, ano, unidade, objeto]):
-                habilidade_result = self.bncc_matcher.match_habilidade(text, disciplina, ano, unidade, objeto)
+                habilidade_ranked = bncc_matcher.rank_habilidade(text, disciplina, ano, unidade, objeto,
+                                                                 SUGGESTIONS_TOP_K)
+                self._add_alternatives(suggestions, "habilidade", habilidade_ranked)
+                habilidade_result = habilidade_ranked[0] if habilidade_ranked else None
                 if habilidade_result:
                     extracted["habilidade"] = habilidade_result[0]
                     confidence["habilidade"] = habilidade_result[1]
@@ -209,7 +596,7 @@ class NLPPipeline:
                 else:
                     # Se não encontrou na BNCC, buscar em qualquer ano da mesma disciplina
                     print("   Buscando habilidade em outros anos...")
-                    habilidade_any = self.bncc_matcher.match_habilidade_any_year(text, disciplina, unidade, objeto)
+                    habilidade_any = bncc_matcher.match_habilidade_any_year(text, disciplina, unidade, objeto)
                     if habilidade_any:
                         extracted["habilidade"] = habilidade_any[0]
                         confidence["habilidade"] = habilidade_any[1]
@@ -224,28 +611,22 @@ class NLPPipeline:
                 print("⚠️  Habilidade: precisa de disciplina, ano, unidade e objeto primeiro")
         
         # Extrair tópicos livres como sugestões (fallback se não encontrou na BNCC)
-        if "unidadeTematica" not in extracted:
-            topicos = self._extract_free_topics(text)
+        # Só quando a unidade ficou vazia; o parse só acontece aqui se ninguém o fez antes (refine)
+        if "unidadeTematica" not in extracted and "unidadeTematica" not in blocked and mode["free_topics"]:
+            topicos = self._run_stage(
+                session, "free_topics", (bncc_key, text),
+                lambda: self._extract_free_topics(
+                    doc if doc is not None else self._parse(session, text, mode),
+                    bncc_matcher))
             if topicos:
                 suggestions.append({
                     "field": "unidadeTematica",
                     "values": topicos,
                     "message": "Tópicos identificados no texto (não encontrados na BNCC)"
                 })
-        
-        # Aplicar defaults inteligentes
-        self._apply_smart_defaults(extracted, confidence, text_lower)
-        
-        print(f"\n{'='*60}")
-        print(f"📊 RESULTADO FINAL:")
-        print(f"{'='*60}")
-        for field, value in extracted.items():
-            conf = confidence.get(field, 0)
-            value_display = value if len(str(value)) < 50 else str(value)[:50] + "..."
-            print(f"  {field}: {value_display} (conf: {conf:.2f})")
-        print(f"\n❌ Campos faltantes: {missing_fields if 'missing_fields' in locals() else 'calculando...'}")
-        print(f"{'='*60}\n")
-        
+    
+    def _missing_fields(self, extracted: Dict, confidence: Dict) -> List[str]:
+        """Campos ausentes ou com confiança baixa"""
         # Identificar campos faltantes (TODOS os 10 campos)
         all_fields = [
             "disciplina", "ano", "perfilAluno",
@@ -256,17 +637,116 @@ class NLPPipeline:
             field for field in all_fields
             if field not in extracted or confidence.get(field, 0) < 0.5
         ]
+        return missing_fields
+    
+    def _get_spelling_corrector(self, curriculo: str) -> SpellingCorrector:
+        """Corretor construído (uma vez por currículo) sobre o vocabulário dos matchers"""
+        if curriculo not in self._spelling_correctors:
+            bncc_matcher = self.get_bncc_matcher(curriculo)
+            
+            keyword_tables = [
+                self.disciplinas_matcher.patterns, self.bloom_matcher.patterns,
+                self.tables["TIPOS_QUESTAO_MAP"], self.tables["TIPOS_TEXTO_BASE_MAP"],
+                self.tables["PERFIS_ALUNO_MAP"]
+            ]
+            targets = set(bncc_matcher.objeto_terms)
+            for table in keyword_tables:
+                for keywords in table.values():
+                    for keyword in keywords:
+                        targets.update(WORD_RE.findall(keyword.lower()))
+            for key in self.tables["SYNONYMS_MAP"]:
+                targets.update(WORD_RE.findall(key))
+            
+            # Palavras do texto da BNCC já estão corretas: nunca corrigir
+            known = set()
+            for texto in bncc_matcher.iter_texts():
+                known.update(WORD_RE.findall(texto.lower()))
+            
+            is_word = None
+            if self.vectors is not None:
+                is_word = lambda w: self.vectors.get(w) is not None
+            elif len(self.nlp.vocab.vectors):
+                is_word = self.nlp.vocab.has_vector
+            
+            self._spelling_correctors[curriculo] = SpellingCorrector(targets, known, is_word)
+        return self._spelling_correctors[curriculo]
+    
+    def _select_informative(self, text: str, curriculo: str, budget: int = None) -> str:
+        """
+        Escolhe as frases com maior densidade de termos do vocabulário dos
+        matchers (o mesmo do corretor ortográfico) até caber no orçamento,
+        mantendo a ordem original.
+        """
+        budget = budget or TEXT_BUDGET
+        vocabulary = self._get_spelling_corrector(curriculo).index.terms
+        # Frases repetidas contam uma vez
+        sentences = list(dict.fromkeys(s.strip() for s in SENTENCE_RE.split(text) if s and s.strip()))
         
-        return {
-            "extracted": extracted,
-            "confidence": confidence,
-            "suggestions": suggestions,
-            "missing_fields": missing_fields
-        }
+        scored = []
+        for position, sentence in enumerate(sentences):
+            words = WORD_RE.findall(normalize_text(sentence))
+            if not words:
+                continue
+            hits = sum(1 for w in words if w in vocabulary)
+            score = hits / len(words) + (1.0 if ANO_HINT_RE.search(sentence) else 0.0)
+            if score:
+                scored.append((score, hits, -position, sentence))
+        
+        scored.sort(reverse=True)
+        chosen, used = [], 0
+        for score, hits, neg_position, sentence in scored:
+            if used + len(sentence) > budget:
+                continue
+            chosen.append((-neg_position, sentence))
+            used += len(sentence) + 1
+        
+        if not chosen:
+            # Nenhuma frase cabe (ou nenhuma tem termo conhecido): início da melhor
+            best = scored[0][3] if scored else text
+            return best[:budget]
+        return " ".join(sentence for _, sentence in sorted(chosen))
+    
+    def _parse(self, session: Optional[ExtractionSession], text: str, mode: Dict[str, Any]) -> Doc:
+        """
+        Estágio "doc": o text pelo spaCy. Sem tópicos livres (modo fast) o parser
+        e o NER não rodam; a chave inclui isso para a sessão não reaproveitar um
+        Doc sem entidades num modo que precisa delas
+        """
+        if mode["free_topics"]:
+            return self._run_stage(session, "doc", (text, True), lambda: self.nlp(text))
+        disable = [name for name in FREE_TOPIC_PIPES if name in self.nlp.pipe_names]
+        return self._run_stage(session, "doc", (text, False), lambda: self.nlp(text, disable=disable))
+    
+    def _run_stage(self, session: Optional[ExtractionSession], name: str, key, fn):
+        """Executa um estágio, reaproveitando o resultado da sessão se as entradas não mudaram"""
+        start = time.perf_counter()
+        try:
+            if session is None:
+                return fn()
+            return session.run_stage(name, key, fn)
+        finally:
+            record_stage(name, time.perf_counter() - start)
+    
+    def _run_bncc_stage(self, session: Optional[ExtractionSession], name: str, bncc_key, text: str,
+                        inputs: tuple, mode: Dict[str, Any], fn):
+        """
+        Estágio da BNCC em duas partes: a busca por termos-chave (fn com o modo sem
+        fallback semântico) é reaproveitada enquanto a assinatura BNCC não muda; o
+        fallback semântico usa o texto inteiro, então só é reaproveitado para o
+        mesmo texto. fn recebe o modo a usar.
+        """
+        if session is None:
+            return fn(mode)
+        result = self._run_stage(session, name, (bncc_key, inputs),
+                                 lambda: fn({**mode, "semantic_fallback": False}))
+        if not result and mode["semantic_fallback"]:
+            result = self._run_stage(session, f"{name}_semantico", (bncc_key, text, inputs),
+                                     lambda: fn(mode))
+        return result
     
     def _extract_ano(self, text: str) -> Optional[Dict[str, Any]]:
         """Extrai ano escolar usando regex"""
-        for ano, patterns in ANOS_MAP.items():
+        for ano, patterns in self.tables["ANOS_MAP"].items():
             for pattern in patterns:
                 match = re.search(pattern, text, re.IGNORECASE)
                 if match:
@@ -275,13 +755,45 @@ class NLPPipeline:
         print(f"DEBUG: Nenhum ano encontrado em '{text}'")
         return None
     
+    def _fold_keywords(self, mapping: Dict) -> Dict[str, List[str]]:
+        """Versão sem acentos (e sem duplicatas) de uma tabela de keywords, calculada uma vez"""
+        key = id(mapping)
+        if key not in self._folded_tables:
+            self._folded_tables[key] = {
+                category: list(dict.fromkeys(normalize_text(kw) for kw in keywords))
+                for category, keywords in mapping.items()
+            }
+        return self._folded_tables[key]
+    
+    def _add_alternatives(self, suggestions: List[Dict], field: str, ranked: List[tuple]):
+        """
+        Registra em suggestions os candidatos de um campo quando há mais de um,
+        na ordem do matcher (a mesma que escolheu o vencedor - no Bloom, por tipo
+        de match antes da confiança)
+        """
+        if len(ranked) < 2:
+            return
+        suggestions.append({
+            "field": field,
+            "values": [value for value, _ in ranked],
+            "candidates": [{"value": value, "confidence": round(conf, 2)} for value, conf in ranked],
+            "message": "Outras opções encontradas no texto (em ordem de preferência; a primeira é a escolhida)"
+        })
+    
     def _extract_by_keywords(self, text: str, mapping: Dict) -> Optional[Dict[str, Any]]:
-        """Extração genérica por keywords"""
-        best_match = None
-        best_confidence = 0.0
-        best_length = 0
+        """Extração genérica por keywords (ignora acentos no texto e nas keywords)"""
+        ranked = self._rank_by_keywords(text, mapping, top_k=1)
+        return ranked[0] if ranked else None
+    
+    def _rank_by_keywords(self, text: str, mapping: Dict, top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Categorias cujas keywords aparecem no texto, da maior para a menor confiança
+        (empate: keyword mais longa). Uma entrada por categoria.
+        """
+        best = {}  # categoria -> (confiança, tamanho)
+        text = normalize_text(text)
         
-        for category, keywords in mapping.items():
+        for category, keywords in self._fold_keywords(mapping).items():
             for keyword in keywords:
                 if keyword in text:
                     length = len(keyword)
@@ -291,64 +803,61 @@ class NLPPipeline:
                     if f" {keyword} " in f" {text} ":
                         confidence = min(0.98, confidence + 0.1)
                     
-                    if confidence > best_confidence or (confidence == best_confidence and length > best_length):
-                        best_confidence = confidence
-                        best_match = category
-                        best_length = length
+                    if category not in best or (confidence, length) > best[category]:
+                        best[category] = (confidence, length)
         
-        if best_match:
-            return {"value": best_match, "confidence": best_confidence}
-        return None
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+        return [{"value": category, "confidence": conf} for category, (conf, _) in ranked[:top_k]]
     
-    def _extract_free_topics(self, text: str) -> list:
-        """Extrai tópicos livres usando NER e noun chunks"""
-        doc = self.nlp(text)
-        topics = set()
-        
-        # Palavras que NÃO devem ser consideradas tópicos (tipos de questão, texto base, etc.)
-        blacklist = {
-            'documento histórico', 'documento historico', 'texto literário', 'texto literario',
-            'artigo jornal', 'charge', 'gráfico', 'grafico', 'tabela', 'imagem', 'mapa',
-            'múltipla escolha', 'multipla escolha', 'dissertativa', 'verdadeiro falso',
-            'análise', 'analise', 'síntese', 'sintese', 'aplicação', 'aplicacao',
-            'conhecimento', 'compreensão', 'compreensao', 'avaliação', 'avaliacao'
-        }
+    def _extract_free_topics(self, doc: Doc, bncc_matcher: BNCCMatcher) -> list:
+        """
+        Extrai tópicos livres (entidades, noun chunks ou nomes próprios) do Doc
+        compartilhado, ordenados pela sobreposição com os termos dos objetos da BNCC
+        """
+        # Tokens cobertos pela blacklist (um passe do matcher no Doc inteiro)
+        fold_doc(doc)
+        blocked = {i for _, start, end in self.topic_blacklist(doc) for i in range(start, end)}
+        
+        def allowed(span) -> bool:
+            return (not any(i in blocked for i in range(span.start, span.end)) and
+                    not ANO_TOPIC_RE.match(span.text.lower()))
+        
+        topics = {}
         
         # Entidades nomeadas
         for ent in doc.ents:
-            if ent.label_ in ["PER", "ORG", "LOC", "EVENT", "MISC"]:
-                ent_lower = ent.text.lower()
-                # Filtrar entidades que são anos, tipos de questão ou texto base
-                if (not re.match(r'^\d+[º°]?\s*ano', ent_lower) and
-                    not any(bl in ent_lower for bl in blacklist)):
-                    topics.add(ent.text.title())
-        
-        # Noun chunks relevantes (2+ palavras)
-        for chunk in doc.noun_chunks:
+            if ent.label_ in ["PER", "ORG", "LOC", "EVENT", "MISC"] and allowed(ent):
+                topics.setdefault(ent.text.title())
+        
+        # Noun chunks relevantes (2+ palavras) - exigem o parser (ausente no modo "vectors")
+        noun_chunks = doc.noun_chunks if doc.has_annotation("DEP") else []
+        for chunk in noun_chunks:
             chunk_text = chunk.text.strip()
-            chunk_lower = chunk_text.lower()
             # Filtrar chunks que são anos escolares, tipos de questão ou muito genéricos
-            if (len(chunk_text.split()) >= 2 and 
-                not re.match(r'^\d+[º°]?\s*ano', chunk_lower) and
-                not any(bl in chunk_lower for bl in blacklist) and
-                chunk.root.pos_ == "NOUN" and 
+            if (len(chunk_text.split()) >= 2 and allowed(chunk) and
+                chunk.root.pos_ == "NOUN" and
                 not chunk.root.is_stop):
-                topics.add(chunk_text.title())
+                topics.setdefault(chunk_text.title())
         
         # Se não encontrou nada, tentar extrair substantivos próprios simples
         if not topics:
             for token in doc:
-                token_lower = token.text.lower()
-                if (token.pos_ == "PROPN" and 
-                    not token.is_stop and 
+                if (token.pos_ == "PROPN" and
+                    not token.is_stop and
                     not token.text.isdigit() and
-                    not any(bl in token_lower for bl in blacklist)):
-                    topics.add(token.text.title())
+                    token.i not in blocked):
+                    topics.setdefault(token.text.title())
         
         # Filtrar tópicos vazios ou muito curtos
-        topics = {t for t in topics if len(t.strip()) > 2 and not t.strip().startswith(',')}
+        topics = [t for t in topics if len(t.strip()) > 2 and not t.strip().startswith(',')]
+        
+        # Mais termos em comum com a BNCC primeiro; empate fica na ordem do texto
+        objeto_terms = bncc_matcher.objeto_terms
+        def overlap(topic: str) -> float:
+            weights = get_key_terms(topic, include_weights=True)
+            return sum(weight for term, weight in weights.items() if term in objeto_terms)
         
-        return sorted(list(topics))[:5]
+        return sorted(topics, key=overlap, reverse=True)[:MAX_FREE_TOPICS]
     
     def _apply_smart_defaults(self, extracted: Dict, confidence: Dict, text: str):
         """Aplica defaults inteligentes"""
@@ -0,0 +1,170 @@
+"""
+Ferramentas de profiling para diagnosticar latência em produção
+
+- profile_call: roda uma chamada sob cProfile, grava o .prof e resume o custo
+  por método do BNCCMatcher e o número de chamadas ao spaCy. Um profile por vez
+  no processo (ProfilerBusy se já há outro): no Python 3.12+ o cProfile usa o
+  sys.monitoring, que é global, então o profile inclui o que as outras threads
+  (outras requisições, jobs, aquecimento) executaram no mesmo intervalo
+- StackSampler: amostrador periódico de baixo custo (sys._current_frames) que
+  grava pilhas no formato "collapsed" (flamegraph.pl, speedscope, inferno)
+"""
+import collections
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "data/profiles")
+
+# cProfile é exclusivo por processo no Python 3.12+ ("Another profiling tool is already active")
+_profile_lock = threading.Lock()
+
+# (arquivo termina com, função) que contam como chamada ao spaCy
+SPACY_CALLS = {
+    ("spacy/language.py", "__call__"): "nlp()",
+    ("spacy/language.py", "pipe"): "nlp.pipe()",
+    ("spacy/language.py", "make_doc"): "nlp.make_doc()",
+}
+
+
+def _profile_dir() -> str:
+    path = PROFILE_DIR
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), path)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def summarize(stats: pstats.Stats, top: int = 15) -> Dict[str, Any]:
+    """Resumo do profile: funções mais caras, métodos do BNCCMatcher e chamadas ao spaCy"""
+    bncc = {}
+    spacy_calls = collections.Counter()
+    rows = []
+    for (filename, _, funcname), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        normalized = filename.replace(os.sep, "/")
+        rows.append((cumtime, tottime, ncalls, f"{os.path.basename(filename)}:{funcname}"))
+        if normalized.endswith("matchers/bncc_matcher.py"):
+            bncc[funcname] = {"calls": ncalls, "cumtime": round(cumtime, 4), "tottime": round(tottime, 4)}
+        for (suffix, name), label in SPACY_CALLS.items():
+            if funcname == name and normalized.endswith(suffix):
+                spacy_calls[label] += ncalls
+
+    rows.sort(reverse=True)
+    return {
+        "total_seconds": round(stats.total_tt, 4),
+        "top": [
+            {"function": name, "calls": ncalls, "cumtime": round(cum, 4), "tottime": round(tot, 4)}
+            for cum, tot, ncalls, name in rows[:top]
+        ],
+        "bncc_matcher": dict(sorted(bncc.items(), key=lambda item: item[1]["cumtime"], reverse=True)),
+        "spacy_calls": dict(spacy_calls)
+    }
+
+
+class ProfilerBusy(RuntimeError):
+    """Já há um profile em andamento neste processo"""
+
+
+def profile_call(fn: Callable[[], Any]) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Executa fn sob cProfile e grava o .prof em PROFILE_DIR
+
+    O profile cobre o processo inteiro durante fn (no Python 3.12+ também as
+    outras threads), não só esta chamada.
+
+    Returns:
+        (resultado, resumo com "id" do profile gravado)
+
+    Raises:
+        ProfilerBusy: outro profile em andamento (não espera)
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy("Já há um profile em andamento; tente novamente")
+    try:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            result = fn()
+        finally:
+            profiler.disable()
+    finally:
+        _profile_lock.release()
+
+    profile_id = uuid.uuid4().hex[:12]
+    profiler.dump_stats(os.path.join(_profile_dir(), f"{profile_id}.prof"))
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    summary = summarize(stats)
+    summary["id"] = profile_id
+    return result, summary
+
+
+def profile_path(profile_id: str) -> Optional[str]:
+    """Caminho do .prof gravado (None se não existe ou id inválido)"""
+    if not profile_id.isalnum():
+        return None
+    path = os.path.join(_profile_dir(), f"{profile_id}.prof")
+    return path if os.path.exists(path) else None
+
+
+class StackSampler:
+    """
+    Amostra as pilhas de todas as threads a cada `interval` segundos e grava a
+    contagem no formato collapsed ("a.py:f;b.py:g 42") a cada `flush_interval`
+    """
+
+    def __init__(self, interval: float = 0.05, flush_interval: float = 60.0):
+        self.interval = interval
+        self.flush_interval = flush_interval
+        self._counts: collections.Counter = collections.Counter()
+        self._thread: Optional[threading.Thread] = None
+        self.samples = 0
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def sample(self):
+        """Uma amostra de todas as threads (exceto a do próprio sampler)"""
+        me = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id != me:
+                self._counts[self._collapse(frame)] += 1
+        self.samples += 1
+
+    def flush(self) -> Optional[str]:
+        """Grava as pilhas acumuladas e zera a contagem"""
+        counts, self._counts = self._counts, collections.Counter()
+        if not counts:
+            return None
+        path = os.path.join(_profile_dir(), f"stacks-{time.strftime('%Y%m%d-%H%M%S')}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in counts.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        def run():
+            next_flush = time.monotonic() + self.flush_interval
+            while True:
+                time.sleep(self.interval)
+                self.sample()
+                if time.monotonic() >= next_flush:
+                    self.flush()
+                    next_flush = time.monotonic() + self.flush_interval
+
+        self._thread = threading.Thread(target=run, name="stack-sampler", daemon=True)
+        self._thread.start()
@@ -0,0 +1,59 @@
+"""
+Sessão de extração incremental (texto digitado aos poucos)
+"""
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class ExtractionSession:
+    """
+    Guarda o estado de uma sessão de digitação: último Doc, resultado e
+    resultados de cada estágio da pipeline junto com as entradas que os geraram.
+
+    A cada edição, NLPPipeline.classify consulta a sessão antes de executar um
+    estágio; se as entradas do estágio não mudaram, o resultado anterior é reutilizado.
+    """
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.text: Optional[str] = None
+        self.context: Optional[Dict[str, Any]] = None
+        self.last_result: Optional[Dict[str, Any]] = None
+        self._stages: Dict[str, tuple] = {}
+        self.stats = {"updates": 0, "stages_run": 0, "stages_reused": 0}
+
+    @property
+    def doc(self):
+        """Último Doc processado (texto com a caixa original)"""
+        cached = self._stages.get("doc")
+        return cached[1] if cached else None
+
+    def run_stage(self, name: str, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Executa o estágio apenas se a chave de entrada mudou desde a última edição"""
+        cached = self._stages.get(name)
+        if cached is not None and cached[0] == key:
+            self.stats["stages_reused"] += 1
+            return cached[1]
+
+        result = fn()
+        self._stages[name] = (key, result)
+        self.stats["stages_run"] += 1
+        return result
+
+    def update(self, text: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Processa uma nova versão do texto reaproveitando o que não mudou"""
+        self.stats["updates"] += 1
+
+        if text == self.text and context == self.context and self.last_result is not None:
+            return self.last_result
+
+        self.last_result = self.pipeline.classify(text, context, session=self)
+        self.text = text
+        self.context = dict(context) if context else None
+        return self.last_result
+
+    def reset(self):
+        """Descarta todo o estado da sessão"""
+        self.text = None
+        self.context = None
+        self.last_result = None
+        self._stages.clear()
@@ -0,0 +1,80 @@
+"""
+Single-flight: chamadas simultâneas com a mesma chave esperam uma única execução
+
+Quando uma turma de formação envia o mesmo prompt de exemplo no mesmo segundo,
+só a primeira requisição roda a pipeline; as outras recebem uma cópia do
+resultado (ou a mesma exceção). Não é cache: terminada a execução, a próxima
+chamada com a mesma chave roda de novo.
+"""
+import contextlib
+import copy
+import threading
+from typing import Any, Callable, Dict
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalescência de chamadas idênticas em andamento (entre threads)"""
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        # Trabalho interativo que não é coalescido (ex: sessões do WebSocket)
+        self._tracked = 0
+        self._lock = threading.Lock()
+        self.stats = {"executed": 0, "coalesced": 0, "max_waiters": 0}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Executa fn, ou espera a execução em andamento com a mesma chave"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.stats["executed"] += 1
+            else:
+                call.waiters += 1
+                self.stats["coalesced"] += 1
+                self.stats["max_waiters"] = max(self.stats["max_waiters"], call.waiters)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # Cópia: quem recebe pode alterar o resultado sem afetar os outros
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    @contextlib.contextmanager
+    def track(self):
+        """Conta uma execução não coalescida em in_flight enquanto o bloco roda"""
+        with self._lock:
+            self._tracked += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._tracked -= 1
+
+    def in_flight(self) -> int:
+        return len(self._calls) + self._tracked
+
+    def snapshot(self) -> Dict[str, int]:
+        return {**self.stats, "in_flight": self.in_flight()}
@@ -0,0 +1,132 @@
+"""
+Registro de requisições lentas (corpus de regressão de latência)
+
+- collect_timings / record_stage: tempo por estágio de NLPPipeline.classify,
+  coletado na thread atual só quando alguém pediu (custo zero fora disso)
+- SlowRequestLog: grava em JSONL rotativo as requisições acima de um limite de
+  latência, com texto, contexto, tempos por estágio e resultado. Cada linha tem
+  "id", "text" e "context" como o input de /api/jobs e do batch_classify, então
+  o arquivo pode ser reprocessado direto; scripts/replay_slow.py compara a
+  latência antes/depois de uma mudança.
+"""
+import contextlib
+import logging
+import logging.handlers
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+import orjson
+
+# Limite em ms acima do qual a requisição é gravada (0 desliga)
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+SLOW_LOG_PATH = os.getenv("SLOW_LOG_PATH", "data/slow/slow-requests.jsonl")
+SLOW_LOG_MAX_BYTES = int(os.getenv("SLOW_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+SLOW_LOG_BACKUPS = int(os.getenv("SLOW_LOG_BACKUPS", "5"))
+
+_local = threading.local()
+
+
+@contextlib.contextmanager
+def collect_timings() -> Iterator[Dict[str, float]]:
+    """Coleta {estágio: segundos} dos estágios executados na thread atual"""
+    previous = getattr(_local, "timings", None)
+    timings: Dict[str, float] = {}
+    _local.timings = timings
+    try:
+        yield timings
+    finally:
+        _local.timings = previous
+
+
+def record_stage(name: str, seconds: float):
+    """Soma o tempo do estágio se houver uma coleta ativa nesta thread"""
+    timings = getattr(_local, "timings", None)
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+def timed_call(fn: Callable[[], Any]) -> Tuple[Any, float, Dict[str, float]]:
+    """
+    Executa fn coletando os tempos
+
+    Returns:
+        (resultado, segundos totais, {estágio: segundos})
+    """
+    with collect_timings() as stages:
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+    return result, elapsed, stages
+
+
+def _resolve(path: str) -> str:
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), path)
+    return path
+
+
+def log_files(path: str = SLOW_LOG_PATH) -> list:
+    """Arquivo atual e rotacionados (mais antigo primeiro)"""
+    path = _resolve(path)
+    rotated = []
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        rotated.append(f"{path}.{index}")
+        index += 1
+    files = list(reversed(rotated))
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+class SlowRequestLog:
+    """JSONL rotativo (RotatingFileHandler) com as requisições acima de threshold_ms"""
+
+    def __init__(self, path: str = SLOW_LOG_PATH, threshold_ms: float = SLOW_REQUEST_MS,
+                 max_bytes: int = SLOW_LOG_MAX_BYTES, backups: int = SLOW_LOG_BACKUPS):
+        self.path = _resolve(path)
+        self.threshold_ms = threshold_ms
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        handler = logging.handlers.RotatingFileHandler(
+            self.path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self._logger = logging.getLogger(f"slow_requests.{id(self)}")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._logger.addHandler(handler)
+        self.stats = {"recorded": 0, "slowest_ms": 0.0}
+
+    @classmethod
+    def from_env(cls) -> Optional["SlowRequestLog"]:
+        """Instância configurada por SLOW_REQUEST_MS (None se desligado)"""
+        if SLOW_REQUEST_MS <= 0:
+            return None
+        return cls()
+
+    def record(self, text: str, context: Optional[Dict[str, Any]], seconds: float,
+               stages: Dict[str, float], result: Dict[str, Any]) -> bool:
+        """Grava a requisição se passou do limite"""
+        latency_ms = seconds * 1000
+        if latency_ms < self.threshold_ms:
+            return False
+
+        line = orjson.dumps({
+            "id": uuid.uuid4().hex[:12],
+            "text": text,
+            "context": context,
+            "latency_ms": round(latency_ms, 2),
+            "stages": {name: round(value * 1000, 2) for name, value in stages.items()},
+            "result": result,
+            "captured_at": time.time()
+        }, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+        self._logger.info(line.decode())
+        self.stats["recorded"] += 1
+        self.stats["slowest_ms"] = max(self.stats["slowest_ms"], round(latency_ms, 2))
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "threshold_ms": self.threshold_ms, "path": self.path}
@@ -1,6 +1,10 @@
 """
 Mapeamento de sinônimos e variações para melhorar matching
 """
+import os
+
+# Limite de variações por consulta (cada variação multiplica o custo da busca na BNCC)
+MAX_QUERY_VARIATIONS = int(os.getenv("MAX_QUERY_VARIATIONS", "12"))
 
 # Sinônimos e variações de termos educacionais
 SYNONYMS_MAP = {
@@ -122,32 +126,39 @@ SYNONYMS_MAP = {
 }
 
 
-def expand_query(text: str) -> list:
+def expand_query(text: str, synonyms_map: dict = None, max_variations: int = None) -> list:
     """
     Expande uma consulta com sinônimos de forma inteligente
     
     Args:
         text: texto original
+        synonyms_map: tabela de sinônimos (padrão: SYNONYMS_MAP)
+        max_variations: máximo de itens retornados, texto original incluído
+            (padrão: MAX_QUERY_VARIATIONS)
         
     Returns:
-        lista com texto original + variações (ordenadas por relevância)
+        lista com texto original + variações (ordenadas por relevância); se
+        passar do limite, ficam as que mais acrescentam termos (ver rank_variations)
     """
+    if synonyms_map is None:
+        synonyms_map = SYNONYMS_MAP
+    
     text_lower = text.lower()
     variations = [text_lower]
     
     # Buscar sinônimos - procurar por matches mais longos primeiro
     # Isso evita que "vargas" substitua "era vargas" incorretamente
-    sorted_keys = sorted(SYNONYMS_MAP.keys(), key=len, reverse=True)
+    sorted_keys = sorted(synonyms_map.keys(), key=len, reverse=True)
     
     matched_keys = []
     for key in sorted_keys:
         if key in text_lower:
             matched_keys.append(key)
             # Adicionar sinônimos diretos
-            variations.extend(SYNONYMS_MAP[key])
+            variations.extend(synonyms_map[key])
             
             # Substituir no texto original (apenas se não foi substituído antes)
-            for syn in SYNONYMS_MAP[key]:
+            for syn in synonyms_map[key]:
                 # Evitar substituições duplicadas
                 new_text = text_lower.replace(key, syn)
                 if new_text != text_lower:
@@ -161,7 +172,37 @@ def expand_query(text: str) -> list:
             seen.add(v)
             unique_variations.append(v)
     
-    return unique_variations
+    if max_variations is None:
+        max_variations = MAX_QUERY_VARIATIONS
+    return rank_variations(unique_variations, max(1, max_variations))
+
+
+def rank_variations(variations: list, max_variations: int) -> list:
+    """
+    Escolhe até max_variations variações pelo ganho de informação: a cada passo
+    entra a variação cujos termos-chave ainda não cobertos somam mais peso
+    (get_key_terms com pesos). O texto original (primeiro item) sempre fica e a
+    ordem original é mantida, então abaixo do limite nada muda.
+    """
+    if len(variations) <= max_variations:
+        return variations
+    
+    terms = [get_key_terms(v, include_weights=True) for v in variations]
+    covered = set(terms[0])
+    selected = {0}
+    
+    while len(selected) < max_variations:
+        best, best_gain = None, -1.0
+        for i in range(1, len(variations)):
+            if i in selected:
+                continue
+            gain = sum(weight for term, weight in terms[i].items() if term not in covered)
+            if gain > best_gain:
+                best, best_gain = i, gain
+        selected.add(best)
+        covered.update(terms[best])
+    
+    return [variations[i] for i in sorted(selected)]
 
 
 def normalize_term(term: str) -> str:
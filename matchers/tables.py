@@ -0,0 +1,53 @@
+"""
+Tabelas de mapeamento usadas pela pipeline (padrões, sinônimos, anos, tipos...)
+
+Com fresh=True os arquivos .py são executados de novo em módulos isolados, sem
+alterar os módulos já importados - a pipeline em uso continua com as tabelas
+antigas até a nova ser trocada (hot reload).
+"""
+import importlib
+import importlib.util
+import os
+from typing import Any, Dict, List
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# módulo -> (arquivo, tabelas exportadas)
+TABLE_SOURCES = {
+    "educational_mappings": (
+        "educational_mappings.py",
+        ["ANOS_MAP", "TIPOS_QUESTAO_MAP", "TIPOS_TEXTO_BASE_MAP", "PERFIS_ALUNO_MAP"]
+    ),
+    "matchers.synonyms": ("matchers/synonyms.py", ["SYNONYMS_MAP"]),
+    "matchers.disciplinas_matcher": ("matchers/disciplinas_matcher.py", ["DISCIPLINAS_PATTERNS"]),
+    "matchers.bloom_matcher": ("matchers/bloom_matcher.py", ["BLOOM_PATTERNS"]),
+}
+
+
+def table_files() -> List[str]:
+    """Arquivos que definem as tabelas (para detectar mudanças)"""
+    return [os.path.join(BASE_DIR, path) for path, _ in TABLE_SOURCES.values()]
+
+
+def _load_fresh(module_name: str, path: str):
+    """Executa o arquivo em um módulo novo, fora de sys.modules"""
+    spec = importlib.util.spec_from_file_location(f"_fresh_{module_name}", os.path.join(BASE_DIR, path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_tables(fresh: bool = False) -> Dict[str, Any]:
+    """
+    Args:
+        fresh: relê os arquivos do disco em vez de usar os módulos importados
+
+    Returns:
+        dict {nome da tabela: tabela}
+    """
+    tables = {}
+    for module_name, (path, names) in TABLE_SOURCES.items():
+        module = _load_fresh(module_name, path) if fresh else importlib.import_module(module_name)
+        for name in names:
+            tables[name] = getattr(module, name)
+    return tables
@@ -0,0 +1,143 @@
+"""
+Aquecimento na subida do worker (cold start)
+
+Os índices da pipeline são preguiçosos (índices globais e ANN da BNCC, corretor
+ortográfico, catálogo, cache de consultas) e as primeiras chamadas ao spaCy
+alocam memória, então as primeiras requisições de um pod novo são bem mais
+lentas. O aquecimento passa um corpus de prompts pela mesma rota do
+/api/extract (preenchendo os caches) antes de o pod se declarar pronto em
+GET /ready.
+
+O corpus é WARMUP_CORPUS (JSONL com "text" e "context" opcional, como o gold
+set, o input de /api/jobs ou o slow log) ou, se o arquivo não existe, a lista
+WARMUP_PROMPTS. WARMUP_MODES repete o corpus em outros modos da pipeline.
+"""
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from matchers.modes import get_mode
+
+WARMUP = os.getenv("WARMUP", "true").lower() in ("1", "true", "yes")
+WARMUP_CORPUS = os.getenv("WARMUP_CORPUS", "data/eval/gold.jsonl")
+# Modos aquecidos (vazio = só o PIPELINE_MODE)
+WARMUP_MODES = [m.strip() for m in os.getenv("WARMUP_MODES", "").split(",") if m.strip()]
+WARMUP_LIMIT = int(os.getenv("WARMUP_LIMIT", "100"))
+# Tempo máximo (s): passado o limite o pod fica pronto mesmo sem terminar o corpus
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "120"))
+
+# Corpus embutido: uma disciplina por prompt, com e sem ano/tipo de questão
+WARMUP_PROMPTS = [
+    "Questão de matemática 7º ano sobre frações",
+    "Quero uma questão de múltipla escolha de português para o 5º ano sobre interpretação de texto",
+    "Crie uma questão de ciências do 8º ano sobre sistema reprodutor",
+    "Questão dissertativa de história 9º ano sobre era vargas",
+    "Geografia 6º ano, questão sobre relevo e hidrografia",
+    "Questão de inglês para o 7º ano sobre simple past",
+    "Arte 4º ano: questão sobre elementos da linguagem visual",
+    "Educação física 3º ano sobre brincadeiras e jogos",
+    "Ensino religioso 9º ano, questão sobre crenças religiosas e filosofias de vida",
+    "fotossintese",
+    "teorema de pitágoras",
+]
+
+
+def load_corpus(path: str = WARMUP_CORPUS, limit: int = WARMUP_LIMIT) -> List[Dict[str, Any]]:
+    """Registros {"text", "context"} do corpus (WARMUP_PROMPTS se o arquivo não existe)"""
+    if path and not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), path)
+
+    records = []
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict) and record.get("text"):
+                    records.append({"text": record["text"], "context": record.get("context")})
+    else:
+        records = [{"text": text, "context": None} for text in WARMUP_PROMPTS]
+    return records[:limit] if limit > 0 else records
+
+
+class Warmup:
+    """
+    Estado do aquecimento: "pending" -> "running" -> "done" (pronto) ou "failed".
+    Depois de pronto o worker continua pronto nos reaquecimentos (reload).
+    """
+
+    def __init__(self, enabled: bool = WARMUP, modes: Optional[List[str]] = None,
+                 timeout: float = WARMUP_TIMEOUT):
+        # Valida os nomes já na subida (ValueError para modo desconhecido)
+        self.modes = [get_mode(mode)["name"] for mode in (modes or WARMUP_MODES)] or [get_mode()["name"]]
+        self.timeout = timeout
+        # Desligado (WARMUP=false): pronto assim que o modelo carrega
+        self.status = "pending" if enabled else "disabled"
+        self.ready = not enabled
+        self.stats: Dict[str, Any] = {}
+
+    def run(self, classify: Callable[[str, Optional[Dict[str, Any]]], Any],
+            corpus: List[Dict[str, Any]], prepare: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+        """
+        Roda prepare (índices/catálogo), passa o corpus por classify (em cada
+        modo) e marca o worker como pronto
+
+        Erros em prompts individuais são contados e não impedem o aquecimento;
+        um erro em prepare deixa o status "failed".
+        """
+        self.status = "running"
+        default_mode = get_mode()["name"]
+        start = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        prompts = errors = 0
+        slowest = 0.0
+        timed_out = False
+        try:
+            if prepare is not None:
+                prepare()
+            for mode in self.modes:
+                for record in corpus:
+                    if time.monotonic() > deadline:
+                        timed_out = True
+                        break
+                    context = dict(record["context"] or {})
+                    if mode != default_mode:
+                        context["modo"] = mode
+                    t = time.perf_counter()
+                    try:
+                        classify(record["text"], context or None)
+                    except Exception as e:
+                        errors += 1
+                        print(f"⚠️  Aquecimento: {record['text'][:40]!r}: {e}")
+                    slowest = max(slowest, time.perf_counter() - t)
+                    prompts += 1
+                if timed_out:
+                    break
+        except Exception as e:
+            self.status = "failed"
+            self.stats = {"error": str(e)}
+            raise
+
+        duration = time.perf_counter() - start
+        self.stats = {
+            "prompts": prompts,
+            "errors": errors,
+            "modes": self.modes,
+            "seconds": round(duration, 3),
+            "slowest_ms": round(slowest * 1000, 2),
+            "timed_out": timed_out,
+            "finished_at": time.time()
+        }
+        self.status = "done"
+        self.ready = True
+        print(f"🔥 Aquecimento: {prompts} prompts em {duration:.2f}s"
+              + (" (tempo esgotado)" if timed_out else ""))
+        return self.stats
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"status": self.status, "ready": self.ready, **self.stats}
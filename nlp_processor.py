@@ -1,16 +1,68 @@
 import spacy
-from typing import Dict, List, Any, Optional
-from matchers.pipeline import NLPPipeline
+import collections
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
+from matchers.pipeline import NLPPipeline, CONTROL_KEYS, SUGGESTIONS_TOP_K, TEXT_BUDGET
+from matchers.bncc_matcher import ANN_CANDIDATE_THRESHOLD, ANN_N_PROBE, ANN_TOP_K
+from matchers.synonyms import MAX_QUERY_VARIATIONS
+from matchers.modes import get_mode
+from matchers.session import ExtractionSession
+from matchers.tables import load_tables, table_files
+from matchers.compact_vectors import CompactVectors
+from matchers.cache import Cache, CACHE_TTL, create_backend, make_key
+from matchers.singleflight import SingleFlight
+from matchers.profiling import profile_call
+from matchers.slowlog import SlowRequestLog, timed_call
+from matchers.warmup import Warmup, load_corpus
+
+# "full": modelo spaCy completo; "vectors": tokenizador vazio + tabela compacta de vetores
+NLP_MODE = os.getenv("NLP_MODE", "full")
+COMPACT_VECTORS_DIR = os.getenv("COMPACT_VECTORS_DIR", "data/compact-vectors")
+# Tabela de respostas prontas para nomes de unidades/objetos (construída em background)
+ANSWER_TABLE = os.getenv("ANSWER_TABLE", "true").lower() in ("1", "true", "yes")
+# Sessões de refine (artefatos por texto) mantidas em memória
+REFINE_SESSIONS = int(os.getenv("REFINE_SESSIONS", "256"))
 
 
 class NLPProcessor:
-    def __init__(self):
+    def __init__(self, answer_table: bool = ANSWER_TABLE):
+        """
+        Args:
+            answer_table: constrói a tabela de respostas prontas em background
+                (padrão ANSWER_TABLE); os usos offline (lote, replay) desligam,
+                porque não passam por lookup_answer e a construção disputaria CPU
+        """
+        self._answer_table_enabled = answer_table
         self.nlp = None
         self.pipeline = None
+        self.vectors: Optional[CompactVectors] = None
+        self.last_reload: Optional[Dict[str, Any]] = None
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        # Cache de resultados (CACHE_BACKEND); o namespace inclui a versão dos dados
+        self._cache_backend = create_backend(os.getenv("CACHE_BACKEND", "memory"))
+        self.result_cache: Optional[Cache] = None
+        # Requisições idênticas simultâneas compartilham uma execução
+        self.inflight = SingleFlight()
+        # Requisições acima de SLOW_REQUEST_MS vão para o corpus de replay
+        self.slow_log = SlowRequestLog.from_env()
+        # Artefatos por texto (correção, assinatura BNCC, estágios) reaproveitados pelo refine
+        self._refine_sessions: "collections.OrderedDict[str, ExtractionSession]" = collections.OrderedDict()
+        self._refine_lock = threading.Lock()
+        # Aquecimento na subida (start_warmup); GET /ready só passa depois dele
+        self.warmup = Warmup()
         self._load_model()
+        self._configure_result_cache()
+        self._build_answer_table()
     
     def _load_model(self):
         """Carrega o modelo spaCy para português"""
+        if NLP_MODE == "vectors" and self._load_compact():
+            return
+        
         try:
             self.nlp = spacy.load("pt_core_news_lg")
             self.pipeline = NLPPipeline(self.nlp)
@@ -24,10 +76,197 @@ class NLPProcessor:
                 self.nlp = None
                 self.pipeline = None
     
+    def _load_compact(self) -> bool:
+        """Modo "vectors": tokenizador português vazio + vetores em memory-map"""
+        path = COMPACT_VECTORS_DIR
+        if not os.path.isabs(path):
+            path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+        
+        try:
+            self.vectors = CompactVectors.load(path)
+        except (OSError, ValueError) as e:
+            print(f"AVISO: Vetores compactos não encontrados em {path} ({e}). "
+                  f"Gere com: python scripts/build_compact_vectors.py")
+            return False
+        
+        self.nlp = spacy.blank("pt")
+        self.pipeline = NLPPipeline(self.nlp, vectors=self.vectors)
+        print(f"Modo vectors: {len(self.vectors)} palavras x {self.vectors.dim} dimensões")
+        return True
+    
     def is_loaded(self) -> bool:
         """Verifica se o modelo foi carregado"""
         return self.nlp is not None and self.pipeline is not None
     
+    def reload(self) -> Dict[str, Any]:
+        """
+        Reconstrói tabelas, PhraseMatchers e índices da BNCC a partir dos arquivos
+        atuais, reaproveitando o modelo spaCy já carregado, e troca a pipeline
+        de uma vez. Requisições em andamento terminam com a pipeline antiga.
+        
+        Returns:
+            relatório com duração da construção e tamanho dos índices
+        """
+        if not self.is_loaded():
+            raise RuntimeError("Modelo NLP não carregado")
+        
+        with self._reload_lock:
+            start = time.perf_counter()
+            old_pipeline = self.pipeline
+            new_pipeline = NLPPipeline(self.nlp, load_tables(fresh=True), self.vectors)
+            new_pipeline.prepare_like(old_pipeline)
+            duration = time.perf_counter() - start
+            
+            # Troca atômica: uma única atribuição de referência
+            self.pipeline = new_pipeline
+            self._configure_result_cache()
+            self._build_answer_table()
+            
+            self.last_reload = {
+                "reloaded_at": time.time(),
+                "build_seconds": round(duration, 3),
+                "indexes": new_pipeline.index_stats()
+            }
+            print(f"♻️  Pipeline recarregada em {duration:.2f}s")
+            return self.last_reload
+    
+    def reload_in_background(self) -> bool:
+        """Dispara reload em uma thread; False se já há um reload em andamento"""
+        if self._reload_lock.locked():
+            return False
+        threading.Thread(target=self._safe_reload, daemon=True).start()
+        return True
+    
+    def is_reloading(self) -> bool:
+        return self._reload_lock.locked()
+    
+    def _safe_reload(self):
+        try:
+            self.reload()
+        except Exception as e:
+            print(f"Erro ao recarregar pipeline: {e}")
+            self.last_reload = {"error": str(e), "reloaded_at": time.time()}
+            return
+        # A versão dos dados mudou: cache de resultados novo e vazio
+        self._safe_warmup()
+    
+    def start_warmup(self) -> bool:
+        """Dispara o aquecimento em uma thread; False se desligado ou sem modelo"""
+        if self.warmup.status == "disabled" or not self.is_loaded():
+            return False
+        threading.Thread(target=self._safe_warmup, name="warmup", daemon=True).start()
+        return True
+    
+    def _safe_warmup(self):
+        if self.warmup.status == "disabled" or not self.is_loaded():
+            return
+        pipeline = self.pipeline
+        try:
+            # Catálogo pré-serializado; os índices preguiçosos vêm com o corpus
+            self.warmup.run(self.process, load_corpus(), prepare=pipeline.get_catalog)
+        except Exception as e:
+            print(f"Erro no aquecimento: {e}")
+    
+    def is_ready(self) -> bool:
+        """Modelo carregado e aquecimento concluído (ou desligado)"""
+        return self.is_loaded() and self.warmup.ready
+    
+    def _build_answer_table(self):
+        if self._answer_table_enabled and self.is_loaded():
+            self.pipeline.build_answer_table(pause=self.wait_for_idle)
+    
+    def wait_for_idle(self, max_wait: float = 5.0):
+        """Espera (até max_wait segundos) enquanto houver extrações interativas em andamento"""
+        deadline = time.monotonic() + max_wait
+        while self.inflight.in_flight() > 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    
+    def _data_version(self) -> str:
+        """
+        Hash do conteúdo das tabelas e currículos e das configurações que mudam o
+        resultado (modo padrão, limites de sugestões/variações/texto, ANN): igual
+        em todos os pods com os mesmos arquivos e a mesma configuração
+        """
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(f"{NLP_MODE}:{self.nlp.meta.get('name')}:{self.nlp.meta.get('version')}".encode())
+        digest.update(make_key(get_mode()["name"], SUGGESTIONS_TOP_K, MAX_QUERY_VARIATIONS, TEXT_BUDGET,
+                               ANN_CANDIDATE_THRESHOLD, ANN_N_PROBE, ANN_TOP_K).encode())
+        for path in sorted(self._watched_mtimes()):
+            try:
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+            except OSError:
+                continue
+        return digest.hexdigest()
+    
+    def _configure_result_cache(self):
+        """(Re)cria o cache de resultados com a versão atual dos dados"""
+        if self._cache_backend is None or not self.is_loaded():
+            self.result_cache = None
+            return
+        self.result_cache = Cache(self._cache_backend, f"extract:{self._data_version()}", ttl=CACHE_TTL)
+    
+    def _watched_mtimes(self) -> Dict[str, float]:
+        """mtime dos arquivos de tabelas e dos currículos registrados"""
+        paths = list(table_files())
+        if self.pipeline is not None:
+            for name in self.pipeline.curricula.names():
+                path = self.pipeline.curricula.get(name).path
+                if os.path.isdir(path):
+                    paths.extend(os.path.join(path, f) for f in os.listdir(path))
+                else:
+                    paths.append(path)
+        
+        mtimes = {}
+        for path in paths:
+            try:
+                mtimes[path] = os.path.getmtime(path)
+            except OSError:
+                mtimes[path] = 0.0
+        return mtimes
+    
+    def start_watcher(self, interval: float = 5.0):
+        """Verifica periodicamente os arquivos e recarrega a pipeline quando mudam"""
+        if self._watcher is not None or not self.is_loaded():
+            return
+        
+        def watch():
+            mtimes = self._watched_mtimes()
+            while True:
+                time.sleep(interval)
+                current = self._watched_mtimes()
+                if current != mtimes:
+                    print("♻️  Mudança detectada nos dados/tabelas - recarregando...")
+                    self._safe_reload()
+                    mtimes = current
+        
+        self._watcher = threading.Thread(target=watch, daemon=True)
+        self._watcher.start()
+    
+    def create_session(self) -> Optional[ExtractionSession]:
+        """Cria uma sessão de extração incremental (None se o modelo não carregou)"""
+        if not self.is_loaded():
+            return None
+        return ExtractionSession(self.pipeline)
+    
+    def update_session(self, session: Optional[ExtractionSession], text: str,
+                       context: Optional[Dict[str, Any]] = None) -> Tuple[ExtractionSession, Dict[str, Any]]:
+        """
+        Nova versão do texto numa sessão incremental (WebSocket). A sessão é
+        recriada se a pipeline mudou (reload) e a execução conta em inflight,
+        para jobs e a tabela de respostas cederem a vez
+        
+        Returns:
+            (sessão em uso, resultado)
+        """
+        if not self.is_loaded():
+            raise RuntimeError("Modelo NLP não carregado")
+        pipeline = self.pipeline
+        if session is None or session.pipeline is not pipeline:
+            session = ExtractionSession(pipeline)
+        with self.inflight.track():
+            return session, session.update(text, context)
+    
     def process(self, text: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Processa o texto e extrai informações educacionais usando a pipeline modular
@@ -40,5 +279,86 @@ class NLPProcessor:
                 "missing_fields": ["disciplina", "ano", "nivelBloom", "tipoQuestao", "tipoTextoBase", "perfilAluno"]
             }
         
-        return self.pipeline.classify(text, context)
+        # Referência local: um reload no meio da requisição não a afeta
+        pipeline = self.pipeline
+        # Só o nome de uma unidade/objeto: resposta pronta, sem rodar a pipeline
+        answer = pipeline.lookup_answer(text, context)
+        if answer is not None:
+            return answer
+        
+        cache = self.result_cache
+        
+        # Mesmo texto (espaços normalizados) + mesmo contexto = mesmo resultado
+        key = make_key(" ".join(text.split()), context or {})
+        if cache is None:
+            return self.inflight.do(key, lambda: self._classify(pipeline, text, context))
+        return self.inflight.do(key, lambda: cache.get_or_compute(key, lambda: self._classify(pipeline, text, context)))
+    
+    def _classify(self, pipeline: NLPPipeline, text: str, context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """pipeline.classify, registrando no slow log se passar do limite"""
+        slow_log = self.slow_log
+        if slow_log is None:
+            return pipeline.classify(text, context)
+        result, seconds, stages = timed_call(lambda: pipeline.classify(text, context))
+        slow_log.record(text, context, seconds, stages, result)
+        return result
+    
+    def refine(self, text: str, previous: Dict[str, Any], changed: Dict[str, Any],
+               context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Recalcula só os campos que dependem dos campos alterados (NLPPipeline.refine),
+        com a sessão do texto guardada entre as chamadas
+        """
+        if not self.is_loaded():
+            raise RuntimeError("Modelo NLP não carregado")
+        pipeline = self.pipeline
+        controls = {key: value for key, value in (context or {}).items() if key in CONTROL_KEYS}
+        key = make_key(" ".join(text.split()), controls)
+        
+        with self._refine_lock:
+            session = self._refine_sessions.get(key)
+            # Depois de um reload a sessão antiga aponta para a pipeline anterior
+            if session is None or session.pipeline is not pipeline:
+                session = ExtractionSession(pipeline)
+                self._refine_sessions[key] = session
+            self._refine_sessions.move_to_end(key)
+            while len(self._refine_sessions) > REFINE_SESSIONS:
+                self._refine_sessions.popitem(last=False)
+        
+        return pipeline.refine(text, previous, changed, context, session)
+    
+    def profile(self, text: str, context: Optional[Dict[str, Any]] = None):
+        """
+        Roda a pipeline sob cProfile, sem tabela de respostas, cache nem coalescência
+        
+        Returns:
+            (resultado, resumo do profile)
+        """
+        if not self.is_loaded():
+            raise RuntimeError("Modelo NLP não carregado")
+        pipeline = self.pipeline
+        return profile_call(lambda: pipeline.classify(text, context))
+    
+    def process_batch(self, items: Iterable[Tuple[str, Optional[Dict[str, Any]]]],
+                      batch_size: int = 64) -> Iterator[Dict[str, Any]]:
+        """
+        Processa pares (texto, context) em lote (nlp.pipe), com a mesma pipeline
+        do process() mas sem cache nem coalescência - para uso offline
+        """
+        if not self.is_loaded():
+            raise RuntimeError("Modelo NLP não carregado")
+        return self.pipeline.classify_batch(items, batch_size)
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Acertos/erros dos caches de resultado e de consultas"""
+        pipeline = self.pipeline
+        return {
+            "backend": type(self._cache_backend).__name__ if self._cache_backend else None,
+            "resultados": dict(self.result_cache.stats) if self.result_cache else None,
+            "consultas": dict(pipeline.query_cache.stats) if pipeline and pipeline.query_cache else None
+        }
+    
+    def coalescing_stats(self) -> Dict[str, int]:
+        """Execuções, requisições coalescidas e execuções em andamento"""
+        return self.inflight.snapshot()
 
@@ -0,0 +1,239 @@
+"""
+Classificação offline em lote (sem HTTP) de arquivos JSONL ou CSV
+
+Uso:
+    python scripts/batch_classify.py questoes.jsonl -o resultados.jsonl
+    cat questoes.csv | python scripts/batch_classify.py - --input-format csv -o resultados.parquet
+    python scripts/batch_classify.py banco.jsonl -o saida.jsonl --workers 4 --chunk-size 500
+
+Entrada: JSONL com {"id": ..., "text": ..., "context": {...}} por linha (ou só a
+string do texto), ou CSV com colunas text/id/context (context como JSON).
+Saída: JSONL (uma linha por registro, na ordem da entrada) ou Parquet (requer
+pyarrow; extracted/confidence/suggestions/missing_fields como JSON).
+
+Usa o mesmo NLPProcessor/NLPPipeline do main.py, então os resultados são os
+mesmos da API. O arquivo é lido e escrito em blocos: a memória não cresce com
+o tamanho da entrada. Cada worker é um processo com o seu próprio modelo.
+"""
+import argparse
+import collections
+import contextlib
+import csv
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson
+
+PARQUET_COLUMNS = ["line", "id", "extracted", "confidence", "suggestions", "missing_fields", "error"]
+
+_processor = None
+
+
+def _validate(record: dict) -> dict:
+    """O próprio registro ou {"id", "error"} se text/context têm o tipo errado"""
+    if "error" in record:
+        return record
+    if not isinstance(record.get("text") or "", str):
+        return {"id": record.get("id"), "error": "text deve ser uma string"}
+    if record.get("context") is not None and not isinstance(record["context"], dict):
+        return {"id": record.get("id"), "error": "context deve ser um objeto JSON"}
+    return record
+
+
+def read_records(stream, input_format: str, text_column: str):
+    """
+    (linha, registro) para cada registro não vazio da entrada
+
+    Linhas inválidas (JSON malformado, tipo errado, context CSV que não é JSON)
+    viram registros {"error": ...} e não interrompem o lote.
+    """
+    if input_format == "csv":
+        for line, row in enumerate(csv.DictReader(stream), 1):
+            context = row.get("context")
+            try:
+                context = json.loads(context) if context else None
+            except ValueError as e:
+                yield line, {"id": row.get("id"), "error": f"context inválido: {e}"}
+                continue
+            yield line, _validate({
+                "id": row.get("id"),
+                "text": row.get(text_column) or "",
+                "context": context
+            })
+        return
+
+    line = 0
+    for raw in stream:
+        if not raw.strip():
+            continue
+        line += 1
+        try:
+            record = json.loads(raw)
+        except ValueError as e:
+            record = {"error": f"JSON inválido: {e}"}
+        if isinstance(record, str):
+            record = {"text": record}
+        elif not isinstance(record, dict):
+            record = {"error": "Registro deve ser um objeto JSON ou a string do texto"}
+        yield line, _validate(record)
+
+
+def _init_worker():
+    """Carrega o modelo uma vez por processo (logs de debug da pipeline descartados)"""
+    global _processor
+    sys.stdout = open(os.devnull, "w")
+    from nlp_processor import NLPProcessor
+    # Sem tabela de respostas: o lote não consulta e cada processo a construiria
+    _processor = NLPProcessor(answer_table=False)
+
+
+def classify_chunk(chunk, batch_size: int = 64):
+    """Classifica um bloco [(linha, registro)] -> [linha de resultado]"""
+    rows = []
+    valid = []
+    for line, record in chunk:
+        if "error" in record:
+            rows.append({"line": line, "id": record.get("id"), "error": record["error"]})
+        elif len((record.get("text") or "").strip()) < 3:
+            # Mesma regra do /api/extract
+            rows.append({"line": line, "id": record.get("id"), "error": "Texto muito curto"})
+        else:
+            valid.append((line, record))
+            rows.append(None)
+
+    items = ((record.get("text") or "", record.get("context")) for _, record in valid)
+    results = iter(_processor.process_batch(items, batch_size))
+    positions = (i for i, row in enumerate(rows) if row is None)
+    for position, (line, record), result in zip(positions, valid, results):
+        rows[position] = {"line": line, "id": record.get("id"), **result}
+    return rows
+
+
+def iter_results(records, workers: int, chunk_size: int, batch_size: int):
+    """Resultados na ordem da entrada; no máximo 2 blocos por worker em andamento"""
+    chunks = iter(lambda: list(itertools.islice(records, chunk_size)), [])
+
+    if workers <= 1:
+        _init_worker()
+        for chunk in chunks:
+            yield classify_chunk(chunk, batch_size)
+        return
+
+    with multiprocessing.Pool(workers, initializer=_init_worker) as pool:
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(classify_chunk, (chunk, batch_size)))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+class JsonlWriter:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, rows):
+        for row in rows:
+            self.stream.write(orjson.dumps(row, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS))
+            self.stream.write(b"\n")
+        self.stream.flush()
+
+    def close(self):
+        pass
+
+
+class ParquetWriter:
+    """Um row group por bloco; campos aninhados como JSON"""
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            sys.exit("Saída Parquet requer pyarrow (pip install pyarrow)")
+        self.pa = pa
+        self.schema = pa.schema([
+            ("line", pa.int64()), ("id", pa.string()), ("extracted", pa.string()),
+            ("confidence", pa.string()), ("suggestions", pa.string()),
+            ("missing_fields", pa.string()), ("error", pa.string())
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        columns = {name: [] for name in PARQUET_COLUMNS}
+        for row in rows:
+            columns["line"].append(row["line"])
+            columns["id"].append(None if row.get("id") is None else str(row["id"]))
+            columns["error"].append(row.get("error"))
+            for name in ("extracted", "confidence", "suggestions", "missing_fields"):
+                value = row.get(name)
+                columns[name].append(None if value is None else
+                                     orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY).decode())
+        self.writer.write_table(self.pa.table(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", nargs="?", default="-", help="arquivo de entrada ou - para stdin")
+    parser.add_argument("-o", "--output", default="-", help="arquivo de saída (.jsonl ou .parquet) ou - para stdout")
+    parser.add_argument("--input-format", choices=["jsonl", "csv"], help="padrão: pela extensão (stdin = jsonl)")
+    parser.add_argument("--output-format", choices=["jsonl", "parquet"], help="padrão: pela extensão")
+    parser.add_argument("--text-column", default="text", help="coluna do texto no CSV")
+    parser.add_argument("--workers", type=int, default=1, help="processos (cada um carrega o modelo)")
+    parser.add_argument("--chunk-size", type=int, default=256, help="registros por bloco")
+    parser.add_argument("--batch-size", type=int, default=64, help="lote do nlp.pipe")
+    args = parser.parse_args()
+
+    input_format = args.input_format or ("csv" if args.input.endswith(".csv") else "jsonl")
+    output_format = args.output_format or ("parquet" if args.output.endswith(".parquet") else "jsonl")
+    if output_format == "parquet" and args.output == "-":
+        sys.exit("Saída Parquet precisa de um arquivo (-o arquivo.parquet)")
+
+    # Resultados vão para o stdout real; os prints de debug da pipeline não
+    real_stdout = sys.stdout.buffer
+
+    with contextlib.ExitStack() as stack:
+        if args.input == "-":
+            source = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+        else:
+            source = stack.enter_context(open(args.input, "r", encoding="utf-8", newline=""))
+
+        if output_format == "parquet":
+            writer = ParquetWriter(args.output)
+        elif args.output == "-":
+            writer = JsonlWriter(real_stdout)
+        else:
+            writer = JsonlWriter(stack.enter_context(open(args.output, "wb")))
+
+        records = read_records(source, input_format, args.text_column)
+        start = time.perf_counter()
+        total = errors = 0
+        try:
+            for rows in iter_results(records, args.workers, args.chunk_size, args.batch_size):
+                writer.write(rows)
+                total += len(rows)
+                errors += sum(1 for row in rows if "error" in row)
+                elapsed = time.perf_counter() - start
+                print(f"\r{total} registros ({errors} com erro) - {total / elapsed:.1f}/s",
+                      end="", file=sys.stderr, flush=True)
+        finally:
+            writer.close()
+            sys.stdout = sys.__stdout__
+
+    elapsed = time.perf_counter() - start
+    print(f"\n✅ {total} registros em {elapsed:.1f}s ({total / max(elapsed, 1e-9):.1f}/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark de recall do índice ANN (IVF) contra a busca exata
+
+Uso:
+    python scripts/benchmark_ann.py                      # vetores da BNCC (modelo spaCy com vetores)
+    python scripts/benchmark_ann.py --synthetic 200000    # base sintética para simular escala
+    python scripts/benchmark_ann.py --gold                # recall@k da pipeline no gold set, ANN x exata
+
+O recall dos vetores mede só o índice; --gold mede o efeito no ranking final
+(vencedor + candidatos) rodando scripts/evaluate.py com o ANN sempre ligado
+(BNCC_ANN_THRESHOLD=0, um n_probe por variante) e com a varredura exata.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from matchers.ann_index import IVFIndex
+
+DEFAULT_GOLD = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "eval", "gold.jsonl")
+
+
+def _bncc_vectors():
+    """Vetores de objetos/habilidades da BNCC e consultas (nomes de objetos)"""
+    import spacy
+    from matchers.bncc_matcher import BNCCMatcher
+
+    nlp = spacy.load(os.getenv("SPACY_MODEL", "pt_core_news_lg"))
+    if not len(nlp.vocab.vectors):
+        sys.exit("O modelo não tem word vectors - use --synthetic")
+
+    matcher = BNCCMatcher(nlp)
+    vectors, ids = [], []
+    for i, (disc, ano, unidade, objeto) in enumerate(matcher.entries):
+        for texto in [objeto] + list(matcher.bncc_data[disc][ano][unidade][objeto]):
+            vectors.append(nlp.make_doc(texto).vector)
+            ids.append(i)
+
+    queries = [nlp.make_doc(objeto).vector for _, _, _, objeto in matcher.entries[::7]]
+    return np.array(vectors), ids, np.array(queries)
+
+
+def _synthetic_vectors(n: int, dim: int, n_queries: int, seed: int = 0):
+    """Vetores agrupados em torno de centros aleatórios; consultas são vetores com ruído"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, n // 50), dim))
+    vectors = centers[rng.integers(len(centers), size=n)] + 0.5 * rng.normal(size=(n, dim))
+    queries = vectors[rng.integers(n, size=n_queries)] + 0.3 * rng.normal(size=(n_queries, dim))
+    return vectors.astype(np.float32), list(range(n)), queries.astype(np.float32)
+
+
+def _gold_recall(args):
+    """recall@k no gold set (scripts/evaluate.py): varredura exata x ANN em cada n_probe"""
+    import evaluate
+
+    eval_args = argparse.Namespace(gold=args.gold, model=args.model, repeat=1, top_k=args.k)
+    variants = [("exata", {"BNCC_ANN_THRESHOLD": str(10 ** 9)})]
+    variants.extend((f"ann-np{n_probe}", {"BNCC_ANN_THRESHOLD": "0", "BNCC_ANN_NPROBE": str(n_probe)})
+                    for n_probe in args.n_probe)
+    reports = {}
+    for name, env in variants:
+        print(f"⏱️  {name}...", file=sys.stderr, flush=True)
+        reports[name] = evaluate.evaluate(name, env, eval_args)
+    evaluate.print_table(reports, args.k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, default=0, help="número de vetores sintéticos (0 = BNCC)")
+    parser.add_argument("--dim", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--gold", nargs="?", const=DEFAULT_GOLD,
+                        help="recall@k da pipeline no conjunto rotulado (padrão: data/eval/gold.jsonl)")
+    parser.add_argument("--model", default=os.getenv("SPACY_MODEL", "pt_core_news_lg"),
+                        help="modelo spaCy do --gold (precisa de word vectors)")
+    args = parser.parse_args()
+
+    if args.gold:
+        _gold_recall(args)
+        return
+
+    if args.synthetic:
+        vectors, ids, queries = _synthetic_vectors(args.synthetic, args.dim, args.queries)
+    else:
+        vectors, ids, queries = _bncc_vectors()
+
+    start = time.perf_counter()
+    index = IVFIndex().build(vectors, ids)
+    build_s = time.perf_counter() - start
+    print(f"Índice: {len(index)} vetores, {len(index.lists)} listas, construído em {build_s:.2f}s")
+
+    start = time.perf_counter()
+    exact = [{i for i, _ in index.exact_search(q, k=args.k)} for q in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    print(f"Busca exata: {exact_ms:.3f} ms/consulta")
+
+    print(f"\n{'n_probe':>8} {'recall@' + str(args.k):>10} {'ms/consulta':>12} {'speedup':>8}")
+    for n_probe in args.n_probe:
+        start = time.perf_counter()
+        approx = [{i for i, _ in index.search(q, k=args.k, n_probe=n_probe)} for q in queries]
+        ms = (time.perf_counter() - start) * 1000 / len(queries)
+        recall = np.mean([len(a & e) / max(len(e), 1) for a, e in zip(approx, exact)])
+        print(f"{n_probe:>8} {recall:>10.3f} {ms:>12.3f} {exact_ms / max(ms, 1e-9):>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
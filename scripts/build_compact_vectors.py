@@ -0,0 +1,57 @@
+"""
+Gera a tabela compacta de vetores usada no modo NLP_MODE=vectors
+
+Uso:
+    python scripts/build_compact_vectors.py [diretório] [--top-n 20000]
+
+Lê os vetores do modelo completo (SPACY_MODEL, padrão pt_core_news_lg) para o
+vocabulário dos currículos registrados, dos sinônimos e das tabelas de mapeamento.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import spacy
+from matchers.compact_vectors import build_compact_vectors
+from matchers.curriculum import CurriculumRegistry
+from matchers.tables import load_tables
+
+
+def _curriculum_texts(registry: CurriculumRegistry):
+    for name in registry.names():
+        for anos in registry.get(name).values():
+            for unidades in anos.values():
+                for unidade, objetos in unidades.items():
+                    yield unidade
+                    for objeto, habilidades in objetos.items():
+                        yield objeto
+                        yield from habilidades
+
+
+def _table_texts(tables):
+    for table in tables.values():
+        for key, values in table.items():
+            yield key
+            yield from values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default=os.getenv("COMPACT_VECTORS_DIR", "data/compact-vectors"))
+    parser.add_argument("--top-n", type=int, default=20000, help="palavras mais frequentes incluídas além do vocabulário")
+    args = parser.parse_args()
+
+    nlp = spacy.load(os.getenv("SPACY_MODEL", "pt_core_news_lg"))
+    texts = list(_curriculum_texts(CurriculumRegistry.from_env())) + list(_table_texts(load_tables()))
+
+    start = time.perf_counter()
+    count = build_compact_vectors(nlp, texts, args.path, top_n=args.top_n)
+    size_mb = os.path.getsize(os.path.join(args.path, "vectors.npy")) / 1e6
+    print(f"{count} palavras gravadas em {args.path} ({size_mb:.1f} MB) em {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Avaliação qualidade x velocidade da pipeline sobre um conjunto rotulado
+
+Uso:
+    python scripts/evaluate.py                                   # data/eval/gold.jsonl, pt_core_news_sm
+    python scripts/evaluate.py --variant base --variant sem-ann:BNCC_ANN_THRESHOLD=0
+    python scripts/evaluate.py --variant v4:MAX_QUERY_VARIATIONS=4 --misses -o avaliacao.json
+    python scripts/evaluate.py --modes --check-targets           # fast, balanced, exhaustive
+
+Cada linha do gold set tem "id", "text", "context" (opcional) e "expected" com
+os campos rotulados (disciplina, ano, unidadeTematica, objetoConhecimento,
+habilidade, nivelBloom, tipoQuestao, ...). Só os campos presentes são avaliados;
+uma lista aceita qualquer um dos valores (habilidade: códigos EF..).
+
+Métricas por variante: acurácia por campo, recall top-k (vencedor + candidatos
+em suggestions), latência p50/p95 e vazão. Cada --variant NOME:VAR=VALOR,...
+roda em um processo próprio com as variáveis de ambiente aplicadas (os limites
+da pipeline são lidos na importação), então as variantes formam a curva
+velocidade x qualidade. --modes compara os modos da pipeline (PIPELINE_MODE) e
+--check-targets falha se o p95 de algum modo passar do alvo documentado em
+matchers/modes.py. Roda offline: só precisa do modelo spaCy (--model).
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_GOLD = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "eval", "gold.jsonl")
+FIELDS = ["disciplina", "ano", "unidadeTematica", "objetoConhecimento", "habilidade",
+          "nivelBloom", "tipoQuestao", "tipoTextoBase", "perfilAluno"]
+
+HABILIDADE_RE = re.compile(r'\(?\s*(E[FM]\w+)\s*\)?')
+
+
+def load_gold(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def canonical(field: str, value) -> str:
+    """Forma comparável do valor (sem acento/caixa; ano só o número; habilidade só o código)"""
+    from matchers.base_matcher import normalize_text
+    text = " ".join(normalize_text(str(value)).split())
+    if field == "ano":
+        digits = re.search(r'\d+', text)
+        return digits.group() if digits else text
+    if field == "habilidade":
+        code = HABILIDADE_RE.match(str(value).strip())
+        return code.group(1).upper() if code else text
+    return text
+
+
+def candidates(result, field: str):
+    """Vencedor seguido dos candidatos de suggestions para o campo"""
+    values = []
+    if field in result["extracted"]:
+        values.append(result["extracted"][field])
+    for suggestion in result.get("suggestions", []):
+        if suggestion.get("field") == field:
+            ranked = [c["value"] for c in suggestion.get("candidates", [])] or suggestion.get("values", [])
+            values.extend(value for value in ranked if value not in values)
+    return values
+
+
+def score(gold, results, top_k: int):
+    """Acurácia e recall top-k por campo + erros"""
+    fields = {}
+    misses = []
+    for record, result in zip(gold, results):
+        for field, expected in record["expected"].items():
+            accepted = {canonical(field, value) for value in (expected if isinstance(expected, list) else [expected])}
+            ranked = [canonical(field, value) for value in candidates(result, field)]
+            stats = fields.setdefault(field, {"labeled": 0, "correct": 0, "recall": 0})
+            stats["labeled"] += 1
+            hit = bool(ranked) and ranked[0] in accepted
+            stats["correct"] += hit
+            stats["recall"] += any(value in accepted for value in ranked[:top_k])
+            if not hit:
+                misses.append({"id": record["id"], "field": field, "expected": expected,
+                               "got": result["extracted"].get(field)})
+
+    per_field = {
+        field: {
+            "labeled": stats["labeled"],
+            "accuracy": round(stats["correct"] / stats["labeled"], 4),
+            f"recall@{top_k}": round(stats["recall"] / stats["labeled"], 4)
+        }
+        for field, stats in sorted(fields.items(), key=lambda item: FIELDS.index(item[0]) if item[0] in FIELDS else 99)
+    }
+    labeled = sum(stats["labeled"] for stats in fields.values())
+    return {
+        "fields": per_field,
+        "accuracy": round(sum(stats["correct"] for stats in fields.values()) / labeled, 4) if labeled else 0.0,
+        f"recall@{top_k}": round(sum(stats["recall"] for stats in fields.values()) / labeled, 4) if labeled else 0.0,
+        "misses": misses
+    }
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))] if values else 0.0
+
+
+def run_variant(gold_path: str, model: str, repeat: int, top_k: int):
+    """Avalia no processo atual (variáveis de ambiente já aplicadas)"""
+    import spacy
+    from matchers.modes import get_mode
+    from matchers.pipeline import NLPPipeline
+
+    gold = load_gold(gold_path)
+    start = time.perf_counter()
+    nlp = spacy.blank("pt") if model == "blank" else spacy.load(model)
+    pipeline = NLPPipeline(nlp)
+    # Índices preguiçosos (BNCC, corretor) são construídos no aquecimento
+    for record in gold:
+        pipeline.classify(record["text"], record.get("context"))
+    startup = time.perf_counter() - start
+
+    latencies = [float("inf")] * len(gold)
+    results = [None] * len(gold)
+    wall = 0.0
+    for _ in range(repeat):
+        round_start = time.perf_counter()
+        for i, record in enumerate(gold):
+            t = time.perf_counter()
+            results[i] = pipeline.classify(record["text"], record.get("context"))
+            latencies[i] = min(latencies[i], time.perf_counter() - t)
+        wall += time.perf_counter() - round_start
+
+    mode = get_mode()
+    report = score(gold, results, top_k)
+    report.update({
+        "mode": mode["name"],
+        "target_p95_ms": mode["target_p95_ms"],
+        "prompts": len(gold),
+        "startup_seconds": round(startup, 2),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "throughput": round(len(gold) * repeat / wall, 1) if wall else 0.0
+    })
+    return report
+
+
+def parse_variant(spec: str):
+    """"nome:VAR=VALOR,VAR=VALOR" -> (nome, {VAR: VALOR})"""
+    name, _, assignments = spec.partition(":")
+    env = {}
+    for assignment in filter(None, assignments.split(",")):
+        key, sep, value = assignment.partition("=")
+        if not sep:
+            raise argparse.ArgumentTypeError(f"Variante inválida: {spec}")
+        env[key.strip()] = value.strip()
+    return name, env
+
+
+def evaluate(name: str, env, args):
+    """Roda a variante em um subprocesso com o ambiente dela"""
+    command = [sys.executable, os.path.abspath(__file__), "--worker",
+               "--gold", args.gold, "--model", args.model,
+               "--repeat", str(args.repeat), "--top-k", str(args.top_k)]
+    proc = subprocess.run(command, env={**os.environ, **env}, capture_output=True, text=True)
+    if proc.returncode != 0:
+        sys.exit(f"Variante {name} falhou:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def print_table(reports, top_k: int):
+    names = list(reports)
+    width = max(18, *(len(name) for name in names))
+    fields = []
+    for report in reports.values():
+        fields.extend(field for field in report["fields"] if field not in fields)
+
+    print(f"\n{'':<22}" + "".join(f"{name:>{width + 2}}" for name in names))
+    for field in fields:
+        labeled = next(r["fields"][field]["labeled"] for r in reports.values() if field in r["fields"])
+        cells = []
+        for report in reports.values():
+            stats = report["fields"].get(field)
+            cells.append(f"{stats['accuracy']:.0%} / {stats[f'recall@{top_k}']:.0%}" if stats else "-")
+        print(f"{field + f' ({labeled})':<22}" + "".join(f"{cell:>{width + 2}}" for cell in cells))
+    rows = [
+        (f"acurácia / recall@{top_k}", lambda r: f"{r['accuracy']:.1%} / {r[f'recall@{top_k}']:.1%}"),
+        ("p50", lambda r: f"{r['p50_ms']:.1f}ms"),
+        ("p95", lambda r: f"{r['p95_ms']:.1f}ms"),
+        ("vazão", lambda r: f"{r['throughput']:.1f}/s"),
+        ("alvo p95", lambda r: f"{r['target_p95_ms']}ms ({r['mode']})"),
+        ("inicialização", lambda r: f"{r['startup_seconds']:.1f}s"),
+    ]
+    print("-" * (22 + (width + 2) * len(names)))
+    for label, cell in rows:
+        print(f"{label:<22}" + "".join(f"{cell(report):>{width + 2}}" for report in reports.values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--gold", default=DEFAULT_GOLD, help="conjunto rotulado (JSONL)")
+    parser.add_argument("--model", default="pt_core_news_sm", help="modelo spaCy (ou 'blank': só tokenizador)")
+    parser.add_argument("--variant", action="append", type=parse_variant, metavar="NOME[:VAR=VALOR,...]",
+                        help="configuração a comparar (repetível; padrão: ambiente atual)")
+    parser.add_argument("--modes", action="store_true", help="uma variante por modo da pipeline")
+    parser.add_argument("--check-targets", action="store_true",
+                        help="sai com código 1 se o p95 de alguma variante passar do alvo do modo")
+    parser.add_argument("--repeat", type=int, default=3, help="passadas medidas (latência = menor tempo)")
+    parser.add_argument("--top-k", type=int, default=3, help="k do recall")
+    parser.add_argument("--misses", action="store_true", help="lista os erros de cada variante")
+    parser.add_argument("-o", "--output", help="grava o relatório completo em JSON")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        # Logs de debug da pipeline não se misturam ao relatório
+        real_stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")
+        try:
+            report = run_variant(args.gold, args.model, args.repeat, args.top_k)
+        finally:
+            sys.stdout = real_stdout
+        print(json.dumps(report, ensure_ascii=False))
+        return
+
+    variants = list(args.variant or [])
+    if args.modes:
+        from matchers.modes import PIPELINE_MODES
+        variants.extend((mode, {"PIPELINE_MODE": mode}) for mode in PIPELINE_MODES)
+
+    reports = {}
+    for name, env in variants or [("atual", {})]:
+        print(f"⏱️  {name}...", file=sys.stderr, flush=True)
+        reports[name] = evaluate(name, env, args)
+
+    print_table(reports, args.top_k)
+    if args.misses:
+        for name, report in reports.items():
+            print(f"\n❌ {name}: {len(report['misses'])} erros")
+            for miss in report["misses"]:
+                print(f"  {miss['id']} {miss['field']}: esperado {str(miss['expected'])[:60]!r}, "
+                      f"obtido {str(miss['got'])[:60]!r}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+    if args.check_targets:
+        over = [name for name, report in reports.items() if report["p95_ms"] > report["target_p95_ms"]]
+        if over:
+            sys.exit(f"\n❌ p95 acima do alvo: {', '.join(over)}")
+        print("\n✅ Todos os modos dentro do alvo de p95")
+
+
+if __name__ == "__main__":
+    main()
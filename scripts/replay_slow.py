@@ -0,0 +1,161 @@
+"""
+Reexecuta o corpus de requisições lentas e compara a latência antes/depois
+
+Uso:
+    python scripts/replay_slow.py                          # SLOW_LOG_PATH (+ rotacionados)
+    python scripts/replay_slow.py lentas.jsonl -o depois.jsonl
+    python scripts/replay_slow.py lentas.jsonl --baseline antes.jsonl --fail-on-regression 0.2
+
+"Antes" é a latência gravada na captura ou, com --baseline, a de um replay
+anterior (mesmo formato, casado por id) - rodar o replay antes e depois da
+mudança, na mesma máquina, é a comparação justa. O relatório (-o) tem o mesmo
+formato da captura e pode servir de baseline para o próximo replay.
+
+Cada registro roda direto em NLPPipeline.classify (sem cache, coalescência nem
+tabela de respostas), --repeat vezes, e fica com o menor tempo.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson
+
+from matchers.slowlog import SLOW_LOG_PATH, log_files, timed_call
+
+
+def read_corpus(paths):
+    """Registros com text (linhas inválidas são ignoradas), sem repetir id"""
+    seen = set()
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(record, dict) or not record.get("text"):
+                    continue
+                record_id = record.get("id") or f"{os.path.basename(path)}:{len(seen)}"
+                if record_id in seen:
+                    continue
+                seen.add(record_id)
+                record["id"] = record_id
+                yield record
+
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def replay(pipeline, record, repeat: int):
+    """(resultado, ms, {estágio: ms}) da execução mais rápida"""
+    best = None
+    for _ in range(repeat):
+        result, seconds, stages = timed_call(lambda: pipeline.classify(record["text"], record.get("context")))
+        if best is None or seconds < best[1]:
+            best = (result, seconds, stages)
+    result, seconds, stages = best
+    return result, seconds * 1000, {name: value * 1000 for name, value in stages.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="*", help=f"arquivos JSONL capturados (padrão: {SLOW_LOG_PATH} e rotacionados)")
+    parser.add_argument("--baseline", help="relatório de um replay anterior (latência 'antes' por id)")
+    parser.add_argument("-o", "--output", help="grava o relatório JSONL deste replay")
+    parser.add_argument("--repeat", type=int, default=3, help="execuções por registro (fica a mais rápida)")
+    parser.add_argument("--limit", type=int, help="no máximo N registros")
+    parser.add_argument("--top", type=int, default=10, help="maiores regressões listadas")
+    parser.add_argument("--fail-on-regression", type=float, metavar="FRAÇÃO",
+                        help="sai com código 1 se o p95 piorar mais que isso (ex: 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    paths = args.inputs or log_files()
+    if not paths:
+        sys.exit(f"Nenhum corpus encontrado em {SLOW_LOG_PATH}")
+
+    baseline = {}
+    if args.baseline:
+        baseline = {record["id"]: record for record in read_corpus([args.baseline])}
+
+    # Logs de debug da pipeline não poluem o relatório
+    real_stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        from nlp_processor import NLPProcessor
+        # Sem tabela de respostas: o replay roda a pipeline e a construção distorceria as latências
+        processor = NLPProcessor(answer_table=False)
+        if not processor.is_loaded():
+            sys.exit("Modelo NLP não carregado")
+        pipeline = processor.pipeline
+
+        rows = []
+        output = open(args.output, "wb") if args.output else None
+        try:
+            for count, record in enumerate(read_corpus(paths), 1):
+                if args.limit and count > args.limit:
+                    break
+                before = baseline.get(record["id"], record if not baseline else None)
+                if before is None or "latency_ms" not in before:
+                    continue
+                try:
+                    result, latency_ms, stages = replay(pipeline, record, args.repeat)
+                except Exception as e:
+                    print(f"⚠️  {record['id']}: {e}", file=sys.stderr)
+                    continue
+
+                row = {
+                    "id": record["id"],
+                    "text": record["text"],
+                    "context": record.get("context"),
+                    "latency_ms": round(latency_ms, 2),
+                    "stages": {name: round(value, 2) for name, value in stages.items()},
+                    "result": result,
+                    "before_ms": before["latency_ms"],
+                    "changed": "result" in before and before["result"].get("extracted") != result["extracted"]
+                }
+                rows.append(row)
+                if output:
+                    output.write(orjson.dumps(row, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS))
+                    output.write(b"\n")
+                print(f"\r{count} registros", end="", file=sys.stderr, flush=True)
+        finally:
+            if output:
+                output.close()
+    finally:
+        sys.stdout = real_stdout
+
+    if not rows:
+        sys.exit("\nNenhum registro reexecutado")
+
+    before = [row["before_ms"] for row in rows]
+    after = [row["latency_ms"] for row in rows]
+    print(f"\n\n{len(rows)} registros ({sum(row['changed'] for row in rows)} com resultado diferente)")
+    print(f"{'':>8} {'antes':>10} {'depois':>10} {'variação':>9}")
+    for label, q in (("p50", 0.5), ("p95", 0.95), ("max", 1.0)):
+        b, a = percentile(before, q), percentile(after, q)
+        print(f"{label:>8} {b:>9.1f}ms {a:>9.1f}ms {(a - b) / b if b else 0:>+9.1%}")
+
+    regressions = sorted(rows, key=lambda row: row["latency_ms"] - row["before_ms"], reverse=True)[:args.top]
+    print("\nMaiores pioras:")
+    for row in regressions:
+        slowest = max(row["stages"].items(), key=lambda item: item[1], default=("-", 0))
+        print(f"  {row['id']}: {row['before_ms']:.1f} -> {row['latency_ms']:.1f}ms "
+              f"(estágio mais lento: {slowest[0]} {slowest[1]:.1f}ms) {row['text'][:60]!r}")
+
+    if args.fail_on_regression is not None:
+        b, a = percentile(before, 0.95), percentile(after, 0.95)
+        if b and (a - b) / b > args.fail_on_regression:
+            sys.exit(f"\n❌ p95 piorou {(a - b) / b:.1%} (limite {args.fail_on_regression:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Divide um currículo em arquivo único em um diretório com um JSON por disciplina
+
+Uso:
+    python scripts/shard_curriculum.py data/bncc-data.json data/curricula/bncc
+
+Depois aponte o registro para o diretório: CURRICULA="bncc=data/curricula/bncc"
+"""
+import json
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matchers.base_matcher import normalize_text
+
+
+def _slug(name: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '_', normalize_text(name)).strip('_')
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    source, target = sys.argv[1], sys.argv[2]
+
+    with open(source, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    os.makedirs(target, exist_ok=True)
+    index = {}
+    for disciplina, anos in data.items():
+        filename = f"{_slug(disciplina)}.json"
+        with open(os.path.join(target, filename), 'w', encoding='utf-8') as f:
+            json.dump(anos, f, ensure_ascii=False)
+        index[disciplina] = filename
+        print(f"{disciplina} -> {filename}")
+
+    with open(os.path.join(target, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
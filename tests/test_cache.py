@@ -0,0 +1,138 @@
+"""
+Cache (matchers/cache.py): backends em memória e Redis (fakeredis), codificação
+binária e proteção contra stampede do get_or_compute
+"""
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matchers.cache import Cache, MemoryCache, RedisCache, decode_value, encode_value
+
+try:
+    import fakeredis
+except ImportError:  # opcional: os testes do backend Redis são pulados
+    fakeredis = None
+
+needs_fakeredis = pytest.mark.skipif(fakeredis is None, reason="requer fakeredis (pip install fakeredis)")
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture(params=["memory", pytest.param("redis", marks=needs_fakeredis)])
+def backend(request):
+    if request.param == "memory":
+        return MemoryCache()
+    return RedisCache(client=fakeredis.FakeRedis(server=fakeredis.FakeServer()))
+
+
+def test_encode_small_json_is_raw():
+    data = encode_value({"a": 1})
+    assert data[:1] == b"j"
+    assert decode_value(data) == {"a": 1}
+
+
+def test_encode_large_json_is_zlib():
+    value = {"texto": "fotossíntese " * 200}
+    data = encode_value(value)
+    assert data[:1] == b"z"
+    assert len(data) < len(value["texto"])
+    assert decode_value(data) == value
+
+
+def test_encode_vector_is_raw_float32():
+    vector = np.arange(4, dtype=np.float64)
+    data = encode_value(vector)
+    assert data[:1] == b"v"
+    assert len(data) == 1 + 4 * 4
+    decoded = decode_value(data)
+    assert decoded.dtype == np.float32
+    assert np.array_equal(decoded, vector)
+
+
+def test_hit_and_miss(backend):
+    cache = Cache(backend, "teste", ttl=60)
+    calls = []
+    compute = lambda: calls.append(1) or {"extracted": {"disciplina": "Matemática"}}
+
+    assert cache.get_or_compute("k", compute) == {"extracted": {"disciplina": "Matemática"}}
+    assert cache.get_or_compute("k", compute) == {"extracted": {"disciplina": "Matemática"}}
+    assert len(calls) == 1
+    assert cache.stats["misses"] == 1 and cache.stats["hits"] == 1
+    assert cache.get("outra") is None
+
+
+def test_namespaces_do_not_share_values(backend):
+    Cache(backend, "v1").set("k", [1, 2])
+    assert Cache(backend, "v1").get("k") == [1, 2]
+    assert Cache(backend, "v2").get("k") is None
+
+
+def test_memory_ttl_expires():
+    cache = Cache(MemoryCache(), "teste", ttl=0.05)
+    cache.set("k", 1)
+    assert cache.get("k") == 1
+    time.sleep(0.1)
+    assert cache.get("k") is None
+
+
+@needs_fakeredis
+def test_stampede_single_computer(server):
+    # Quatro "pods" com o mesmo servidor Redis
+    caches = [Cache(RedisCache(client=fakeredis.FakeRedis(server=server)), "teste",
+                    ttl=60, lock_ttl=5, wait_interval=0.01) for _ in range(4)]
+    calls = []
+    results = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"ok": True}
+
+    threads = [threading.Thread(target=lambda c=c: results.append(c.get_or_compute("k", compute)))
+               for c in caches]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [{"ok": True}] * 4
+    assert sum(c.stats["waits"] for c in caches) == 3
+    # Lock liberado depois do cálculo
+    assert fakeredis.FakeRedis(server=server).get("teste:k:lock") is None
+
+
+@needs_fakeredis
+def test_waiter_computes_after_lock_ttl(server):
+    client = fakeredis.FakeRedis(server=server)
+    # Dono do lock que nunca grava o valor (pod que caiu no meio do cálculo)
+    client.set("teste:k:lock", b"1")
+    cache = Cache(RedisCache(client=client), "teste", ttl=60, lock_ttl=0.2, wait_interval=0.01)
+
+    start = time.monotonic()
+    assert cache.get_or_compute("k", lambda: 42) == 42
+    assert time.monotonic() - start >= 0.2
+    assert cache.stats["waits"] == 1
+    assert cache.get("k") == 42
+
+
+def test_backend_errors_count_as_miss():
+    class Broken(MemoryCache):
+        def get(self, key):
+            raise ConnectionError("fora do ar")
+
+    cache = Cache(Broken(), "teste")
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert cache.get_or_compute("k", lambda: 7) == 7
+    assert cache.stats["errors"] >= 1
@@ -0,0 +1,98 @@
+"""
+Fila de jobs (jobs.py): reivindicação atômica com lease entre processos que
+compartilham o mesmo JOBS_DIR
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jobs import INPUT_FILE, RESULTS_FILE, JobQueue, JobStore, LeaseLost
+
+
+class FakePipeline:
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def classify(self, text, context=None):
+        with self._lock:
+            self.calls += 1
+        time.sleep(0.01)
+        return {"extracted": {"texto": text}}
+
+
+class FakeProcessor:
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+
+    def is_loaded(self):
+        return True
+
+    def wait_for_idle(self, max_wait=5.0):
+        pass
+
+
+def queued_job(store, texts):
+    job_id = store.create(total=len(texts))
+    with open(store.path(job_id, INPUT_FILE), "w", encoding="utf-8") as f:
+        for text in texts:
+            f.write(json.dumps({"text": text}) + "\n")
+    store.update(job_id, status="queued", total=len(texts))
+    return job_id
+
+
+def test_only_one_owner_claims(tmp_path):
+    store_a, store_b = JobStore(str(tmp_path)), JobStore(str(tmp_path))
+    job_id = queued_job(store_a, ["questão de matemática"])
+
+    assert store_a.claim(job_id, "a", lease=60)
+    assert not store_b.claim(job_id, "b", lease=60)
+    # Em andamento com lease válido: não é retomado por outro processo
+    assert store_b.pending() == []
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    store = JobStore(str(tmp_path))
+    job_id = queued_job(store, ["questão de matemática"])
+
+    assert store.claim(job_id, "a", lease=0.05)
+    time.sleep(0.1)
+    assert store.pending() == [job_id]
+    assert store.claim(job_id, "b", lease=60)
+    with pytest.raises(LeaseLost):
+        store.renew(job_id, "a")
+    assert not store.release(job_id, "a", status="done")
+    assert store.get(job_id)["status"] == "running"
+
+
+def test_two_queues_run_each_job_once(tmp_path):
+    texts = [f"questão {i} de matemática" for i in range(30)]
+    pipeline = FakePipeline()
+    store = JobStore(str(tmp_path))
+    job_id = queued_job(store, texts)
+
+    # Dois "workers do uvicorn" no mesmo JOBS_DIR, ambos retomando o job na subida
+    queues = [JobQueue(FakeProcessor(pipeline), JobStore(str(tmp_path)), workers=2, chunk_size=7, lease=5)
+              for _ in range(2)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for job_queue in queues:
+            job_queue.start()
+        deadline = time.monotonic() + 10
+        while store.get(job_id)["status"] != "done" and time.monotonic() < deadline:
+            time.sleep(0.02)
+
+    job = store.get(job_id)
+    assert job["status"] == "done" and job["done"] == len(texts)
+    assert job["owner"] is None
+    assert pipeline.calls == len(texts)
+    with open(store.path(job_id, RESULTS_FILE), "rb") as f:
+        lines = [json.loads(line) for line in f]
+    assert [row["line"] for row in lines] == list(range(1, len(texts) + 1))
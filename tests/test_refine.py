@@ -0,0 +1,69 @@
+"""
+Refine (NLPPipeline.refine): confirmar, trocar e limpar campos
+
+Roda com o tokenizador vazio (spacy.blank), sem precisar dos modelos pt_core_news.
+"""
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+import spacy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matchers.pipeline import NLPPipeline
+from matchers.session import ExtractionSession
+
+TEXT = "Questão de matemática 7º ano sobre equações do 1º grau"
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    with contextlib.redirect_stdout(io.StringIO()):
+        return NLPPipeline(spacy.blank("pt"))
+
+
+def refine(pipeline, previous, changed):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return pipeline.refine(TEXT, previous, changed, session=ExtractionSession(pipeline))
+
+
+@pytest.fixture(scope="module")
+def first(pipeline):
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = pipeline.classify(TEXT)
+    assert result["extracted"]["unidadeTematica"] == "Álgebra"
+    return result
+
+
+def test_confirm_keeps_value_and_raises_confidence(pipeline, first):
+    result = refine(pipeline, first, {"unidadeTematica": "Álgebra"})
+    assert result["extracted"] == first["extracted"]
+    assert result["confidence"]["unidadeTematica"] == 1.0
+    assert result["confidence"]["objetoConhecimento"] == first["confidence"]["objetoConhecimento"]
+
+
+def test_change_recomputes_following_fields(pipeline, first):
+    result = refine(pipeline, first, {"ano": "8º"})
+    assert result["extracted"]["ano"] == "8º"
+    assert result["confidence"]["ano"] == 1.0
+    with contextlib.redirect_stdout(io.StringIO()):
+        fresh = pipeline.classify(TEXT, {"ano": "8º"})
+    for field in ("unidadeTematica", "objetoConhecimento", "habilidade"):
+        assert result["extracted"].get(field) == fresh["extracted"].get(field)
+
+
+def test_clear_leaves_field_empty(pipeline, first):
+    result = refine(pipeline, first, {"unidadeTematica": ""})
+    assert "unidadeTematica" not in result["extracted"]
+    assert "unidadeTematica" not in result["confidence"]
+    assert "unidadeTematica" in result["missing_fields"]
+    assert not any(s["field"] == "unidadeTematica" for s in result["suggestions"])
+
+
+def test_clear_default_field_is_not_refilled(pipeline, first):
+    result = refine(pipeline, first, {"nivelBloom": None})
+    assert "nivelBloom" not in result["extracted"]
+    assert result["extracted"]["unidadeTematica"] == first["extracted"]["unidadeTematica"]